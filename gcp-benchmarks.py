@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+GCP Pricing Tools Benchmarks
+
+Micro-benchmarks for the catalog tooling, run against a real downloaded
+catalog or a synthetic one of a given size.
+
+Benchmarks:
+- catalog-format: file size, write time and load time of the v1, v2 and
+  gzipped v2 catalog formats
+- processor-cache: SKUCatalogProcessor startup in gcp-price-sync-final.py
+  without the processed cache, when writing it and when reading it
+- sku-memory: memory held by normalized SKUs as SKURecord objects vs the
+  per-SKU dicts (and the raw catalog they kept alive) they replaced
+- classify: per-SKU cost of the summary category and price type
+  classification, compiled rules vs the keyword scans they replaced
+
+Usage:
+    python gcp-benchmarks.py catalog-format --synthetic 50000
+    python gcp-benchmarks.py catalog-format --catalog gcp_skus_20250807_194211.json
+    python gcp-benchmarks.py processor-cache --synthetic 100000
+    python gcp-benchmarks.py sku-memory --sizes 100000 1000000
+    python gcp-benchmarks.py classify --synthetic 100000
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from gcp_catalog_format import dump_catalog, from_v2, load_catalog, synthetic_catalog, to_v2
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CATALOG_FORMATS = [
+    ('v1', 1, 'catalog_v1.json'),
+    ('v2', 2, 'catalog_v2.json'),
+    ('v2.gz', 2, 'catalog_v2.json.gz'),
+]
+
+
+def best_of(repeat, func):
+    """Run func repeat times and return the fastest wall time in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_catalog_format(catalog, repeat=3):
+    """Return one row per format with its size, write time and load time."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, version, filename in CATALOG_FORMATS:
+            path = os.path.join(tmp_dir, filename)
+            write_seconds = best_of(repeat, lambda: dump_catalog(catalog, path, version=version))
+            load_seconds = best_of(repeat, lambda: load_catalog(path))
+            rows.append({
+                'format': label,
+                'bytes': os.path.getsize(path),
+                'write_seconds': write_seconds,
+                'load_seconds': load_seconds
+            })
+    return rows
+
+
+def load_script(module_name, filename):
+    """Import one of the hyphenated scripts next to this file as a module."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def benchmark_processor_cache(catalog, repeat=3):
+    """Return SKUCatalogProcessor startup times without, writing and reading the processed cache."""
+    price_sync = load_script('gcp_price_sync_final', 'gcp-price-sync-final.py')
+    logging.getLogger().setLevel(logging.WARNING)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'catalog_v2.json')
+        dump_catalog(catalog, path, version=2)
+        cache_path = path + price_sync.PROCESSED_CACHE_SUFFIX
+
+        def startup(use_cache=True):
+            # The views a default sync run reads before talking to Morpheus
+            processor = price_sync.SKUCatalogProcessor(path, use_cache=use_cache)
+            processor.build_views('processed_skus', 'sku_summary', 'all_skus')
+
+        def write_cache():
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            startup()
+
+        for label, func in [
+            ('no cache', lambda: startup(use_cache=False)),
+            ('write cache', write_cache),
+            ('read cache', startup),
+        ]:
+            rows.append({'mode': label, 'seconds': best_of(repeat, func)})
+        rows[-1]['bytes'] = os.path.getsize(cache_path)
+    return rows
+
+
+def legacy_normalized_sku(sku, service_name, service_id):
+    """The per-SKU dict SKUCatalogProcessor built before SKURecord, kept for comparison."""
+    pricing_info = sku.get('pricingInfo', [])
+    if not pricing_info:
+        return None
+    tiered_rates = pricing_info[0].get('pricingExpression', {}).get('tieredRates', [])
+    if not tiered_rates or not tiered_rates[0].get('unitPrice'):
+        return None
+    return {
+        'sku_id': sku.get('skuId', ''),
+        'description': sku.get('description', ''),
+        'service_name': service_name,
+        'service_id': service_id,
+        'category': sku.get('category', {}),
+        'pricing_unit': pricing_info[0].get('pricingExpression', {}).get('usageUnit', 'hour'),
+        'rate': tiered_rates[0]['unitPrice'],
+        'tiered_rates': tiered_rates,
+        'pricing_info': pricing_info,
+        'original_sku': sku,
+    }
+
+
+def measure_sku_memory(normalize, num_skus, keep_catalog, results, chunk_skus=20000):
+    """Normalize ``num_skus`` synthetic SKUs and put the traced bytes held afterwards on ``results``.
+
+    The catalog is parsed from JSON a chunk at a time, as a loaded file
+    would be; with ``keep_catalog`` every chunk stays referenced, as the
+    whole catalog did while the per-SKU dicts pointed into it.
+    """
+    skus_per_service = 200
+    chunk_text = json.dumps(to_v2(synthetic_catalog(num_services=chunk_skus // skus_per_service,
+                                                    skus_per_service=skus_per_service)))
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept_catalogs = []
+    records = []
+    for _ in range(max(1, round(num_skus / chunk_skus))):
+        chunk = from_v2(json.loads(chunk_text))
+        for service_id, service_data in chunk['services'].items():
+            service_name = service_data['service_info']['display_name']
+            for sku in service_data['skus']:
+                record = normalize(sku, service_name, service_id)
+                if record is not None:
+                    records.append(record)
+        if keep_catalog:
+            kept_catalogs.append(chunk)
+        del chunk
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put({'skus': len(records), 'held_bytes': held, 'peak_bytes': peak,
+                 'seconds': time.perf_counter() - started})
+
+
+def benchmark_sku_memory(sizes):
+    """Return one row per SKU count and representation, each measured in a fresh child process.
+
+    Synthetic descriptions repeat more than real ones do, which flatters
+    the interning of SKURecord descriptions somewhat.
+    """
+    price_sync = load_script('gcp_price_sync_final', 'gcp-price-sync-final.py')
+    # fork, so every measurement starts from the same small heap and a child
+    # killed for running out of memory doesn't take the benchmark with it
+    context = multiprocessing.get_context('fork')
+    rows = []
+    for num_skus in sizes:
+        for label, normalize, keep_catalog in [
+            ('dicts + raw catalog', legacy_normalized_sku, True),
+            ('SKURecord', price_sync.SKURecord.from_sku, False),
+        ]:
+            results = context.Queue()
+            child = context.Process(target=measure_sku_memory, args=(normalize, num_skus, keep_catalog, results))
+            child.start()
+            child.join()
+            row = results.get() if child.exitcode == 0 else {'skus': num_skus, 'failed': child.exitcode}
+            rows.append(dict(row, representation=label, requested=num_skus))
+    return rows
+
+
+def legacy_categorize(sku):
+    """Summary category by the keyword scans SKUCatalogProcessor used before its compiled rules."""
+    service_name = sku.service_name.lower()
+    description = sku.description.lower()
+    resource_family = sku.resource_family.lower()
+    if resource_family in ('storage', 'compute', 'network', 'database'):
+        return resource_family
+    if resource_family in ['ai/ml', 'ai', 'ml']:
+        return 'ai_ml'
+    for text, rules in [
+        (service_name, [('storage', ['storage', 'cloud storage', 'filestore', 'memorystore']),
+                        ('compute', ['compute', 'vm', 'instance', 'gke', 'kubernetes', 'run', 'functions']),
+                        ('network', ['network', 'vpc', 'load balancer', 'cdn', 'gateway']),
+                        ('database', ['sql', 'database', 'firestore', 'bigtable', 'spanner', 'alloydb']),
+                        ('ai_ml', ['ai', 'ml', 'vertex', 'notebooks', 'composer', 'dataflow'])]),
+        (description, [('storage', ['storage', 'gb', 'tb']),
+                       ('compute', ['cpu', 'ram', 'memory', 'core']),
+                       ('network', ['network', 'bandwidth', 'transfer']),
+                       ('database', ['database', 'sql', 'query']),
+                       ('ai_ml', ['ai', 'ml', 'machine learning', 'tensorflow'])]),
+    ]:
+        for category, keywords in rules:
+            if any(k in text for k in keywords):
+                return category
+    return 'other'
+
+
+def legacy_machine_family(text):
+    name = (text or '').lower()
+    for pattern in [r'^([a-z]\d+[a-z]?)-', r'\b([a-z]\d+[a-z]?)-']:
+        match = re.search(pattern, name)
+        if match:
+            return match.group(1)
+    return None
+
+
+def legacy_classify_price_type(sku):
+    """(priceTypeCode, machine_family) by the keyword scans used before the compiled rules."""
+    description = (sku.description or '').lower()
+    resource_family = (sku.resource_family or '').lower()
+    resource_group = (sku.resource_group or '').lower()
+    storage_keywords = ['persistent disk', 'pd-', 'hyperdisk', 'local ssd', 'ssd', 'hdd', 'filestore']
+    if resource_family == 'storage' or any(k in description for k in storage_keywords):
+        return 'storage', None
+    core_keywords = ['vcpu', 'core', 'cpu']
+    if resource_family == 'compute' or resource_group == 'cpu' or any(k in description for k in core_keywords):
+        return 'cores', legacy_machine_family(description)
+    mem_keywords = ['ram', 'memory']
+    if resource_group == 'ram' or any(k in description for k in mem_keywords):
+        return 'memory', legacy_machine_family(description)
+    return 'software', None
+
+
+def benchmark_classify(catalog, repeat=3):
+    """Return per-SKU classification cost of the legacy scans and the compiled rules, and their mismatches."""
+    price_sync = load_script('gcp_price_sync_final', 'gcp-price-sync-final.py')
+    records = [
+        record
+        for service_id, service_data in catalog['services'].items()
+        for sku in service_data['skus']
+        for record in [price_sync.SKURecord.from_sku(sku, service_data['service_info']['display_name'], service_id)]
+        if record is not None
+    ]
+    processor = price_sync.SKUCatalogProcessor.__new__(price_sync.SKUCatalogProcessor)
+
+    def compiled():
+        # Fresh memos per run, as every processor starts with them
+        processor._key_classes = {}
+        processor.rules = price_sync.load_rules()
+        return [(processor._categorize_sku(r), processor.classify_price_type(r)) for r in records]
+
+    def legacy():
+        return [(legacy_categorize(r), legacy_classify_price_type(r)) for r in records]
+
+    mismatches = sum(1 for old, new in zip(legacy(), compiled()) if old != new)
+    rows = []
+    for label, func in [('keyword scans', legacy), ('compiled rules', compiled)]:
+        seconds = best_of(repeat, func)
+        rows.append({'classifier': label, 'seconds': seconds, 'ns_per_sku': seconds / len(records) * 1e9})
+    return rows, len(records), mismatches
+
+
+def print_table(title, columns, rows):
+    print(f"\n{title}")
+    print("  " + "  ".join(f"{name:>{width}}" for name, width, _ in columns))
+    for row in rows:
+        print("  " + "  ".join(f"{fmt(row):>{width}}" for _, width, fmt in columns))
+
+
+def load_benchmark_catalog(args):
+    if args.catalog:
+        return load_catalog(args.catalog)
+    skus_per_service = 200
+    return synthetic_catalog(num_services=max(1, args.synthetic // skus_per_service),
+                             skus_per_service=skus_per_service)
+
+
+def run_catalog_format(args):
+    catalog = load_benchmark_catalog(args)
+    rows = benchmark_catalog_format(catalog, repeat=args.repeat)
+    baseline = rows[0]
+    print(f"Catalog: {catalog['metadata'].get('total_skus', 0):,} SKUs in "
+          f"{len(catalog.get('services', {}))} services (best of {args.repeat})")
+    print_table('Catalog format', [
+        ('format', 6, lambda r: r['format']),
+        ('bytes', 14, lambda r: f"{r['bytes']:,}"),
+        ('size', 7, lambda r: f"{r['bytes'] / baseline['bytes']:.1%}"),
+        ('write s', 9, lambda r: f"{r['write_seconds']:.3f}"),
+        ('load s', 9, lambda r: f"{r['load_seconds']:.3f}"),
+        ('load', 7, lambda r: f"{baseline['load_seconds'] / r['load_seconds']:.2f}x"),
+    ], rows)
+    return 0
+
+
+def run_processor_cache(args):
+    catalog = load_benchmark_catalog(args)
+    rows = benchmark_processor_cache(catalog, repeat=args.repeat)
+    baseline = rows[0]
+    print(f"Catalog: {catalog['metadata'].get('total_skus', 0):,} SKUs in "
+          f"{len(catalog.get('services', {}))} services (v2 JSON, best of {args.repeat})")
+    print_table('Processor startup', [
+        ('mode', 11, lambda r: r['mode']),
+        ('seconds', 9, lambda r: f"{r['seconds']:.3f}"),
+        ('speed-up', 9, lambda r: f"{baseline['seconds'] / r['seconds']:.2f}x"),
+        ('cache bytes', 14, lambda r: f"{r['bytes']:,}" if 'bytes' in r else '-'),
+    ], rows)
+    return 0
+
+
+def run_sku_memory(args):
+    rows = benchmark_sku_memory(args.sizes)
+    print("Memory held after normalizing synthetic SKUs (tracemalloc, one process per row)")
+    megabytes = lambda key: lambda r: f"{r[key] / 2 ** 20:,.1f}" if key in r else f"failed ({r['failed']})"
+    print_table('SKU memory', [
+        ('representation', 20, lambda r: r['representation']),
+        ('skus', 10, lambda r: f"{r['skus']:,}"),
+        ('held MiB', 13, megabytes('held_bytes')),
+        ('peak MiB', 13, megabytes('peak_bytes')),
+        ('B/SKU', 7, lambda r: f"{r['held_bytes'] / r['skus']:,.0f}" if 'held_bytes' in r else '-'),
+        ('seconds', 8, lambda r: f"{r['seconds']:.1f}" if 'seconds' in r else '-'),
+    ], rows)
+    return 0
+
+
+def run_classify(args):
+    catalog = load_benchmark_catalog(args)
+    rows, num_skus, mismatches = benchmark_classify(catalog, repeat=args.repeat)
+    baseline = rows[0]
+    print(f"Catalog: {num_skus:,} priced SKUs in {len(catalog.get('services', {}))} services "
+          f"(best of {args.repeat}); {mismatches} SKUs classified differently")
+    print_table('Category and price type classification', [
+        ('classifier', 14, lambda r: r['classifier']),
+        ('seconds', 9, lambda r: f"{r['seconds']:.3f}"),
+        ('ns/SKU', 8, lambda r: f"{r['ns_per_sku']:,.0f}"),
+        ('speed-up', 9, lambda r: f"{baseline['seconds'] / r['seconds']:.2f}x"),
+    ], rows)
+    return 0 if mismatches == 0 else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks for the GCP pricing catalog tools",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Examples:\n"
+            "  python gcp-benchmarks.py catalog-format --synthetic 50000\n"
+            "  python gcp-benchmarks.py catalog-format --catalog gcp_skus.json --repeat 5\n"
+            "  python gcp-benchmarks.py processor-cache --synthetic 100000\n"
+            "  python gcp-benchmarks.py sku-memory --sizes 100000 1000000\n"
+            "  python gcp-benchmarks.py classify --synthetic 100000\n"
+        ),
+    )
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    catalog_format = subparsers.add_parser('catalog-format', help='Compare v1, v2 and gzipped v2 catalogs')
+    source = catalog_format.add_mutually_exclusive_group()
+    source.add_argument('--catalog', help='Downloaded catalog to benchmark (any format)')
+    source.add_argument('--synthetic', type=int, default=20000,
+                        help='Size of the synthetic catalog in SKUs when --catalog is not given (default: 20000)')
+    catalog_format.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+    catalog_format.set_defaults(run=run_catalog_format)
+
+    processor_cache = subparsers.add_parser('processor-cache',
+                                            help='Compare price sync startup with and without the processed cache')
+    source = processor_cache.add_mutually_exclusive_group()
+    source.add_argument('--catalog', help='Downloaded catalog to benchmark (any format)')
+    source.add_argument('--synthetic', type=int, default=20000,
+                        help='Size of the synthetic catalog in SKUs when --catalog is not given (default: 20000)')
+    processor_cache.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+    processor_cache.set_defaults(run=run_processor_cache)
+
+    sku_memory = subparsers.add_parser('sku-memory', help='Compare memory of SKU records and per-SKU dicts')
+    sku_memory.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000],
+                            help='SKU counts to measure (default: 100000 1000000)')
+    sku_memory.set_defaults(run=run_sku_memory)
+
+    classify = subparsers.add_parser('classify', help='Compare compiled SKU classification with keyword scans')
+    source = classify.add_mutually_exclusive_group()
+    source.add_argument('--catalog', help='Downloaded catalog to benchmark (any format)')
+    source.add_argument('--synthetic', type=int, default=20000,
+                        help='Size of the synthetic catalog in SKUs when --catalog is not given (default: 20000)')
+    classify.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+    classify.set_defaults(run=run_classify)
+
+    args = parser.parse_args()
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
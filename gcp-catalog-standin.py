@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+GCP Billing Catalog Stand-in - Local HTTP server for benchmarking the downloader
+
+Serves /v1/services and /v1/services/{id}/skus the way the Cloud Billing
+Catalog API does, from recorded catalogs or a synthetic one, so
+gcp-sku-downloader.py can be load-tested on one machine without using quota.
+
+Features:
+- Real pagination with opaque nextPageToken values and a server-side page size cap
+- Serves recorded catalogs (any format written by gcp-sku-downloader.py) or synthetic SKUs
+- Configurable latency and jitter per request
+- Injected 429 (with Retry-After) and 5xx responses at given rates
+- Optional quota of concurrent requests, answered with 429 beyond it
+- gzip bodies and fields= partial responses, as the real API does
+- currencyCode conversion of the (USD) prices at fixed --fx-rate rates
+- Request counters at /_stats for benchmark scripts
+
+Usage:
+    python gcp-catalog-standin.py --synthetic 20000 --port 8089 --latency 80 --jitter 40
+    python gcp-catalog-standin.py --catalog gcp_skus_asia.json gcp_skus_us.json --error-rate-429 0.02
+    python gcp-sku-downloader.py --region asia-southeast2 --api-base-url http://127.0.0.1:8089 --access-token local
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import re
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from gcp_catalog_format import load_catalog, synthetic_catalog
+from gcp_currency import BASE_CURRENCY, convert_sku
+
+# The real API rejects larger pageSize values
+MAX_PAGE_SIZE = 5000
+DEFAULT_PAGE_SIZE = 5000
+
+# USD conversion rates served for currencyCode when --fx-rate is not given
+DEFAULT_FX_RATES = {'EUR': 0.92, 'IDR': 16250.0}
+
+
+class CatalogStandIn:
+    """Services and SKUs served by the stand-in, plus its fault-injection settings."""
+
+    def __init__(self, catalogs, max_page_size=DEFAULT_PAGE_SIZE, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate_429=0.0, error_rate_5xx=0.0, retry_after=1.0, seed=None, fx_rates=None,
+                 max_concurrent=None):
+        self.services = []
+        self.skus = {}
+        self._merge(catalogs)
+        self.max_page_size = max(1, min(max_page_size, MAX_PAGE_SIZE))
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.retry_after = retry_after
+        self.fx_rates = dict(DEFAULT_FX_RATES, **(fx_rates or {}))
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'pages': 0, 'skus_served': 0, 'injected_429': 0, 'injected_5xx': 0,
+                      'over_quota_429': 0, 'peak_in_flight': 0}
+
+    def _merge(self, catalogs):
+        """Combine per-region catalogs; a SKU listed in several regions is served once."""
+        seen = {}
+        for catalog in catalogs:
+            for service_id, service_data in catalog.get('services', {}).items():
+                if service_id not in self.skus:
+                    info = service_data['service_info']
+                    self.services.append({
+                        'name': f'services/{service_id}',
+                        'serviceId': service_id,
+                        'displayName': info.get('display_name', service_id),
+                        'businessEntityName': info.get('business_entity_name', 'businessEntities/GCP')
+                    })
+                    self.skus[service_id] = []
+                    seen[service_id] = set()
+                for sku in service_data.get('skus', []):
+                    if sku.get('skuId') not in seen[service_id]:
+                        seen[service_id].add(sku.get('skuId'))
+                        self.skus[service_id].append(sku)
+
+    @property
+    def total_skus(self):
+        return sum(len(skus) for skus in self.skus.values())
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def enter(self):
+        """Admit a request; returns False when it exceeds the concurrent request quota."""
+        with self._lock:
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                self.stats['over_quota_429'] += 1
+                return False
+            self.in_flight += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def injected_error(self):
+        """Return 429, 503 or None for the next request."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.error_rate_429:
+            self._count('injected_429')
+            return 429
+        if roll < self.error_rate_429 + self.error_rate_5xx:
+            self._count('injected_5xx')
+            return 503
+        return None
+
+    def convert(self, page, currency_code):
+        """Price a page of SKUs in ``currency_code``; raises ValueError for unknown currencies."""
+        if not currency_code or currency_code == BASE_CURRENCY:
+            return page
+        if currency_code not in self.fx_rates:
+            raise ValueError(f'Unsupported currency code {currency_code}')
+        rate = self.fx_rates[currency_code]
+        return dict(page, skus=[convert_sku(sku, currency_code, rate) for sku in page['skus']])
+
+    def page(self, items, key, params):
+        """Slice one page of ``items`` starting at the offset encoded in pageToken."""
+        page_size = self.max_page_size
+        if params.get('pageSize'):
+            page_size = max(1, min(int(params['pageSize'][0]), self.max_page_size))
+        start = decode_page_token(params.get('pageToken', [''])[0])
+        page = {key: items[start:start + page_size]}
+        if start + page_size < len(items):
+            page['nextPageToken'] = encode_page_token(start + page_size)
+        self._count('pages')
+        if key == 'skus':
+            self._count('skus_served', len(page[key]))
+        return page
+
+
+def narrow_fields(page, fields):
+    """Apply a ``fields=`` partial-response selector such as ``nextPageToken,skus(skuId,category)``."""
+    if not fields:
+        return page
+    selected = {}
+    for name, subfields in re.findall(r'(\w+)(?:\(([^)]*)\))?', fields):
+        if name not in page:
+            continue
+        if subfields and isinstance(page[name], list):
+            keep = [field.strip() for field in subfields.split(',')]
+            selected[name] = [{key: item[key] for key in keep if key in item} for item in page[name]]
+        else:
+            selected[name] = page[name]
+    return selected
+
+
+def encode_page_token(offset):
+    return base64.urlsafe_b64encode(f'offset:{offset}'.encode()).decode()
+
+
+def decode_page_token(token):
+    if not token:
+        return 0
+    try:
+        prefix, offset = base64.urlsafe_b64decode(token.encode()).decode().split(':')
+        if prefix != 'offset':
+            raise ValueError(token)
+        return int(offset)
+    except ValueError:
+        raise ValueError(f"Invalid pageToken: {token}")
+
+
+class CatalogRequestHandler(BaseHTTPRequestHandler):
+    """Routes Cloud Billing Catalog API paths to the server's CatalogStandIn."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without TCP_NODELAY keep-alive
+    # clients stall on delayed ACKs and every request gains ~40ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        standin = self.server.standin
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+
+        if url.path == '/_stats':
+            with standin._lock:
+                return self._send_json(200, dict(standin.stats))
+
+        standin._count('requests')
+        if not standin.enter():
+            return self._send_json(429, _error(429, 'RESOURCE_EXHAUSTED', 'Too many concurrent requests'),
+                                   {'Retry-After': f'{standin.retry_after:g}'})
+        try:
+            self._serve(standin, url, params, parts)
+        finally:
+            standin.leave()
+
+    def _serve(self, standin, url, params, parts):
+        time.sleep(standin.delay())
+        status = standin.injected_error()
+        if status == 429:
+            return self._send_json(429, _error(429, 'RESOURCE_EXHAUSTED', 'Quota exceeded (injected)'),
+                                   {'Retry-After': f'{standin.retry_after:g}'})
+        if status:
+            return self._send_json(status, _error(status, 'UNAVAILABLE', 'Service unavailable (injected)'))
+
+        try:
+            if parts == ['v1', 'services']:
+                return self._send_json(200, standin.page(standin.services, 'services', params))
+            if len(parts) == 4 and parts[:2] == ['v1', 'services'] and parts[3] == 'skus':
+                if parts[2] not in standin.skus:
+                    return self._send_json(404, _error(404, 'NOT_FOUND', f'Service {parts[2]} not found'))
+                page = standin.page(standin.skus[parts[2]], 'skus', params)
+                page = standin.convert(page, params.get('currencyCode', [''])[0])
+                return self._send_json(200, narrow_fields(page, params.get('fields', [''])[0]))
+        except ValueError as e:
+            return self._send_json(400, _error(400, 'INVALID_ARGUMENT', str(e)))
+        return self._send_json(404, _error(404, 'NOT_FOUND', f'Unknown path {url.path}'))
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        # Like Google APIs, compress only when the User-Agent also asks for gzip
+        if ('gzip' in self.headers.get('Accept-Encoding', '')
+                and 'gzip' in self.headers.get('User-Agent', '')):
+            payload = gzip.compress(payload, compresslevel=6)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def _error(code, status, message):
+    return {'error': {'code': code, 'message': message, 'status': status}}
+
+
+def make_server(standin, host='127.0.0.1', port=0, verbose=False):
+    """Create a threaded server for ``standin``; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), CatalogRequestHandler)
+    server.daemon_threads = True
+    server.standin = standin
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Cloud Billing Catalog API",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python gcp-catalog-standin.py --synthetic 20000 --port 8089
+  python gcp-catalog-standin.py --synthetic 20000 --latency 120 --jitter 60 --page-size 500
+  python gcp-catalog-standin.py --catalog gcp_skus_asia.json --error-rate-429 0.05 --retry-after 2
+  python gcp-catalog-standin.py --synthetic 20000 --latency 80 --max-concurrent 6
+
+Point the downloader at it with:
+  python gcp-sku-downloader.py --region asia-southeast2 --api-base-url http://127.0.0.1:8089 --access-token local
+
+Counters for the requests served so far are available at /_stats.
+        """
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--catalog', nargs='+', help='Recorded catalog(s) to serve (v1 or v2, optionally gzipped)')
+    source.add_argument('--synthetic', type=int, default=20000,
+                        help='Serve a synthetic catalog of this many SKUs when --catalog is not given (default: 20000)')
+    parser.add_argument('--synthetic-services', type=int, default=100,
+                        help='Number of services in the synthetic catalog (default: 100)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8089, help='Port to listen on, 0 for any (default: 8089)')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'Largest page served regardless of the client pageSize (default: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--latency', type=float, default=0.0, help='Added latency per request in ms (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- latency jitter in ms (default: 0)')
+    parser.add_argument('--error-rate-429', type=float, default=0.0,
+                        help='Fraction of requests answered with 429 (default: 0)')
+    parser.add_argument('--error-rate-5xx', type=float, default=0.0,
+                        help='Fraction of requests answered with 503 (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=1.0,
+                        help='Retry-After seconds sent with injected 429s (default: 1)')
+    parser.add_argument('--max-concurrent', type=int,
+                        help='Answer requests beyond this many in flight with 429 (default: no quota)')
+    parser.add_argument('--seed', type=int, help='Random seed for jitter and error injection')
+    parser.add_argument('--fx-rate', nargs='+', default=[], metavar='CODE=RATE',
+                        help='USD conversion rates served for currencyCode, e.g. IDR=16250 '
+                             f'(default: {", ".join(f"{c}={r:g}" for c, r in DEFAULT_FX_RATES.items())})')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    for name in ('error_rate_429', 'error_rate_5xx'):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error(f"--{name.replace('_', '-')} must be between 0 and 1")
+    if args.error_rate_429 + args.error_rate_5xx > 1:
+        parser.error('--error-rate-429 and --error-rate-5xx cannot add up to more than 1')
+
+    fx_rates = {}
+    for value in args.fx_rate:
+        code, _, rate = value.partition('=')
+        try:
+            fx_rates[code.upper()] = float(rate)
+        except ValueError:
+            parser.error(f'--fx-rate expects CODE=RATE, got {value}')
+
+    if args.catalog:
+        catalogs = [load_catalog(path) for path in args.catalog]
+    else:
+        services = max(1, args.synthetic_services)
+        catalogs = [synthetic_catalog(num_services=services, skus_per_service=max(1, args.synthetic // services))]
+
+    standin = CatalogStandIn(
+        catalogs,
+        max_page_size=args.page_size,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        fx_rates=fx_rates,
+        max_concurrent=args.max_concurrent
+    )
+    server = make_server(standin, args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Serving {len(standin.services)} services / {standin.total_skus:,} SKUs at http://{host}:{port} "
+          f"(page size {standin.max_page_size}, latency {args.latency:g}±{args.jitter:g} ms, "
+          f"429 rate {args.error_rate_429:g}, 5xx rate {args.error_rate_5xx:g})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served: {json.dumps(standin.stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,12 +17,17 @@ from urllib3.util.retry import Retry
 from functools import wraps
 import inspect
 
+from gcp_sku_rules import load_rules
+
 # --- Enhanced Configuration ---
 MORPHEUS_URL = os.getenv("MORPHEUS_URL", "https://xdjmorpheapp01")
 MORPHEUS_TOKEN = os.getenv("MORPHEUS_TOKEN", "9fcc4426-c89a-4430-b6d7-99d5950fc1cc")
 GCP_REGION = os.getenv("GCP_REGION", "asia-southeast2")
 PRICE_PREFIX = os.getenv("PRICE_PREFIX", "IOH-CP")
 LOCAL_SKU_CACHE_FILE = "gcp_plan_skus.json"
+# Price type and machine family mapping rules (see gcp_sku_rules.py)
+SKU_RULES_FILE = os.getenv("SKU_RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                          "gcp_sku_rules_debug.json"))
 
 # Debug and logging configuration
 DEBUG_MODE = os.getenv("DEBUG_MODE", "true").lower() == "true"
@@ -259,6 +264,7 @@ class GCPPricingClient:
         self.region = region
         self.session = requests.Session()
         self.http_logger = HTTPTrafficLogger()
+        self.sku_rules = load_rules(SKU_RULES_FILE)
         
         logger.info(f"🌤️  Initializing GCP Pricing Client for region: {self.region}")
         
@@ -475,24 +481,9 @@ class GCPPricingClient:
         """Determine price type and machine family with logging"""
         logger.debug(f"   🔍 Determining price type for {resource_family}/{resource_group}")
         
-        price_type_code = 'software'
-        machine_family_heuristic = 'software'
-        
-        if resource_family == "COMPUTE":
-            if resource_group == "CPU":
-                price_type_code = 'cores'
-                family_match = re.search(r'^([A-Z0-9]+)', description)
-                if family_match:
-                    machine_family_heuristic = family_match.group(1).lower()
-            elif resource_group == "RAM":
-                price_type_code = 'memory'
-                family_match = re.search(r'^([A-Z0-9]+)', description)
-                if family_match:
-                    machine_family_heuristic = family_match.group(1).lower()
-        elif resource_family == "STORAGE":
-            if resource_group == "DISK":
-                price_type_code = 'storage'
-                machine_family_heuristic = 'pd-standard'
+        price_type_code, machine_family_heuristic = self.sku_rules.classify(
+            resource_family, resource_group, None, description
+        )
         
         logger.debug(f"   ➡️  Result: {price_type_code}/{machine_family_heuristic}")
         return price_type_code, machine_family_heuristic
@@ -35,6 +35,9 @@ from collections import defaultdict
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from gcp_catalog_format import load_catalog
+from gcp_sku_rules import summary_category
+
 # --- Configuration ---
 MORPHEUS_URL = os.getenv("MORPHEUS_URL", "https://localhost")
 MORPHEUS_TOKEN = os.getenv("MORPHEUS_TOKEN", "9fcc4426-c89a-4430-b6d7-99d5950fc1cc")
@@ -109,8 +112,7 @@ class SKUCatalogProcessor:
     def _load_catalog(self):
         """Load the SKU catalog from file."""
         try:
-            with open(self.catalog_file, 'r', encoding='utf-8') as f:
-                catalog = json.load(f)
+            catalog = load_catalog(self.catalog_file)
             logger.info(f"Loaded SKU catalog: {catalog['metadata']['total_services']} services, {catalog['metadata']['total_skus']} SKUs")
             return catalog
         except Exception as e:
@@ -190,57 +192,8 @@ class SKUCatalogProcessor:
             return None
     
     def _categorize_sku(self, sku):
-        """Categorize SKU based on service and description."""
-        service_name = sku['service_name'].lower()
-        description = sku['description'].lower()
-        category = sku['category']
-        
-        # Check resource family first
-        resource_family = category.get('resourceFamily', '').lower()
-        if resource_family == 'storage':
-            return 'storage'
-        elif resource_family == 'compute':
-            return 'compute'
-        elif resource_family == 'network':
-            return 'network'
-        elif resource_family == 'database':
-            return 'database'
-        elif resource_family in ['ai/ml', 'ai', 'ml']:
-            return 'ai_ml'
-        
-        # Storage services
-        if any(keyword in service_name for keyword in ['storage', 'cloud storage', 'filestore', 'memorystore']):
-            return 'storage'
-        
-        # Compute services
-        if any(keyword in service_name for keyword in ['compute', 'vm', 'instance', 'gke', 'kubernetes', 'run', 'functions']):
-            return 'compute'
-        
-        # Network services
-        if any(keyword in service_name for keyword in ['network', 'vpc', 'load balancer', 'cdn', 'gateway']):
-            return 'network'
-        
-        # Database services
-        if any(keyword in service_name for keyword in ['sql', 'database', 'firestore', 'bigtable', 'spanner', 'alloydb']):
-            return 'database'
-        
-        # AI/ML services
-        if any(keyword in service_name for keyword in ['ai', 'ml', 'vertex', 'notebooks', 'composer', 'dataflow']):
-            return 'ai_ml'
-        
-        # Check description for additional clues
-        if any(keyword in description for keyword in ['storage', 'gb', 'tb']):
-            return 'storage'
-        if any(keyword in description for keyword in ['cpu', 'ram', 'memory', 'core']):
-            return 'compute'
-        if any(keyword in description for keyword in ['network', 'bandwidth', 'transfer']):
-            return 'network'
-        if any(keyword in description for keyword in ['database', 'sql', 'query']):
-            return 'database'
-        if any(keyword in description for keyword in ['ai', 'ml', 'machine learning', 'tensorflow']):
-            return 'ai_ml'
-        
-        return 'other'
+        """Categorize SKU based on resource family, service and description."""
+        return summary_category(sku['service_name'], sku['category'].get('resourceFamily'), sku['description'])
     
     def _extract_compute_skus(self):
         """Extract compute SKUs for service plan creation."""
@@ -7,7 +7,16 @@ to discover existing GCP service plans and create comprehensive prices and price
 Optionally, it can also create service plans based on Compute Engine SKUs.
 
 Features:
-- Uses downloaded SKU catalog (full catalog JSON from gcp-sku-downloader.py)
+- Uses downloaded SKU catalog (full catalog JSON from gcp-sku-downloader.py, v1 or v2, optionally gzipped)
+- Loads only the --services given from a sharded catalog (--format sharded); without
+  --services only --discover-morpheus-plans skips loading, since every sync and validation
+  command prices, summarizes and counts the SKUs of all services
+- Caches the processed SKUs next to the catalog, so repeated runs skip JSON parsing and processing
+- Builds each catalog view (processed SKUs, compute instances, summaries) only when first used
+- Keeps SKUs as compact records, so the raw catalog is freed once they are processed
+- Classifies SKUs with keyword rules compiled into one regex per rule set
+- Maps SKUs to Morpheus price types with the declarative rules in gcp_sku_rules.json
+  (--sku-rules for another file, --explain SKU_ID to trace one SKU's mapping)
 - Discovers existing GCP service plans in Morpheus
 - Creates comprehensive Prices from SKUs (with units and costs)
 - Creates Price Sets by category and a comprehensive set
@@ -18,12 +27,16 @@ Usage:
   python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --dry-run
   python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --create-service-plans
   python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --validate-only
+  python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS_shards --services "Compute Engine" --dry-run
 """
 
 import argparse
+import gc
+import hashlib
 import json
 import logging
 import os
+import pickle
 import re
 import sys
 import time
@@ -36,11 +49,27 @@ import urllib3
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from gcp_catalog_format import catalog_files, load_catalog, shard_manifest_path
+from gcp_sku_rules import (DESCRIPTION_CATEGORIES, FAMILY_CATEGORIES, MACHINE_FAMILY_PATTERN, SERVICE_CATEGORIES,
+                           SKURuleSet, load_rules)
+
 # --- Configuration ---
 MORPHEUS_URL = os.getenv("MORPHEUS_URL", "https://localhost")
 MORPHEUS_TOKEN = os.getenv("MORPHEUS_TOKEN", "9fcc4426-c89a-4430-b6d7-99d5950fc1cc")
 GCP_REGION = os.getenv("GCP_REGION", "asia-southeast2")
 PRICE_PREFIX = os.getenv("PRICE_PREFIX", "IOH-CP")
+COMPUTE_ENGINE = "Compute Engine"
+# Bump whenever processing changes what ends up in the processed SKUs, so
+# caches written by an older version are rebuilt rather than reused
+PROCESSOR_VERSION = 5
+PROCESSED_CACHE_SUFFIX = '.processed.cache'
+CACHED_VIEWS = ('processed_skus', 'compute_skus')
+# Instance types in Compute Engine SKU descriptions, most specific first
+INSTANCE_TYPE_PATTERNS = [
+    re.compile(r'(\w+\d+[a-z]?-\w+-\d+)'),  # e2-standard-2, n2-standard-4
+    re.compile(r'(\w+\d+[a-z]?-\w+)'),      # e2-standard, n2-standard
+    re.compile(r'(\w+\d+[a-z]?-\d+)'),      # e2-2, n2-4
+]
 
 # --- Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -104,26 +133,296 @@ class MorpheusApiClient:
         return self._request('put', endpoint, payload=payload)
 
 
-class SKUCatalogProcessor:
-    """Process and analyze the comprehensive SKU catalog (full catalog from downloader)."""
+class SKURecord:
+    """A priced SKU reduced to the fields the sync uses.
+
+    Unlike the raw SKU it holds no reference into the loaded catalog, so the
+    catalog can be freed once every SKU is normalized. Strings repeated
+    across SKUs are interned.
+    """
+
+    __slots__ = ('sku_id', 'description', 'service_name', 'service_id', 'resource_family', 'resource_group',
+                 'usage_type', 'pricing_unit', 'unit_price', 'price_type', 'machine_family')
+
+    def __init__(self, sku_id: str, description: str, service_name: str, service_id: str,
+                 resource_family: str = '', resource_group: str = '', usage_type: str = '',
+                 pricing_unit: str = 'hour', unit_price: float = 0.0, price_type: Optional[str] = None,
+                 machine_family: Optional[str] = None):
+        self.sku_id = sku_id
+        self.description = description
+        self.service_name = service_name
+        self.service_id = service_id
+        self.resource_family = resource_family
+        self.resource_group = resource_group
+        self.usage_type = usage_type
+        self.pricing_unit = pricing_unit
+        self.unit_price = unit_price
+        self.price_type = price_type
+        self.machine_family = machine_family
+
+    @classmethod
+    def from_sku(cls, sku: dict, service_name: str, service_id: str) -> Optional['SKURecord']:
+        """Build a record from a raw catalog SKU; None when it has no unit price."""
+        pricing_info = sku.get('pricingInfo', [])
+        if not pricing_info:
+            return None
+        expression = pricing_info[0].get('pricingExpression', {})
+        tiered_rates = expression.get('tieredRates', [])
+        if not tiered_rates:
+            return None
+        rate = tiered_rates[0].get('unitPrice', {})
+        if not rate:
+            return None
+        unit_price = 0.0
+        if 'units' in rate and 'nanos' in rate:
+            unit_price = int(rate.get('units') or 0) + int(rate.get('nanos') or 0) / 1_000_000_000
+        category = sku.get('category', {})
+        return cls(
+            sku.get('skuId', ''),
+            sys.intern(sku.get('description', '')),
+            sys.intern(service_name),
+            sys.intern(service_id),
+            sys.intern(category.get('resourceFamily') or ''),
+            sys.intern(category.get('resourceGroup') or ''),
+            sys.intern(category.get('usageType') or ''),
+            sys.intern(expression.get('usageUnit', 'hour')),
+            unit_price,
+        )
+
+    @property
+    def category(self) -> dict:
+        """The SKU's category in the catalog's field names."""
+        return {'resourceFamily': self.resource_family, 'resourceGroup': self.resource_group,
+                'usageType': self.usage_type}
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, SKURecord) and self.astuple() == other.astuple()
+
+    def __repr__(self):
+        return f"SKURecord({self.sku_id!r}, {self.description!r})"
+
+
+class ProcessedCatalogCache:
+    """Processed SKUs of a catalog, pickled next to it so the next run skips parsing and processing.
+
+    The file holds two pickles: a small header (processor version, services
+    selection, fingerprint of the mapping rules, content hash of the catalog
+    files and their sizes and modification times) and then the processed
+    data. A header whose file
+    stats still match is trusted as is; otherwise the catalog files are
+    hashed and the cache is used only if their content is unchanged. The
+    cache is written by this script for local use: pickle files must not
+    be loaded from untrusted sources.
+    """
+
+    def __init__(self, catalog_file: str, services: Optional[List[str]] = None, rules_fingerprint: str = ''):
+        self.services = sorted(name.lower() for name in services) if services is not None else None
+        self.rules_fingerprint = rules_fingerprint
+        self.files = catalog_files(catalog_file, services)
+        manifest_path = shard_manifest_path(catalog_file)
+        base = os.path.join(os.path.dirname(manifest_path), 'processed') if manifest_path else catalog_file
+        if self.services is not None:
+            # One cache per selection, so alternating --services runs don't evict each other
+            base += '.' + hashlib.sha1('\n'.join(self.services).encode('utf-8')).hexdigest()[:10]
+        self.path = base + PROCESSED_CACHE_SUFFIX
+        self._content_hash = None
+
+    def _file_stats(self):
+        stats = []
+        for path in self.files:
+            st = os.stat(path)
+            stats.append((os.path.basename(path), st.st_size, st.st_mtime_ns))
+        return stats
+
+    def content_hash(self) -> str:
+        if self._content_hash is None:
+            digest = hashlib.blake2b(digest_size=20)
+            for path in self.files:
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def load(self) -> Optional[dict]:
+        """Return the cached data, or None when the cache is missing, stale or unreadable."""
+        try:
+            with open(self.path, 'rb') as f:
+                header = pickle.load(f)
+                if (header.get('version') != PROCESSOR_VERSION or header.get('services') != self.services
+                        or header.get('rules') != self.rules_fingerprint):
+                    return None
+                if header.get('files') == self._file_stats():
+                    self._content_hash = header.get('content_hash')
+                elif header.get('content_hash') != self.content_hash():
+                    return None
+                # Unpickling allocates only acyclic containers; collecting
+                # during it would repeatedly scan everything loaded so far
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    return pickle.load(f)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable processed catalog cache {self.path}: {e}")
+            return None
+
+    def save(self, data: dict):
+        """Atomically write ``data``, replacing what was cached before.
+
+        A cache that can't be written only costs the next run its speed-up.
+        """
+        header = {
+            'version': PROCESSOR_VERSION,
+            'services': self.services,
+            'rules': self.rules_fingerprint,
+            'files': self._file_stats(),
+            'content_hash': self.content_hash(),
+        }
+        tmp_file = f"{self.path}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write processed catalog cache {self.path}: {e}")
 
-    def __init__(self, catalog_file: str):
+
+class SKUCatalogProcessor:
+    """Process and analyze the comprehensive SKU catalog (full catalog from downloader).
+
+    Every derived view (the catalog itself, processed_skus, compute_skus, the
+    summary and the all-SKU list) is built on first use and memoized, so a
+    command pays only for the views it reads; ``view_seconds`` holds the
+    time each one took. With ``use_cache`` the processed views are read from,
+    and added to, a ProcessedCatalogCache next to the catalog. When the
+    cache provides them ``catalog`` holds everything but the raw 'services'.
+    The processed views keep no reference into the raw catalog, so
+    release_catalog() can free it once they are built. Price types come
+    from ``rules`` (by default the rules in gcp_sku_rules.json).
+    """
+
+    def __init__(self, catalog_file: str, services: Optional[List[str]] = None, use_cache: bool = True,
+                 rules: Optional[SKURuleSet] = None):
         self.catalog_file = catalog_file
-        self.catalog = self._load_catalog()
-        self.metadata_region = (self.catalog.get('metadata') or {}).get('region') or GCP_REGION
-        self.processed_skus = self._process_skus()
-        self.compute_skus = self._extract_compute_skus()
+        self.services = services
+        self.rules = rules or load_rules()
+        self.view_seconds: Dict[str, float] = {}
+        self._views: Dict[str, object] = {}
+        # Category decided by the service name and resourceFamily alone, or
+        # None where the description has to decide
+        self._key_classes: Dict[Tuple[str, str], Optional[str]] = {}
+        self._catalog_info = None
+        started = time.perf_counter()
+        self._cache = ProcessedCatalogCache(catalog_file, services, self.rules.fingerprint) if use_cache else None
+        cached = self._cache.load() if self._cache else None
+        self.cache_hit = cached is not None
+        if cached:
+            self._catalog_info = cached['catalog']
+            views = dict(cached['views'])
+            if 'processed_skus' in views:
+                views['processed_skus'] = {
+                    category: [SKURecord(*row) for row in rows]
+                    for category, rows in views['processed_skus'].items()
+                }
+            self._views.update(views)
+            logger.info(f"Loaded processed SKU catalog from cache {self._cache.path} "
+                        f"({', '.join(cached['views']) or 'no views'})")
+        self.load_seconds = time.perf_counter() - started
+
+    def _view(self, name: str, build):
+        """Return the memoized view ``name``, building and timing it on first use."""
+        if name not in self._views:
+            started = time.perf_counter()
+            self._views[name] = build()
+            self.view_seconds[name] = time.perf_counter() - started
+            logger.debug(f"Built {name} view in {self.view_seconds[name]:.3f}s")
+            if name in CACHED_VIEWS and self._cache:
+                self._save_cache()
+        return self._views[name]
+
+    def _save_cache(self):
+        # Records are stored as plain tuples, so the cache doesn't depend on
+        # the module name this script was imported under
+        views = {}
+        if 'processed_skus' in self._views:
+            views['processed_skus'] = {
+                category: [sku.astuple() for sku in skus]
+                for category, skus in self._views['processed_skus'].items()
+            }
+        if 'compute_skus' in self._views:
+            views['compute_skus'] = self._views['compute_skus']
+        self._cache.save({'catalog': self.catalog_info, 'views': views})
+
+    def build_views(self, *names: str):
+        """Build the named views now (e.g. before release_catalog()), unless already built."""
+        builders = {
+            'processed_skus': self._process_skus,
+            'compute_skus': self._extract_compute_skus,
+            'sku_summary': self._summarize,
+            'all_skus': self._all_skus,
+        }
+        for name in names:
+            if name not in builders:
+                raise ValueError(f"Unknown view '{name}' (known: {', '.join(builders)})")
+            self._view(name, builders[name])
+
+    def release_catalog(self):
+        """Drop the raw catalog; a view that still needs it later loads it again."""
+        self.catalog_info
+        self._views.pop('catalog', None)
+
+    def _raw_catalog(self):
+        return self._view('catalog', self._load_catalog)
+
+    @property
+    def catalog(self):
+        """The loaded catalog, or only its non-SKU parts while the cache has spared loading it."""
+        if 'catalog' in self._views or self._catalog_info is None:
+            return self._raw_catalog()
+        return self._catalog_info
+
+    @property
+    def catalog_info(self):
+        """Everything in the catalog but the raw 'services'."""
+        if self._catalog_info is None:
+            self._catalog_info = {key: value for key, value in self._raw_catalog().items() if key != 'services'}
+        return self._catalog_info
+
+    @property
+    def metadata_region(self):
+        return (self.catalog_info.get('metadata') or {}).get('region') or GCP_REGION
+
+    @property
+    def processed_skus(self):
+        return self._view('processed_skus', self._process_skus)
+
+    @property
+    def compute_skus(self):
+        return self._view('compute_skus', self._extract_compute_skus)
 
     def _load_catalog(self):
-        """Load the SKU catalog from file. Requires full catalog with 'services'."""
+        """Load the SKU catalog from file. Requires full catalog with 'services'.
+
+        With ``services`` set only those services (IDs or display names) are
+        loaded; from a sharded catalog the other shards are never read.
+        """
         try:
-            with open(self.catalog_file, 'r', encoding='utf-8') as f:
-                catalog = json.load(f)
+            catalog = load_catalog(self.catalog_file, services=self.services)
             if 'services' not in catalog:
                 raise ValueError("SKU catalog must be the full output from gcp-sku-downloader.py (missing 'services').")
             meta = catalog.get('metadata', {})
+            loaded = f" (only {', '.join(self.services) or 'metadata'})" if self.services is not None else ''
             logger.info(f"Loaded SKU catalog: {meta.get('total_services', '?')} services, "
-                        f"{meta.get('total_skus', '?')} SKUs")
+                        f"{meta.get('total_skus', '?')} SKUs{loaded}")
             return catalog
         except Exception as e:
             logger.error(f"Error loading SKU catalog: {e}")
@@ -139,172 +438,96 @@ class SKUCatalogProcessor:
             'ai_ml': [],
             'other': [],
         }
-        for service_id, service_data in self.catalog['services'].items():
+        for service_id, service_data in self._raw_catalog()['services'].items():
             service_name = service_data['service_info']['display_name']
             for sku in service_data.get('skus', []):
                 normalized_sku = self._normalize_sku(sku, service_name, service_id)
                 if normalized_sku:
+                    normalized_sku.price_type, normalized_sku.machine_family = \
+                        self.classify_price_type(normalized_sku)
                     category_key = self._categorize_sku(normalized_sku)
                     processed[category_key].append(normalized_sku)
         for category, skus in processed.items():
             logger.info(f"Processed {len(skus)} {category} SKUs")
         return processed
 
-    def _normalize_sku(self, sku: dict, service_name: str, service_id: str):
+    def _normalize_sku(self, sku: dict, service_name: str, service_id: str) -> Optional[SKURecord]:
         """Normalize SKU data for pricing sync."""
         try:
-            pricing_info = sku.get('pricingInfo', [])
-            if not pricing_info:
-                return None
-            tiered_rates = pricing_info[0].get('pricingExpression', {}).get('tieredRates', [])
-            if not tiered_rates:
-                return None
-            rate = tiered_rates[0].get('unitPrice', {})
-            if not rate:
-                return None
-            pricing_unit = pricing_info[0].get('pricingExpression', {}).get('usageUnit', 'hour')
-            normalized = {
-                'sku_id': sku.get('skuId', ''),
-                'description': sku.get('description', ''),
-                'service_name': service_name,
-                'service_id': service_id,
-                'category': sku.get('category', {}),
-                'pricing_unit': pricing_unit,
-                'rate': rate,
-                'tiered_rates': tiered_rates,
-                'pricing_info': pricing_info,
-                'original_sku': sku,
-            }
-            return normalized
+            return SKURecord.from_sku(sku, service_name, service_id)
         except Exception as e:
             logger.warning(f"Error normalizing SKU {sku.get('skuId', 'unknown')}: {e}")
             return None
 
-    def _categorize_sku(self, sku: dict) -> str:
+    def _key_class(self, sku: SKURecord) -> Optional[str]:
+        key = (sku.service_name, sku.resource_family)
+        if key not in self._key_classes:
+            resource_family = (sku.resource_family or '').lower()
+            self._key_classes[key] = (FAMILY_CATEGORIES.get(resource_family)
+                                      or SERVICE_CATEGORIES.classify(sku.service_name.lower()))
+        return self._key_classes[key]
+
+    def _categorize_sku(self, sku: SKURecord) -> str:
         # unchanged categorization for summary reporting
-        service_name = sku['service_name'].lower()
-        description = sku['description'].lower()
-        category = sku['category']
-        resource_family = category.get('resourceFamily', '').lower()
-        if resource_family == 'storage':
-            return 'storage'
-        if resource_family == 'compute':
-            return 'compute'
-        if resource_family == 'network':
-            return 'network'
-        if resource_family == 'database':
-            return 'database'
-        if resource_family in ['ai/ml', 'ai', 'ml']:
-            return 'ai_ml'
-        if any(k in service_name for k in ['storage', 'cloud storage', 'filestore', 'memorystore']):
-            return 'storage'
-        if any(k in service_name for k in ['compute', 'vm', 'instance', 'gke', 'kubernetes', 'run', 'functions']):
-            return 'compute'
-        if any(k in service_name for k in ['network', 'vpc', 'load balancer', 'cdn', 'gateway']):
-            return 'network'
-        if any(k in service_name for k in ['sql', 'database', 'firestore', 'bigtable', 'spanner', 'alloydb']):
-            return 'database'
-        if any(k in service_name for k in ['ai', 'ml', 'vertex', 'notebooks', 'composer', 'dataflow']):
-            return 'ai_ml'
-        if any(k in description for k in ['storage', 'gb', 'tb']):
-            return 'storage'
-        if any(k in description for k in ['cpu', 'ram', 'memory', 'core']):
-            return 'compute'
-        if any(k in description for k in ['network', 'bandwidth', 'transfer']):
-            return 'network'
-        if any(k in description for k in ['database', 'sql', 'query']):
-            return 'database'
-        if any(k in description for k in ['ai', 'ml', 'machine learning', 'tensorflow']):
-            return 'ai_ml'
-        return 'other'
+        category = self._key_class(sku)
+        return category or DESCRIPTION_CATEGORIES.classify(sku.description.lower()) or 'other'
 
     def extract_machine_family(self, text: str) -> Optional[str]:
-        name = (text or '').lower()
-        patterns = [r'^([a-z]\d+[a-z]?)-', r'\b([a-z]\d+[a-z]?)-']
-        for pat in patterns:
-            m = re.search(pat, name)
-            if m:
-                return m.group(1)
+        m = MACHINE_FAMILY_PATTERN.search((text or '').lower())
+        return m.group(1) if m else None
+
+    def classify_price_type(self, sku: SKURecord) -> Tuple[str, Optional[str]]:
+        """Return (priceTypeCode, machine_family) for SKU, as the mapping rules decide."""
+        return self.rules.classify(sku.resource_family, sku.resource_group, sku.usage_type, sku.description)
+
+    def explain_sku(self, sku_id: str) -> Optional[List[str]]:
+        """Trace how the rules map the SKU ``sku_id``, or None if the catalog doesn't have it."""
+        for skus in self.processed_skus.values():
+            for sku in skus:
+                if sku.sku_id == sku_id:
+                    result, trace = self.rules.explain(sku.resource_family, sku.resource_group,
+                                                       sku.usage_type, sku.description)
+                    return [f"SKU {sku.sku_id} ({sku.service_name}): {sku.description}"] + trace + [
+                        f"=> priceTypeCode {result[0]}, machine family {result[1] or '-'}"]
         return None
 
-    def classify_price_type(self, sku: dict) -> Tuple[str, Optional[str]]:
-        """Return (priceTypeCode, machine_family) for SKU."""
-        service_name = (sku.get('service_name') or '').lower()
-        description = (sku.get('description') or '').lower()
-        category = sku.get('category') or {}
-        resource_family = (category.get('resourceFamily') or '').lower()
-        resource_group = (category.get('resourceGroup') or '').lower()
-
-        # Storage
-        storage_keywords = ['persistent disk', 'pd-', 'hyperdisk', 'local ssd', 'ssd', 'hdd', 'filestore']
-        if resource_family == 'storage' or any(k in description for k in storage_keywords):
-            return 'storage', None
-
-        # Compute cores
-        core_keywords = ['vcpu', 'core', 'cpu']
-        if resource_family == 'compute' or resource_group == 'cpu' or any(k in description for k in core_keywords):
-            fam = self.extract_machine_family(description)
-            return 'cores', fam
-
-        # Memory
-        mem_keywords = ['ram', 'memory']
-        if resource_group == 'ram' or any(k in description for k in mem_keywords):
-            fam = self.extract_machine_family(description)
-            return 'memory', fam
-
-        # Default
-        return 'software', None
-
     def _extract_compute_skus(self):
         """Extract compute SKUs for service plan creation (instance families/types)."""
         compute_skus: List[dict] = []
-        for service_id, service_data in self.catalog['services'].items():
-            if service_data['service_info']['display_name'] == 'Compute Engine':
+        for service_id, service_data in self._raw_catalog()['services'].items():
+            if service_data['service_info']['display_name'] == COMPUTE_ENGINE:
                 for sku in service_data.get('skus', []):
                     description = sku.get('description', '').lower()
-                    sku_id = sku.get('skuId', '')
-                    instance_patterns = [
-                        r'(\w+\d+[a-z]?-\w+-\d+)',  # e2-standard-2, n2-standard-4
-                        r'(\w+\d+[a-z]?-\w+)',      # e2-standard, n2-standard
-                        r'(\w+\d+[a-z]?-\d+)',      # e2-2, n2-4
-                    ]
-                    matched = False
-                    for pattern in instance_patterns:
-                        matches = re.findall(pattern, description)
-                        if matches:
-                            for match in matches:
-                                compute_skus.append({
-                                    'instance_type': match,
-                                    'sku_id': sku_id,
-                                    'description': sku.get('description', ''),
-                                    'pricing_info': sku.get('pricingInfo', []),
-                                    'original_sku': sku,
-                                })
-                                matched = True
-                                break
-                        if matched:
+                    instance_type = 'general'
+                    for pattern in INSTANCE_TYPE_PATTERNS:
+                        match = pattern.search(description)
+                        if match:
+                            instance_type = match.group(1)
                             break
-                    if not matched:
-                        compute_skus.append({
-                            'instance_type': 'general',
-                            'sku_id': sku_id,
-                            'description': sku.get('description', ''),
-                            'pricing_info': sku.get('pricingInfo', []),
-                            'original_sku': sku,
-                        })
+                    compute_skus.append({
+                        'instance_type': sys.intern(instance_type),
+                        'sku_id': sku.get('skuId', ''),
+                        'description': sys.intern(sku.get('description', '')),
+                    })
         logger.info(f"Extracted {len(compute_skus)} compute SKUs for service plan creation")
         return compute_skus
 
     def get_sku_summary(self):
+        return self._view('sku_summary', self._summarize)
+
+    def _summarize(self):
         summary = {}
         for category, skus in self.processed_skus.items():
             summary[category] = {
                 'count': len(skus),
-                'services': list(set(sku['service_name'] for sku in skus)),
+                'services': list(set(sku.service_name for sku in skus)),
             }
         return summary
 
     def get_all_skus(self):
+        return self._view('all_skus', self._all_skus)
+
+    def _all_skus(self):
         all_skus = []
         for category_skus in self.processed_skus.values():
             all_skus.extend(category_skus)
@@ -365,24 +588,19 @@ def create_comprehensive_pricing_data(sku_processor: SKUCatalogProcessor):
     region_key = region.replace('-', '_')
     for sku in all_skus:
         try:
-            price_type, machine_family = sku_processor.classify_price_type(sku)
-            rate = sku['rate']
-            price_value = 0.0
-            if 'units' in rate and 'nanos' in rate:
-                units_val = int(rate.get('units') or 0)
-                nanos_val = int(rate.get('nanos') or 0)
-                price_value = units_val + nanos_val / 1_000_000_000
+            price_type, machine_family = sku.price_type, sku.machine_family
+            price_value = sku.unit_price
 
             # Build a stable code; include region, type, and family if applicable
             base_code_parts = [PRICE_PREFIX.lower(), 'gcp', price_type]
             if machine_family:
                 base_code_parts.append(machine_family)
             base_code_parts.append(region_key)
-            base_code_parts.append(sku['sku_id'])
+            base_code_parts.append(sku.sku_id)
             morpheus_code = '.'.join(base_code_parts)
 
             pricing_entry = {
-                'name': f"{PRICE_PREFIX} - {sku['description']}",
+                'name': f"{PRICE_PREFIX} - {sku.description}",
                 'morpheus_code': morpheus_code,
                 'priceTypeCode': price_type,
                 'priceUnit': 'hour',
@@ -393,14 +611,14 @@ def create_comprehensive_pricing_data(sku_processor: SKUCatalogProcessor):
                 'active': True,
                 'region': region,
                 'machine_family': machine_family or 'software' if price_type == 'software' else (machine_family or 'unknown'),
-                'sku_id': sku['sku_id'],
-                'service_name': sku['service_name'],
-                'category': sku['category'],
-                'description': sku['description'],
+                'sku_id': sku.sku_id,
+                'service_name': sku.service_name,
+                'category': sku.category,
+                'description': sku.description,
             }
             pricing_data.append(pricing_entry)
         except Exception as e:
-            logger.warning(f"Error processing SKU {sku.get('sku_id', 'unknown')} for pricing: {e}")
+            logger.warning(f"Error processing SKU {sku.sku_id or 'unknown'} for pricing: {e}")
             continue
     logger.info(f"Created {len(pricing_data)} pricing entries")
     return pricing_data
@@ -718,8 +936,13 @@ def validate_sync(morpheus_api: MorpheusApiClient, sku_processor: SKUCatalogProc
         gcp_prices = [p for p in existing_prices if p.get("code", "").startswith("gcp-")]
         gcp_price_sets = [ps for ps in existing_price_sets if ps.get("code", "").startswith("gcp-")]
         gcp_service_plans = [sp for sp in existing_service_plans if sp.get("code", "").startswith("gcp-")]
-        sku_summary = sku_processor.get_sku_summary()
-        total_skus = sum(summary['count'] for summary in sku_summary.values())
+        metadata = sku_processor.catalog_info.get('metadata', {})
+        if metadata.get('partial'):
+            # Prices cover the whole catalog, not only the services this run loaded
+            total_skus = metadata.get('catalog_total_skus', metadata.get('total_skus')) or 0
+        else:
+            sku_summary = sku_processor.get_sku_summary()
+            total_skus = sum(summary['count'] for summary in sku_summary.values())
         coverage = (len(gcp_prices) / total_skus * 100) if total_skus > 0 else 0
         logger.info("Validation Results:")
         logger.info(f"  Total prices in Morpheus: {len(existing_prices)} (GCP: {len(gcp_prices)})")
@@ -765,6 +988,30 @@ def _print_plans_summary(plans: List[dict]):
             print(f"   - ... and {len(items) - 3} more {family} plans")
 
 
+def _log_view_timings(sku_processor: SKUCatalogProcessor):
+    """Log how long each catalog view this run used took to build."""
+    timings = [f"{name} {seconds:.2f}s" for name, seconds in sku_processor.view_seconds.items()]
+    if sku_processor.cache_hit:
+        timings.insert(0, f"processed cache {sku_processor.load_seconds:.2f}s")
+    logger.info(f"Catalog views: {', '.join(timings) or 'none'}")
+
+
+def catalog_services_for(args) -> Optional[List[str]]:
+    """Services the requested commands read, or None when they need the whole catalog.
+
+    Only discovery reads no SKUs. Every other command creates or validates
+    prices from processed_skus across all services, which a partial load
+    would change, so it narrows only on an explicit --services.
+    """
+    if args.services:
+        return args.services
+    if args.explain:
+        return None
+    if args.discover_morpheus_plans:
+        return []
+    return None
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Final unified GCP price sync using downloaded SKU catalog",
@@ -774,16 +1021,39 @@ def main():
             "  python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --dry-run\n"
             "  python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --create-service-plans\n"
             "  python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --validate-only\n"
+            "  python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS_shards --services \"Compute Engine\"\n"
+            "  python gcp-price-sync-final.py --sku-catalog gcp_skus_YYYYMMDD_HHMMSS.json --explain 0000-0000-4771\n"
+            "\n"
+            "--services loads only the given services; with a sharded catalog\n"
+            "(gcp-sku-downloader.py --format sharded) no other shard is read. Catalog totals\n"
+            "and coverage still refer to the whole catalog. Without --services the whole\n"
+            "catalog is loaded, as prices and price sets cover every service.\n"
+            "\n"
+            "The processed SKUs are cached next to the catalog (<catalog>.processed.cache,\n"
+            "processed.cache inside a shard directory) and reused while the catalog's\n"
+            "content is unchanged; --no-processed-cache disables the cache.\n"
+            "\n"
+            "Morpheus price types come from the mapping rules in gcp_sku_rules.json\n"
+            "(--sku-rules for another file); --explain prints how the rules map one SKU\n"
+            "and exits, and 'python gcp_sku_rules.py check' prints the compiled rules.\n"
         ),
     )
     parser.add_argument('--sku-catalog', required=True,
-                        help='Path to the full SKU catalog JSON (output of gcp-sku-downloader.py)')
+                        help='Path to the full SKU catalog JSON or sharded catalog directory (output of gcp-sku-downloader.py)')
     parser.add_argument('--dry-run', action='store_true', help='Run in dry-run mode (no changes made)')
     parser.add_argument('--create-service-plans', action='store_true', help='Create service plans from compute SKUs')
     parser.add_argument('--validate-only', action='store_true', help='Only validate existing sync results')
     parser.add_argument('--create-prices', action='store_true', help='Create prices from SKU catalog')
     parser.add_argument('--create-price-sets', action='store_true', help='Create price sets from SKU catalog summary')
     parser.add_argument('--map-to-plans', action='store_true', help='Map created price sets to discovered GCP service plans')
+    parser.add_argument('--services', nargs='+', metavar='SERVICE',
+                        help='Only load these services (display names or IDs), e.g. "Compute Engine"')
+    parser.add_argument('--no-processed-cache', action='store_true',
+                        help=f'Neither read nor write the processed SKU cache (<catalog>{PROCESSED_CACHE_SUFFIX})')
+    parser.add_argument('--sku-rules', metavar='FILE',
+                        help='SKU to Morpheus price type mapping rules (default: gcp_sku_rules.json)')
+    parser.add_argument('--explain', metavar='SKU_ID',
+                        help='Print how the mapping rules classify this SKU, then exit')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
     parser.add_argument('--discover-morpheus-plans', action='store_true', help='Discover and print GCP service plans, then exit')
     args = parser.parse_args()
@@ -792,8 +1062,17 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
 
     try:
+        sku_processor = SKUCatalogProcessor(args.sku_catalog, services=catalog_services_for(args),
+                                            use_cache=not args.no_processed_cache,
+                                            rules=load_rules(args.sku_rules))
+        if args.explain:
+            trace = sku_processor.explain_sku(args.explain)
+            if trace is None:
+                logger.error(f"SKU {args.explain} is not among the priced SKUs of {args.sku_catalog}")
+                sys.exit(1)
+            print('\n'.join(trace))
+            return
         morpheus_api = MorpheusApiClient(MORPHEUS_URL, MORPHEUS_TOKEN)
-        sku_processor = SKUCatalogProcessor(args.sku_catalog)
 
         # Discover existing GCP service plans
         discovered_plans = discover_morpheus_plans(morpheus_api)
@@ -812,8 +1091,10 @@ def main():
         metadata = sku_processor.catalog.get('metadata', {})
         print(f"Region: {metadata.get('region')}")
         print(f"Download Time: {metadata.get('download_timestamp')}")
-        print(f"Total Services: {metadata.get('total_services')}")
-        print(f"Total SKUs: {metadata.get('total_skus')}")
+        print(f"Total Services: {metadata.get('catalog_total_services', metadata.get('total_services'))}")
+        print(f"Total SKUs: {metadata.get('catalog_total_skus', metadata.get('total_skus'))}")
+        if metadata.get('partial'):
+            print(f"Loaded: {metadata.get('total_services')} services, {metadata.get('total_skus')} SKUs")
 
         processed_summary = sku_processor.get_sku_summary()
         print("\nProcessed SKU Summary:")
@@ -824,6 +1105,11 @@ def main():
             if summary['services']:
                 print(f"    Services: {services_display}{ellipsis}")
 
+        # The views the run reads hold no reference into the raw catalog, so
+        # it can be freed once they are built, before the Morpheus calls
+        sku_processor.build_views('processed_skus', 'sku_summary', 'all_skus')
+        sku_processor.release_catalog()
+
         if args.validate_only:
             results = validate_sync(morpheus_api, sku_processor)
             if results:
@@ -837,8 +1123,9 @@ def main():
             print("\n=== Starting Sync ===")
 
             # Decide what to create based on flags; default is to create both if neither is specified
-            create_prices_flag = args.create_prices or (not args.create_prices and not args.create_price_sets)
-            create_price_sets_flag = args.create_price_sets or (not args.create_prices and not args.create_price_sets)
+            nothing_selected = not (args.create_prices or args.create_price_sets)
+            create_prices_flag = args.create_prices or nothing_selected
+            create_price_sets_flag = args.create_price_sets or nothing_selected
 
             pricing_data = []
             price_sets = []
@@ -948,6 +1235,7 @@ def main():
                 print(f"Total GCP Price Sets in Morpheus: {validation_results['gcp_price_sets']}")
                 print(f"Total GCP Service Plans in Morpheus: {validation_results['gcp_service_plans']}")
 
+        _log_view_timings(sku_processor)
         logger.info("Final unified price sync completed successfully!")
     except KeyboardInterrupt:
         logger.info("Sync interrupted by user")
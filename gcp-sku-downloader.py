@@ -8,14 +8,48 @@ and organizes it by service, making it easy to analyze and use for pricing sync.
 Features:
 - Downloads all available services and their SKUs
 - Organizes data by service category and SKU type
-- Handles authentication via gcloud CLI
+- Handles authentication via gcloud CLI, or in-process from a service account key
+- Caches the access token on disk and refreshes it in the background before expiry
 - Provides detailed logging and progress tracking
 - Saves data in structured JSON format
 - Includes metadata for analysis
+- Optional concurrent per-service fetching (--workers)
+- Shared token-bucket rate limiting in requests per minute (--requests-per-minute)
+- Single-pass multi-region downloads (--region r1 r2 ... or --all-regions)
+- Resumable downloads via a per-service checkpoint journal (--resume)
+- Incremental refresh that only re-pages changed services (--incremental --base)
+- Per-region negative cache of services without SKUs, re-verified in a sweep
+- Streaming NDJSON output with bounded memory (--format ndjson)
+- Compact v2 catalog format, optionally gzipped (--format json-v2 --gzip)
+- Per-service shards with a manifest for partial loading (--format sharded)
+- Pipelined fetch, normalize and write stages with bounded queues (--pipeline)
+- Per-request telemetry saved as a JSON run report and a Prometheus textfile
+- Longest-job-first scheduling from a previous run's summary (--schedule-from)
+- Optional hedged requests for slow pages at a learned latency percentile (--hedge-percentile)
+- AIMD adaptive limit on in-flight requests, up to --workers (--adaptive-concurrency)
+- Bandwidth-minimal request profile: large pages, gzip, pinned currency, narrowed fields
+- Appends price changes to a SQLite price history (--history-db)
+- Other-currency catalogs derived locally from one USD download (--derive-currency)
 
 Usage:
     python gcp-sku-downloader.py --region us-central1
     python gcp-sku-downloader.py --region asia-southeast2 --output skus_asia.json
+    python gcp-sku-downloader.py --region asia-southeast2 --workers 8
+    python gcp-sku-downloader.py --region asia-southeast2 us-central1 --output skus.json
+    python gcp-sku-downloader.py --all-regions --output skus.json
+    python gcp-sku-downloader.py --region asia-southeast2 --output skus_asia.json --resume
+    python gcp-sku-downloader.py --region asia-southeast2 --incremental --base previous.json
+    python gcp-sku-downloader.py --all-regions --format ndjson --output skus.ndjson
+    python gcp-sku-downloader.py --region asia-southeast2 --format json-v2 --gzip
+    python gcp-sku-downloader.py --region asia-southeast2 --format sharded --output gcp_skus.json
+    python gcp-sku-downloader.py --all-regions --workers 8 --pipeline
+    python gcp-sku-downloader.py --region asia-southeast2 --workers 8 --schedule-from gcp_skus_prev_summary.json
+    python gcp-sku-downloader.py --region asia-southeast2 --workers 8 --hedge-percentile 95
+    python gcp-sku-downloader.py --region asia-southeast2 --workers 32 --adaptive-concurrency
+    python gcp-sku-downloader.py --region asia-southeast2 --request-profile minimal
+    python gcp-sku-downloader.py --region asia-southeast2 --history-db gcp_price_history.db
+    python gcp-sku-downloader.py --region asia-southeast2 --derive-currency IDR EUR
+    GOOGLE_APPLICATION_CREDENTIALS=key.json python gcp-sku-downloader.py --region asia-southeast2 --token-source key-file
 """
 
 import requests
@@ -24,50 +58,1320 @@ import logging
 import time
 import urllib3
 import argparse
+import hashlib
+import heapq
 import os
+import queue
 import subprocess
 import sys
-from datetime import datetime
-from collections import defaultdict
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from collections import defaultdict, deque, namedtuple
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from gcp_catalog_format import (dump_catalog, load_catalog, service_fragment, write_catalog_from_fragments,
+                                write_service_shard, write_shard_manifest, write_sharded_catalog)
+from gcp_currency import (BASE_CURRENCY, DEFAULT_FX_MAX_AGE_HOURS, DEFAULT_FX_TABLE, FXTable, catalog_currency,
+                          convert_catalog, currency_output_file, sku_currency)
+from gcp_price_history import PriceHistoryStore, ndjson_records
+
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Global logger variable
 logger = None
 
-class GCPBillingCatalogClient:
-    """Client for fetching complete SKU data from GCP Billing Catalog API."""
-    
-    API_BASE = "https://cloudbilling.googleapis.com"
-    
-    def __init__(self, region, max_retries=5, backoff_factor=2):
-        self.region = region
-        self.session = requests.Session()
-        
-        # Setup retry strategy
-        retry_strategy = Retry(
-            total=max_retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=[429, 500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        
-        # Get access token
-        self.access_token = self._get_access_token()
-        self.session.headers.update({
-            'Authorization': f'Bearer {self.access_token}',
-            'Content-Type': 'application/json'
+# Default request budget for the Cloud Billing Catalog API
+DEFAULT_REQUESTS_PER_MINUTE = 300
+
+# Region label used when every region found in the catalog is downloaded
+ALL_REGIONS = 'all'
+
+# Negative cache defaults: how long a "no SKUs here" answer is trusted and
+# how many cached services are re-verified at the end of each run
+DEFAULT_NEGATIVE_CACHE_DIR = '.gcp_sku_cache'
+DEFAULT_NEGATIVE_CACHE_TTL_HOURS = 168
+DEFAULT_NEGATIVE_SWEEP = 25
+
+# Access tokens are cached on disk (mode 0600) and refreshed this many seconds
+# before they expire. gcloud does not report the expiry of the token it prints,
+# so it is looked up at the tokeninfo endpoint, falling back to a conservative
+# lifetime; refreshes are never attempted more often than the minimum interval.
+DEFAULT_TOKEN_CACHE_FILE = os.path.join(DEFAULT_NEGATIVE_CACHE_DIR, 'access_token.json')
+DEFAULT_TOKEN_REFRESH_MARGIN = 300
+GCLOUD_TOKEN_FALLBACK_LIFETIME = 1800
+MIN_TOKEN_REFRESH_INTERVAL = 30
+# Request profiles for listing services and SKUs. 'default' is the original
+# behaviour; 'minimal' asks for the largest page the API accepts, a gzip body
+# (Google APIs only compress when the User-Agent also mentions gzip), a pinned
+# currency and only the SKU fields the catalog and sync scripts use. The
+# catalog API has no server-side region filter and its startTime/endTime
+# parameters select price history rather than narrowing it, so neither helps.
+MAX_PAGE_SIZE = 5000
+LEGACY_PAGE_SIZE = 100
+SKU_FIELDS = ('nextPageToken,skus(skuId,description,category,serviceRegions,pricingInfo,'
+              'serviceProviderName,geoTaxonomy)')
+REQUEST_PROFILES = {
+    'default': {'page_size': LEGACY_PAGE_SIZE, 'currency_code': None, 'fields': None, 'gzip': False},
+    'minimal': {'page_size': MAX_PAGE_SIZE, 'currency_code': 'USD', 'fields': SKU_FIELDS, 'gzip': True}
+}
+GZIP_USER_AGENT = 'gcp-sku-downloader/1.0 (gzip)'
+
+# Hedging waits for this many page latencies before it starts, learns the
+# percentile over a sliding window and never hedges sooner than the floor
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 500
+HEDGE_MIN_DELAY = 0.05
+
+# Capacity of each of the two --pipeline queues (pages, finished services)
+DEFAULT_PIPELINE_QUEUE_SIZE = 64
+# A stage whose utilization or input queue fill reaches these is reported as
+# the bottleneck; otherwise the fetch stage (network) is
+PIPELINE_BUSY_THRESHOLD = 0.8
+PIPELINE_QUEUE_FILL_THRESHOLD = 0.5
+
+# Adaptive concurrency: the limit halves when the short-term latency average
+# exceeds the long-term one by this factor (after enough samples to trust it)
+CONCURRENCY_LATENCY_TOLERANCE = 2.0
+CONCURRENCY_FAST_ALPHA = 0.2
+CONCURRENCY_SLOW_ALPHA = 0.02
+CONCURRENCY_MIN_SAMPLES = 20
+# Responses that mean the server is overloaded rather than the request is wrong
+OVERLOAD_STATUSES = frozenset([429, 503])
+
+TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+
+# Outcome of one service: status is 'fetched', 'reused' (unchanged since the
+# incremental base), 'resumed' (taken from the checkpoint journal),
+# 'cached-empty' (skipped via the negative cache) or 'failed'. sku_counts is
+# always filled; skus_by_region stays empty when SKUs are streamed to disk.
+ServiceResult = namedtuple('ServiceResult', ['skus_by_region', 'elapsed', 'fingerprint', 'status', 'sku_counts'])
+
+
+def service_info(service, sku_count):
+    """The catalog's service_info entry for a service as listed by /v1/services."""
+    service_id = service['serviceId']
+    return {
+        'service_id': service_id,
+        'display_name': service.get('displayName', service_id),
+        'business_entity_name': service.get('businessEntityName', ''),
+        'sku_count': sku_count
+    }
+
+
+def region_counts(skus_by_region):
+    return {region: len(skus) for region, skus in skus_by_region.items() if skus}
+
+
+def profile_key(profile):
+    """Identify what a first page contains under a request profile (size, currency, fields)."""
+    return f"{profile['page_size']}/{profile['currency_code'] or '-'}/{'narrow' if profile['fields'] else 'full'}"
+
+DEFAULT_PROFILE_KEY = profile_key(REQUEST_PROFILES['default'])
+
+def page_fingerprint(page_skus, has_more_pages, request_profile=DEFAULT_PROFILE_KEY):
+    """Cheap change signals for a service, taken from its first SKU page."""
+    effective_times = [
+        info.get('effectiveTime', '')
+        for sku in page_skus
+        for info in sku.get('pricingInfo', ())
+    ]
+    content = json.dumps(page_skus, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return {
+        'first_page_sha256': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+        'first_page_sku_count': len(page_skus),
+        'latest_effective_time': max(effective_times, default=None),
+        'multi_page': has_more_pages,
+        'request_profile': request_profile
+    }
+
+
+def fingerprint_change(base, current):
+    """Return why a service differs from its base fingerprint, or None if it looks unchanged."""
+    if not base:
+        return 'not in base catalog'
+    if base.get('request_profile', DEFAULT_PROFILE_KEY) != current.get('request_profile', DEFAULT_PROFILE_KEY):
+        # First pages of different sizes or fields can't be compared
+        return 'request profile changed'
+    if base.get('multi_page') != current['multi_page'] or \
+            base.get('first_page_sku_count') != current['first_page_sku_count']:
+        return 'SKU count changed'
+    if base.get('latest_effective_time') != current['latest_effective_time']:
+        return 'pricing effectiveTime changed'
+    if base.get('first_page_sha256') != current['first_page_sha256']:
+        return 'first page content changed'
+    return None
+
+
+def load_service_weights(paths):
+    """Read per-service SKU counts from previous summaries or catalogs for scheduling.
+
+    With several files (one per region) a service's weight is its largest
+    count, since every region is fanned out from the same pages.
+    """
+    weights = {}
+    for path in paths:
+        data = load_catalog(path)
+        if 'services_summary' in data:
+            counts = {service_id: info.get('sku_count', 0) for service_id, info in data['services_summary'].items()}
+        else:
+            counts = {service_id: service_data['service_info'].get('sku_count', 0)
+                      for service_id, service_data in data.get('services', {}).items()}
+        for service_id, count in counts.items():
+            weights[service_id] = max(weights.get(service_id, 0), count or 0)
+    return weights
+
+def simulate_makespan(durations, workers):
+    """Wall time of greedy list scheduling of ``durations`` (in order) on ``workers`` workers."""
+    finish_times = [0.0] * max(1, workers)
+    for duration in durations:
+        heapq.heapreplace(finish_times, finish_times[0] + duration)
+    return max(finish_times)
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucketRateLimiter:
+    """Thread-safe token bucket shared by every request of a client.
+
+    Tokens refill continuously at ``requests_per_minute / 60`` per second up to
+    ``burst``. With the default burst of 1 requests are evenly spaced, so no
+    rolling minute ever sees more than the configured budget. On throttling
+    the rate is halved (down to ``min_fraction`` of the budget) and requests
+    are held until the server's Retry-After has passed; each success then
+    grows the rate back by ``recovery_step`` of the budget.
+    """
+
+    def __init__(self, requests_per_minute, burst=1, min_fraction=0.1, recovery_step=0.05):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.max_rate = requests_per_minute / 60.0
+        self.rate = self.max_rate
+        self.min_rate = self.max_rate * min_fraction
+        self.recovery_step = self.max_rate * recovery_step
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self.total_wait = 0.0
+        self.throttle_count = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # No tokens accrue while requests are held back by a Retry-After
+        if now > self._updated:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until it is available. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Reserve the token now (possibly going negative) so concurrent
+            # callers queue up behind each other instead of all waking at once
+            self.tokens -= 1
+            wait = max(0.0, self.blocked_until - now) + max(0.0, -self.tokens / self.rate)
+            self.total_wait += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self):
+        """Take one token only if it is available right now; never waits."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until or self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def on_throttle(self, retry_after=None):
+        """Shrink the rate after a 429 and hold requests for ``retry_after`` seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttle_count += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self._updated = max(self._updated, self.blocked_until)
+
+    def on_success(self):
+        """Grow the rate back towards the configured budget."""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    @property
+    def requests_per_minute(self):
+        return self.rate * 60.0
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on the number of requests in flight, shared by every worker of a client.
+
+    The limit grows by one after a full window of successes (as many as the
+    current limit) and halves, down to ``min_limit``, on a 429/503 or when
+    latency rises: a request timing out, or a fast moving average of
+    latencies exceeding a slow one by ``latency_tolerance``. Other failures
+    leave the limit as it is. Only requests started after the last decrease
+    can trigger another one, so one burst of overload halves the limit once.
+    Every change is recorded in ``timeline`` for the run report.
+    """
+
+    def __init__(self, max_limit, initial=1, min_limit=1, latency_tolerance=CONCURRENCY_LATENCY_TOLERANCE):
+        if max_limit < 1:
+            raise ValueError("max_limit must be at least 1")
+        self.max_limit = int(max_limit)
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = max(self.min_limit, min(int(initial), self.max_limit))
+        self.initial = self.limit
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.increases = 0
+        self.decreases = defaultdict(int)
+        self.total_wait = 0.0
+        self.fast_latency = None
+        self.slow_latency = None
+        self.samples = 0
+        self._successes = 0
+        self._last_decrease = float('-inf')
+        self._limit_seconds = 0.0
+        self._started = time.monotonic()
+        self._changed = self._started
+        self.timeline = [{'t': 0.0, 'limit': self.limit, 'reason': 'start'}]
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot; returns ``(started, seconds waited)`` to pass to release()."""
+        started = time.monotonic()
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            now = time.monotonic()
+            self.total_wait += now - started
+        return now, now - started
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now; returns ``started`` for release(), or None."""
+        with self._condition:
+            if self.in_flight >= self.limit:
+                return None
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started, latency=None, overloaded=False, timed_out=False):
+        """Free a slot and adapt the limit to the request's outcome and latency."""
+        with self._condition:
+            self.in_flight -= 1
+            reason = None
+            if overloaded:
+                reason = 'overload'
+            elif timed_out:
+                reason = 'latency'
+            elif latency is not None:
+                reason = self._observe_latency(latency)
+            if reason:
+                if started > self._last_decrease:
+                    self._set_limit(max(self.min_limit, self.limit // 2), reason)
+                    self.decreases[reason] += 1
+                    self._last_decrease = time.monotonic()
+                    self._successes = 0
+            elif latency is not None:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self._set_limit(self.limit + 1, 'success')
+                    self.increases += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+    def _observe_latency(self, latency):
+        """Update the latency averages; returns 'latency' when they show rising latency."""
+        self.samples += 1
+        if self.fast_latency is None:
+            self.fast_latency = self.slow_latency = latency
+            return None
+        self.fast_latency += CONCURRENCY_FAST_ALPHA * (latency - self.fast_latency)
+        self.slow_latency += CONCURRENCY_SLOW_ALPHA * (latency - self.slow_latency)
+        if (self.samples >= CONCURRENCY_MIN_SAMPLES
+                and self.fast_latency > self.latency_tolerance * self.slow_latency):
+            return 'latency'
+        return None
+
+    def _set_limit(self, limit, reason):
+        now = time.monotonic()
+        self._limit_seconds += self.limit * (now - self._changed)
+        self._changed = now
+        if limit == self.limit:
+            return
+        self.limit = limit
+        self.peak_limit = max(self.peak_limit, limit)
+        self.timeline.append({'t': round(now - self._started, 3), 'limit': limit, 'reason': reason})
+
+    def stats(self):
+        with self._condition:
+            now = time.monotonic()
+            elapsed = now - self._started
+            limit_seconds = self._limit_seconds + self.limit * (now - self._changed)
+            return {
+                'initial_limit': self.initial,
+                'final_limit': self.limit,
+                'peak_limit': self.peak_limit,
+                'max_limit': self.max_limit,
+                'mean_limit': round(limit_seconds / elapsed, 2) if elapsed > 0 else float(self.limit),
+                'increases': self.increases,
+                'decreases': dict(self.decreases),
+                'slot_wait_seconds': round(self.total_wait, 3),
+                'timeline': list(self.timeline)
+            }
+
+
+def overloaded_response(response):
+    """True when the response, or a retry urllib3 made on the way to it, was a 429/503."""
+    if response.status_code in OVERLOAD_STATUSES:
+        return True
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+    return any(entry.status in OVERLOAD_STATUSES for entry in getattr(retries, 'history', ()) or ())
+
+
+class NDJSONCatalogWriter:
+    """Streams SKUs to a newline-delimited JSON file as each page arrives.
+
+    Every line holds one SKU of one region: ``{"region", "service_id", "sku"}``.
+    Lines of services fetched concurrently may interleave. Only per-region
+    resource family counters are kept, so memory is bounded by a page rather
+    than by the catalog; the manifest and summaries are written at the end.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self.family_counts = defaultdict(lambda: defaultdict(int))
+        self._file = open(path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write_page(self, service_id, page_by_region):
+        """Append one page of SKUs; safe to call from worker threads."""
+        lines = []
+        families = defaultdict(int)
+        for region, skus in page_by_region.items():
+            for sku in skus:
+                lines.append(json.dumps({'region': region, 'service_id': service_id, 'sku': sku},
+                                        ensure_ascii=False, separators=(',', ':')))
+                families[(region, sku.get('category', {}).get('resourceFamily', 'Unknown'))] += 1
+        if not lines:
+            return
+        with self._lock:
+            self._file.write('\n'.join(lines) + '\n')
+            self.records += len(lines)
+            for (region, family), count in families.items():
+                self.family_counts[region][family] += count
+
+    def write_service(self, region, service_id, service_data):
+        """Pipeline writer interface: append one finished service of one region."""
+        self.write_page(service_id, {region: service_data['skus']})
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def write_manifest(self, catalogs, manifest_file):
+        """Write the manifest describing the stream: per-region metadata, summaries and services."""
+        manifest = {
+            'format': 'ndjson',
+            'data_file': os.path.basename(self.path),
+            'record_count': self.records,
+            'regions': {
+                region: {
+                    'metadata': catalog['metadata'],
+                    'sku_summary': catalog['sku_summary'],
+                    'services': {
+                        service_id: data['service_info']
+                        for service_id, data in catalog['services'].items()
+                    }
+                }
+                for region, catalog in catalogs.items()
+            },
+            'service_fingerprints': next(iter(catalogs.values()), {}).get('service_fingerprints', {})
+        }
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        if logger:
+            logger.info(f"Manifest saved to: {manifest_file}")
+
+
+class MeasuredQueue:
+    """Bounded queue that records how long producers and consumers wait and how full it gets."""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self.max_depth = 0
+        self._depth_total = 0
+        self._samples = 0
+
+    def _sample(self):
+        depth = self._queue.qsize()
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_total += depth
+            self._samples += 1
+
+    def put(self, item):
+        """Put ``item``, blocking while the queue is full; returns seconds blocked."""
+        started = time.monotonic()
+        self._queue.put(item)
+        self._sample()
+        return time.monotonic() - started
+
+    def get(self):
+        """Return ``(item, seconds waited)``."""
+        started = time.monotonic()
+        item = self._queue.get()
+        waited = time.monotonic() - started
+        self._sample()
+        return item, waited
+
+    def report(self):
+        with self._lock:
+            mean_depth = self._depth_total / self._samples if self._samples else 0.0
+        return {
+            'capacity': self.maxsize,
+            'max_depth': self.max_depth,
+            'mean_depth': round(mean_depth, 2),
+            'mean_fill': round(mean_depth / self.maxsize, 3)
+        }
+
+
+class PipelineStage:
+    """Counters of one pipeline stage: items and SKUs handled, and where its time went.
+
+    ``busy`` is time spent working, ``idle`` waiting for input and
+    ``blocked`` waiting for room in the next stage's queue.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.skus = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items=0, skus=0, busy=0.0, idle=0.0, blocked=0.0):
+        with self._lock:
+            self.items += items
+            self.skus += skus
+            self.busy += busy
+            self.idle += idle
+            self.blocked += blocked
+
+    def report(self, wall_seconds, measures_busy=True):
+        with self._lock:
+            report = {
+                'items': self.items,
+                'skus': self.skus,
+                'skus_per_second': round(self.skus / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+                'blocked_seconds': round(self.blocked, 3)
+            }
+            if measures_busy:
+                report.update({
+                    'busy_seconds': round(self.busy, 3),
+                    'idle_seconds': round(self.idle, 3),
+                    'utilization': round(self.busy / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+                    'busy_skus_per_second': round(self.skus / self.busy, 1) if self.busy > 0 else None
+                })
+        return report
+
+
+class DownloadPipeline:
+    """Overlaps fetching, normalization and writing through two bounded queues.
+
+    Fetch workers put every page on the ``pages`` queue as it arrives. One
+    normalizer thread groups each service's SKUs by region and resource
+    family, keeps the family counts up to date and, once the service is
+    complete, hands it to one writer thread through the ``services`` queue.
+    A full queue blocks the stage feeding it, so memory held in flight is
+    bounded by the queue sizes. report() shows each stage's throughput and
+    each queue's depth, and names the stage that held the others up.
+
+    With ``retain`` the normalized services are kept for the returned
+    catalogs; without it (NDJSON output) they are dropped once written.
+    """
+
+    def __init__(self, writer=None, queue_size=DEFAULT_PIPELINE_QUEUE_SIZE, retain=True):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.writer = writer
+        self.retain = retain
+        self.pages = MeasuredQueue('pages', queue_size)
+        self.finished = MeasuredQueue('services', queue_size)
+        self.stages = {name: PipelineStage(name) for name in ('fetch', 'normalize', 'write')}
+        self.services = defaultdict(dict)
+        self.family_counts = defaultdict(lambda: defaultdict(int))
+        self.finalize_seconds = 0.0
+        self.error = None
+        self._pending = {}
+        self._threads = []
+        self._started = None
+        self._wall = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._threads = [threading.Thread(target=self._normalize_loop, name='sku-normalize', daemon=True)]
+        if self.writer:
+            self._threads.append(threading.Thread(target=self._write_loop, name='sku-write', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def put_page(self, service_id, page_by_region):
+        """Queue one page of SKUs (``{region: [sku, ...]}``); called from fetch workers."""
+        blocked = self.pages.put(('page', service_id, page_by_region))
+        self.stages['fetch'].add(1, sum(len(skus) for skus in page_by_region.values()), blocked=blocked)
+
+    def service_done(self, service, failed=False):
+        """Mark a service complete; the pages of a failed service are discarded."""
+        blocked = self.pages.put(('done', service, failed))
+        self.stages['fetch'].add(blocked=blocked)
+
+    def close(self):
+        """Drain both queues and stop the stage threads; raises if a stage failed."""
+        self.pages.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._wall = time.monotonic() - self._started
+        if self.error:
+            raise RuntimeError(f"Download pipeline failed: {self.error}") from self.error
+
+    def _normalize_loop(self):
+        stage = self.stages['normalize']
+        while True:
+            item, idle = self.pages.get()
+            if item is None:
+                break
+            started = time.monotonic()
+            kind, subject, payload = item
+            blocked = 0.0
+            skus = 0
+            try:
+                if kind == 'page':
+                    skus = self._normalize_page(subject, payload)
+                else:
+                    blocked = self._finish_service(subject, failed=payload)
+            except Exception as e:
+                self.error = self.error or e
+                if logger:
+                    logger.error(f"Pipeline normalizer error: {e}")
+            stage.add(1 if kind == 'page' else 0, skus, time.monotonic() - started - blocked, idle, blocked)
+        if self.writer:
+            self.finished.put(None)
+
+    def _normalize_page(self, service_id, page_by_region):
+        pending = self._pending.setdefault(service_id, {})
+        count = 0
+        for region, skus in page_by_region.items():
+            entry = pending.get(region)
+            if entry is None:
+                entry = pending[region] = {'skus': [], 'categories': defaultdict(list)}
+            entry['skus'].extend(skus)
+            categories = entry['categories']
+            for sku in skus:
+                categories[sku.get('category', {}).get('resourceFamily', 'Unknown')].append(sku)
+            count += len(skus)
+        return count
+
+    def _finish_service(self, service, failed):
+        """Publish a completed service per region; returns seconds blocked on the writer."""
+        pending = self._pending.pop(service['serviceId'], {})
+        if failed:
+            return 0.0
+        blocked = 0.0
+        for region, entry in pending.items():
+            categories = dict(entry['categories'])
+            service_data = {
+                'service_info': service_info(service, len(entry['skus'])),
+                'skus': entry['skus'],
+                'categories': categories
+            }
+            for family, skus in categories.items():
+                self.family_counts[region][family] += len(skus)
+            if self.retain:
+                self.services[region][service['serviceId']] = service_data
+            if self.writer:
+                blocked += self.finished.put((region, service['serviceId'], service_data))
+        return blocked
+
+    def _write_loop(self):
+        stage = self.stages['write']
+        while True:
+            item, idle = self.finished.get()
+            if item is None:
+                break
+            region, service_id, service_data = item
+            started = time.monotonic()
+            try:
+                self.writer.write_service(region, service_id, service_data)
+            except Exception as e:
+                self.error = self.error or e
+                if logger:
+                    logger.error(f"Pipeline writer error for {service_id}: {e}")
+            stage.add(1, len(service_data['skus']), time.monotonic() - started, idle)
+
+    def merge_into(self, catalogs):
+        """Fill the normalized SKUs and family counts into catalogs built from service info only."""
+        for region, catalog in catalogs.items():
+            for family, count in self.family_counts[region].items():
+                catalog['sku_summary'][family] += count
+                catalog['category_summary'][family] += count
+            if not self.retain:
+                continue
+            for service_id, service_data in catalog['services'].items():
+                normalized = self.services[region].get(service_id)
+                if normalized:
+                    service_data['skus'] = normalized['skus']
+                    service_data['categories'] = normalized['categories']
+
+    def bottleneck(self, stages, queues):
+        """The furthest downstream stage that was saturated or kept its input queue full."""
+        for name, queue_name in (('write', 'services'), ('normalize', 'pages')):
+            stage = stages.get(name)
+            if stage and stage['items'] and (stage['utilization'] >= PIPELINE_BUSY_THRESHOLD
+                                             or queues[queue_name]['mean_fill'] >= PIPELINE_QUEUE_FILL_THRESHOLD):
+                return name
+        return 'fetch'
+
+    def report(self):
+        if self._wall is not None:
+            wall = self._wall
+        else:
+            wall = time.monotonic() - self._started if self._started else 0.0
+        stages = {
+            name: stage.report(wall, measures_busy=name != 'fetch')
+            for name, stage in self.stages.items()
+            if name != 'write' or self.writer
+        }
+        queues = {self.pages.name: self.pages.report()}
+        if self.writer:
+            queues[self.finished.name] = self.finished.report()
+        return {
+            'wall_seconds': round(wall, 3),
+            'finalize_seconds': round(self.finalize_seconds, 3),
+            'stages': stages,
+            'queues': queues,
+            'bottleneck': self.bottleneck(stages, queues)
+        }
+
+
+class FragmentCatalogWriter:
+    """Pipeline writer for --format json/json-v2.
+
+    Each finished service is serialized straight away into a part file next
+    to the catalog; finalize() splices the parts between the catalog's
+    metadata and summaries, which are only known at the end.
+    """
+
+    # JSON text never contains a raw NUL, so it separates the fragments
+    SEPARATOR = '\x00'
+
+    def __init__(self, output_file, multi_region, version=1):
+        self.output_file = output_file
+        self.multi_region = multi_region
+        self.version = version
+        self._parts = {}
+
+    def path_for(self, region):
+        return region_output_file(self.output_file, region, self.multi_region)
+
+    def _part_path(self, region):
+        return uncompressed_path(self.path_for(region)) + '.services.part'
+
+    def write_service(self, region, service_id, service_data):
+        part = self._parts.get(region)
+        if part is None:
+            part = self._parts[region] = open(self._part_path(region), 'w', encoding='utf-8')
+        part.write(service_fragment(service_id, service_data, self.version) + self.SEPARATOR)
+
+    def _fragments(self, region):
+        with open(self._part_path(region), 'r', encoding='utf-8') as f:
+            buffered = ''
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    break
+                *complete, buffered = (buffered + chunk).split(self.SEPARATOR)
+                yield from complete
+
+    def finalize(self, region, catalog):
+        """Write the region's catalog from its fragments plus its summary; returns the catalog path."""
+        path = self.path_for(region)
+        part = self._parts.pop(region, None)
+        if part:
+            part.close()
+            write_catalog_from_fragments(catalog, self._fragments(region), path, self.version)
+            os.remove(self._part_path(region))
+        else:
+            write_catalog_from_fragments(catalog, [], path, self.version)
+        if logger:
+            logger.info(f"Catalog saved to: {path}")
+        save_summary(catalog, uncompressed_path(path).replace('.json', '_summary.json'))
+        return path
+
+
+class ShardCatalogWriter:
+    """Pipeline writer for --format sharded: writes each finished service's shard as it arrives."""
+
+    def __init__(self, output_file, multi_region):
+        self.output_file = output_file
+        self.multi_region = multi_region
+        self.shards = defaultdict(dict)
+
+    def directory_for(self, region):
+        return shard_directory(region_output_file(self.output_file, region, self.multi_region))
+
+    def write_service(self, region, service_id, service_data):
+        directory = self.directory_for(region)
+        os.makedirs(directory, exist_ok=True)
+        self.shards[region][service_id] = write_service_shard(directory, service_id, service_data['skus'])
+
+    def finalize(self, region, catalog):
+        """Write the region's manifest and summary; returns the manifest path."""
+        directory = self.directory_for(region)
+        os.makedirs(directory, exist_ok=True)
+        manifest_file = write_shard_manifest(catalog, directory, self.shards.pop(region, {}))
+        if logger:
+            logger.info(f"Sharded catalog saved to: {manifest_file} ({len(catalog['services'])} services)")
+        output_file = region_output_file(self.output_file, region, self.multi_region)
+        save_summary(catalog, uncompressed_path(output_file).replace('.json', '_summary.json'))
+        return manifest_file
+
+
+class IncrementalBase:
+    """A previous catalog used by --incremental to skip re-paging unchanged services."""
+
+    def __init__(self, catalog):
+        self.region = catalog.get('metadata', {}).get('region')
+        self.download_timestamp = catalog.get('metadata', {}).get('download_timestamp')
+        self.fingerprints = catalog.get('service_fingerprints', {})
+        self.services = catalog.get('services', {})
+        if not self.fingerprints and logger:
+            logger.warning("Base catalog has no service fingerprints; every service will be re-paged")
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_catalog(path))
+
+    def fingerprint(self, service_id):
+        return self.fingerprints.get(service_id)
+
+    def skus_by_region(self, service_id):
+        service_data = self.services.get(service_id)
+        return {self.region: service_data['skus']} if service_data and service_data.get('skus') else {}
+
+
+class NegativeCache:
+    """Persistent per-region record of services that returned no SKUs there.
+
+    Each region has its own ``negative_<region>.json`` mapping service IDs to
+    when they were last verified empty (and their first-page fingerprint).
+    A service is skipped while its entries for every requested region are
+    younger than the TTL; with --all-regions the ``all`` entry means the
+    service has no SKUs anywhere.
+
+    What a server reports empty says nothing about another one, so entries
+    for an ``api_base`` other than the Cloud Billing API (such as a
+    gcp-catalog-standin.py server) go to files tagged with a hash of its URL.
+    """
+
+    def __init__(self, cache_dir, regions, ttl_hours=DEFAULT_NEGATIVE_CACHE_TTL_HOURS, api_base=None):
+        self.cache_dir = cache_dir
+        self.keys = list(regions) if regions else [ALL_REGIONS]
+        self.ttl = timedelta(hours=ttl_hours)
+        api_base = (api_base or GCPBillingCatalogClient.API_BASE).rstrip('/')
+        self.tag = ('' if api_base == GCPBillingCatalogClient.API_BASE
+                    else '.' + hashlib.sha1(api_base.encode('utf-8')).hexdigest()[:10])
+        self.entries = {key: self._load(key) for key in self.keys}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"negative_{key}{self.tag}.json")
+
+    def _load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            if logger:
+                logger.warning(f"Ignoring unreadable negative cache {path}: {e}")
+            return {}
+
+    def _verified_at(self, key, service_id):
+        entry = self.entries[key].get(service_id)
+        return datetime.fromisoformat(entry['verified_at']) if entry else None
+
+    def is_fresh(self, service_id):
+        """True if the service is known to have no SKUs in every requested region."""
+        cutoff = datetime.now() - self.ttl
+        for key in self.keys:
+            verified_at = self._verified_at(key, service_id)
+            if verified_at is None or verified_at < cutoff:
+                return False
+        return True
+
+    def oldest(self, service_ids, limit):
+        """The ``limit`` least recently verified of ``service_ids``."""
+        return sorted(
+            service_ids,
+            key=lambda service_id: min(self._verified_at(key, service_id) for key in self.keys)
+        )[:limit]
+
+    def fingerprint(self, service_id):
+        entry = self.entries[self.keys[0]].get(service_id)
+        return entry.get('fingerprint') if entry else None
+
+    def update(self, service_id, skus_by_region, fingerprint):
+        """Record a freshly verified service: cache empty regions, forget the others."""
+        verified_at = datetime.now().isoformat()
+        for key in self.keys:
+            empty = not skus_by_region if key == ALL_REGIONS else not skus_by_region.get(key)
+            if empty:
+                self.entries[key][service_id] = {'verified_at': verified_at, 'fingerprint': fingerprint}
+            else:
+                self.entries[key].pop(service_id, None)
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for key in self.keys:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries[key], f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+
+
+class CheckpointJournal:
+    """Append-only NDJSON journal of completed services, used by --resume.
+
+    The first line records the requested regions; every following line holds
+    one finished service and its SKUs grouped by region. A line cut short by
+    an interrupted write is ignored when the journal is read back.
+    """
+
+    def __init__(self, path, regions):
+        self.path = path
+        self.regions = regions
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_for(output_file):
+        return f"{output_file}.journal"
+
+    def load(self):
+        """Return ``{service_id: (service, skus_by_region, fingerprint)}`` for completed services."""
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    if logger:
+                        logger.warning(f"Ignoring incomplete journal line {line_number} in {self.path}")
+                    continue
+                if entry.get('type') == 'header':
+                    if entry.get('regions') != self.regions:
+                        raise ValueError(
+                            f"Journal {self.path} was written for regions {entry.get('regions') or ALL_REGIONS}, "
+                            f"not {self.regions or ALL_REGIONS}"
+                        )
+                elif entry.get('type') == 'service':
+                    service = entry['service']
+                    completed[service['serviceId']] = (
+                        service, entry['skus_by_region'], entry.get('fingerprint')
+                    )
+        return completed
+
+    def open(self, resume=False):
+        """Open the journal for appending; a fresh run truncates it and writes a header."""
+        append = resume and os.path.exists(self.path)
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        if not append:
+            self._write({'type': 'header', 'regions': self.regions,
+                         'started': datetime.now().isoformat()})
+
+    def record(self, service, result):
+        """Append one completed service; safe to call from worker threads."""
+        self._write({'type': 'service', 'service': service,
+                     'skus_by_region': result.skus_by_region, 'fingerprint': result.fingerprint})
+
+    def _write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class RequestHedger:
+    """Decides when a slow request gets a duplicate, from latencies seen during the run.
+
+    Once ``min_samples`` latencies are known, a request still running after
+    the ``percentile`` latency of the recent window is hedged: a duplicate
+    is sent and whichever response arrives first is used.
+    """
+
+    def __init__(self, percentile=0.95, min_samples=HEDGE_MIN_SAMPLES, window=HEDGE_WINDOW,
+                 min_delay=HEDGE_MIN_DELAY):
+        if not 0 < percentile < 1:
+            raise ValueError("percentile must be between 0 and 1")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.fired = 0
+        self.won = 0
+        self.skipped = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self):
+        """Seconds to wait before hedging, or None while still learning."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return max(self.min_delay, latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))])
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        return {'hedge_percentile': self.percentile, 'hedges_fired': self.fired,
+                'hedges_won': self.won, 'hedges_skipped': self.skipped}
+
+class DownloadTelemetry:
+    """Thread-safe request and per-service counters for one download run.
+
+    Every API response is recorded with its latency, body size, the retries
+    urllib3 made underneath it and the rate-limit wait before it was sent;
+    requests are attributed to the service whose SKUs they page.
+    """
+
+    SERVICES_LIST = 'services-list'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.services = defaultdict(lambda: {
+            'requests': 0,
+            'pages': 0,
+            'response_bytes': 0,
+            'wire_bytes': 0,
+            'skus_listed': 0,
+            'request_seconds': 0.0,
+            'retries': 0,
+            'throttled': 0,
+            'unauthorized': 0,
+            'hedges': 0,
+            'hedges_won': 0,
+            'rate_limit_wait_seconds': 0.0
         })
-        
+        self.service_results = {}
+
+    @classmethod
+    def service_key(cls, endpoint):
+        parts = endpoint.strip('/').split('/')
+        return parts[2] if len(parts) >= 3 and parts[1] == 'services' else cls.SERVICES_LIST
+
+    def record_request(self, endpoint, seconds, response, rate_limit_wait=0.0):
+        # urllib3 attaches the Retry object it used, whose history lists each retry
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        urllib3_retries = len(retries.history) if retries is not None else 0
+        body_bytes = len(response.content or b'')
+        wire_bytes = self.wire_bytes(response, body_bytes)
+        with self._lock:
+            self.latencies.append(seconds)
+            counters = self.services[self.service_key(endpoint)]
+            counters['requests'] += 1
+            counters['request_seconds'] += seconds
+            counters['response_bytes'] += body_bytes
+            counters['wire_bytes'] += wire_bytes
+            counters['retries'] += urllib3_retries
+            counters['rate_limit_wait_seconds'] += rate_limit_wait
+            if response.status_code == 429:
+                counters['throttled'] += 1
+            elif response.status_code == 401:
+                counters['unauthorized'] += 1
+            elif response.ok:
+                counters['pages'] += 1
+
+    @staticmethod
+    def wire_bytes(response, body_bytes):
+        """Bytes actually transferred for the body, i.e. before gzip decoding."""
+        try:
+            return int(response.raw.tell())
+        except (AttributeError, TypeError, ValueError, OSError):
+            pass
+        try:
+            return int(response.headers['Content-Length'])
+        except (KeyError, TypeError, ValueError):
+            return body_bytes
+
+    def record_skus_listed(self, service_id, count):
+        with self._lock:
+            self.services[service_id]['skus_listed'] += count
+
+    def record_hedge(self, endpoint, won=False):
+        """Count a duplicate request fired for a slow one, or a duplicate that answered first."""
+        with self._lock:
+            self.services[self.service_key(endpoint)]['hedges_won' if won else 'hedges'] += 1
+
+    def record_error(self, endpoint):
+        """Count a request that raised instead of returning a response."""
+        with self._lock:
+            self.errors += 1
+            self.services[self.service_key(endpoint)]['requests'] += 1
+
+    def record_service(self, service_id, service_name, result):
+        with self._lock:
+            self.service_results[service_id] = {
+                'display_name': service_name,
+                'status': result.status,
+                'elapsed_seconds': result.elapsed,
+                'skus': sum(result.sku_counts.values())
+            }
+
+    def latency_summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return {'count': 0}
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        return {
+            'count': len(latencies),
+            'mean': round(sum(latencies) / len(latencies), 4),
+            'p50': round(percentile(0.5), 4),
+            'p90': round(percentile(0.9), 4),
+            'p99': round(percentile(0.99), 4),
+            'max': round(latencies[-1], 4)
+        }
+
+    def estimated_default_requests(self):
+        """Pages the default profile (100 per page) would have needed for the same listings."""
+        with self._lock:
+            listed = [counters['skus_listed'] for key, counters in self.services.items()
+                      if key != self.SERVICES_LIST and counters['pages']]
+            services_pages = self.services[self.SERVICES_LIST]['pages'] if self.SERVICES_LIST in self.services else 0
+        sku_pages = sum(max(1, -(-count // LEGACY_PAGE_SIZE)) for count in listed)
+        return sku_pages + services_pages
+
+    def report(self, run_stats=None, regions=None, request_profile=None):
+        """Build the JSON run report; services are sorted slowest first."""
+        with self._lock:
+            services = {key: dict(counters) for key, counters in self.services.items()}
+            results = dict(self.service_results)
+            errors = self.errors
+        totals = defaultdict(float)
+        for counters in services.values():
+            for name, value in counters.items():
+                totals[name] += value
+        per_service = []
+        for service_id in set(services) | set(results):
+            if service_id == self.SERVICES_LIST:
+                continue
+            entry = {'service_id': service_id}
+            entry.update(results.get(service_id, {}))
+            entry.update(services.get(service_id, {}))
+            for name in ('elapsed_seconds', 'request_seconds', 'rate_limit_wait_seconds'):
+                if name in entry:
+                    entry[name] = round(entry[name], 4)
+            per_service.append(entry)
+        per_service.sort(key=lambda entry: (-entry.get('elapsed_seconds', 0.0), entry['service_id']))
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'regions': regions or [ALL_REGIONS],
+            'run': run_stats or {},
+            'requests': {
+                'total': int(totals['requests']),
+                'pages': int(totals['pages']),
+                'response_bytes': int(totals['response_bytes']),
+                'wire_bytes': int(totals['wire_bytes']),
+                'urllib3_retries': int(totals['retries']),
+                'throttled_429': int(totals['throttled']),
+                'unauthorized_401': int(totals['unauthorized']),
+                'errors': errors,
+                'hedges_fired': int(totals['hedges']),
+                'hedges_won': int(totals['hedges_won']),
+                'rate_limit_wait_seconds': round(totals['rate_limit_wait_seconds'], 3),
+                'latency_seconds': self.latency_summary()
+            },
+            'request_profile': self.profile_summary(request_profile, int(totals['pages'])),
+            'services_list': services.get(self.SERVICES_LIST, {}),
+            'services': per_service
+        }
+
+    def profile_summary(self, request_profile, pages):
+        """Describe the request profile and how many pages the default profile would have needed."""
+        summary = dict(request_profile or {'name': 'default', **REQUEST_PROFILES['default']})
+        summary['estimated_default_profile_pages'] = self.estimated_default_requests()
+        summary['pages_saved'] = summary['estimated_default_profile_pages'] - pages
+        return summary
+
+class AccessTokenProvider:
+    """Access tokens for the Cloud Billing API, cached on disk and refreshed before expiry.
+
+    Tokens come from ``gcloud auth print-access-token`` or, with
+    ``key_file``, are minted in-process from a service account key (needs
+    the optional google-auth package) so gcloud is never spawned.
+    """
+
+    def __init__(self, cache_file=DEFAULT_TOKEN_CACHE_FILE, key_file=None,
+                 refresh_margin=DEFAULT_TOKEN_REFRESH_MARGIN):
+        self.cache_file = cache_file
+        self.key_file = key_file
+        self.refresh_margin = refresh_margin
+        self.refresh_count = 0
+        self._token = None
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self._credentials = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._load_cache()
+
+    @property
+    def source(self):
+        """Identity the cached token belongs to; a cache for another identity is ignored."""
+        if self.key_file:
+            return f"key-file:{os.path.abspath(self.key_file)}"
+        account = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS') or os.environ.get('CLOUDSDK_CORE_ACCOUNT')
+        return f"gcloud:{account or 'default'}"
+
+    @property
+    def expires_at(self):
+        return self._expires_at
+
+    def token(self):
+        """Return a valid token, fetching one first if it is missing or about to expire."""
+        with self._lock:
+            if self._refresh_due():
+                self._refresh_locked()
+            return self._token
+
+    def invalidate(self, stale_token):
+        """Drop ``stale_token`` after a 401 so the next token() fetches a fresh one.
+
+        Workers that hit the same 401 concurrently only cause one refresh.
+        """
+        with self._lock:
+            if self._token == stale_token:
+                self._token = None
+                self._fetched_at = None
+
+    def start(self):
+        """Refresh the token in a background thread shortly before it expires."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name='token-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _refresh_due(self):
+        if not self._token or time.time() >= self._expires_at:
+            return True
+        recently_fetched = (self._fetched_at is not None
+                            and time.monotonic() - self._fetched_at < MIN_TOKEN_REFRESH_INTERVAL)
+        return time.time() >= self._expires_at - self.refresh_margin and not recently_fetched
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                delay = self._expires_at - self.refresh_margin - time.time() if self._token else 0
+            if self._stop.wait(max(delay, MIN_TOKEN_REFRESH_INTERVAL)):
+                return
+            try:
+                with self._lock:
+                    if self._refresh_due():
+                        self._refresh_locked()
+            except Exception as e:
+                if logger:
+                    logger.warning(f"Background access token refresh failed: {e}")
+
+    def _refresh_locked(self):
+        if self.key_file:
+            token, expires_at = self._mint_from_key_file()
+        else:
+            token, expires_at = self._fetch_from_gcloud()
+        self._token = token
+        self._expires_at = expires_at
+        self._fetched_at = time.monotonic()
+        self.refresh_count += 1
+        self._save_cache()
         if logger:
-            logger.info(f"Initialized GCP Billing Catalog client for region: {self.region}")
+            remaining = max(0, int(expires_at - time.time()))
+            logger.info(f"Obtained GCP access token (valid for {remaining // 60} more minutes)")
 
-    def _get_access_token(self):
+    def _fetch_from_gcloud(self):
         """Get access token from gcloud CLI."""
         try:
             if logger:
@@ -92,9 +1396,7 @@ class GCPBillingCatalogClient:
             if not token:
                 raise ValueError("Empty access token received from gcloud")
             
-            if logger:
-                logger.info("Successfully obtained GCP access token")
-            return token
+            return token, self._lookup_expiry(token)
             
         except subprocess.CalledProcessError as e:
             if logger:
@@ -106,18 +1408,285 @@ class GCPBillingCatalogClient:
                 logger.error(f"Unexpected error getting access token: {e}")
             raise
 
-    def _make_request(self, endpoint, params=None):
-        """Make authenticated request to GCP API."""
-        url = f"{self.API_BASE}{endpoint}"
+    def _lookup_expiry(self, token):
+        """Ask the tokeninfo endpoint when a gcloud token expires."""
         try:
-            response = self.session.get(url, params=params, timeout=30)
+            response = requests.post(TOKENINFO_URL, data={'access_token': token}, timeout=10)
             response.raise_for_status()
-            return response.json()
+            return float(response.json()['exp'])
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            if logger:
+                logger.debug(f"Could not look up token expiry ({e}); assuming "
+                             f"{GCLOUD_TOKEN_FALLBACK_LIFETIME // 60} minutes")
+            return time.time() + GCLOUD_TOKEN_FALLBACK_LIFETIME
+
+    def _mint_from_key_file(self):
+        """Mint a token from the service account key without spawning gcloud."""
+        try:
+            from google.oauth2 import service_account
+            from google.auth.transport.requests import Request
+        except ImportError as e:
+            raise RuntimeError("--token-source key-file requires the google-auth package "
+                               "(pip install google-auth)") from e
+        if self._credentials is None:
+            self._credentials = service_account.Credentials.from_service_account_file(
+                self.key_file, scopes=[CLOUD_PLATFORM_SCOPE])
+        self._credentials.refresh(Request())
+        # google-auth reports expiry as a naive UTC datetime
+        expiry = self._credentials.expiry.replace(tzinfo=timezone.utc)
+        return self._credentials.token, expiry.timestamp()
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            if logger:
+                logger.warning(f"Ignoring unreadable token cache {self.cache_file}: {e}")
+            return
+        if cached.get('source') == self.source and cached.get('expires_at', 0) - self.refresh_margin > time.time():
+            self._token = cached['access_token']
+            self._expires_at = cached['expires_at']
+            if logger:
+                logger.info(f"Using cached GCP access token from {self.cache_file}")
+
+    def _save_cache(self):
+        """Atomically write the token cache, readable by the owner only."""
+        if not self.cache_file:
+            return
+        cache_dir = os.path.dirname(self.cache_file)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(tmp_file, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'source': self.source, 'access_token': self._token,
+                       'expires_at': self._expires_at}, f)
+        os.replace(tmp_file, self.cache_file)
+
+class GCPBillingCatalogClient:
+    """Client for fetching complete SKU data from GCP Billing Catalog API."""
+    
+    API_BASE = "https://cloudbilling.googleapis.com"
+    
+    def __init__(self, region, max_retries=5, backoff_factor=2, workers=1, access_token=None,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, rate_limiter=None, incremental_base=None,
+                 token_provider=None, api_base=None, service_weights=None, hedge_percentile=None,
+                 request_profile='default', currency_code=None, adaptive_concurrency=False,
+                 initial_concurrency=1):
+        # region may be a single region, a list of regions, or None for all regions
+        if region is None:
+            self.regions = None
+        elif isinstance(region, str):
+            self.regions = [region]
+        else:
+            self.regions = list(dict.fromkeys(region))
+        self.region = self.regions[0] if self.regions else ALL_REGIONS
+        self._region_set = frozenset(self.regions) if self.regions else None
+        self.workers = max(1, int(workers))
+        # Overridable so the client can be pointed at gcp-catalog-standin.py
+        self.api_base = (api_base or self.API_BASE).rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = rate_limiter or TokenBucketRateLimiter(requests_per_minute)
+        self.incremental_base = incremental_base
+        self.service_weights = service_weights or {}
+        self.request_profile = request_profile
+        self.profile = dict(REQUEST_PROFILES[request_profile])
+        if currency_code:
+            self.profile['currency_code'] = currency_code
+        self.hedger = RequestHedger(hedge_percentile) if hedge_percentile else None
+        # With adaptive concurrency the worker count is only the ceiling of
+        # the in-flight limit the controller settles on
+        self.concurrency = None
+        if adaptive_concurrency:
+            self.concurrency = AdaptiveConcurrencyLimiter(self.workers, initial=initial_concurrency)
+        self._hedge_executor = None
+        if self.hedger:
+            # Primary and hedged attempts both run here, so a request that is
+            # waiting on its first attempt can still start a second one
+            self._hedge_executor = ThreadPoolExecutor(max_workers=self.workers * 2,
+                                                      thread_name_prefix='sku-hedge')
+        self.stream_writer = None
+        self.pipeline = None
+        self.last_run_stats = {}
+        self.refresh_report = None
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.telemetry = DownloadTelemetry()
+        self.session = requests.Session()
+        
+        # Setup retry strategy; the connection pool is sized to the worker
+        # count (doubled when hedging) so concurrent fetches never block
+        # waiting for a connection.
+        # 429s are handled in _make_request so the rate limiter sees them;
+        # urllib3 would otherwise retry any 429 carrying Retry-After itself.
+        retry_strategy = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[500, 502, 503, 504],
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=self.workers,
+            pool_maxsize=self.workers * (2 if self.hedger else 1)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # A fixed access_token is used as given; otherwise the provider keeps
+        # a valid token and the Authorization header is set per request
+        self._static_token = access_token
+        self.token_provider = None if access_token else (token_provider or AccessTokenProvider())
+        if self.token_provider:
+            self.token_provider.token()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if self.profile['gzip']:
+            self.session.headers.update({'Accept-Encoding': 'gzip', 'User-Agent': GZIP_USER_AGENT})
+        
+        if logger:
+            logger.info(f"Initialized GCP Billing Catalog client for region(s): {self.region_label}")
+
+    @property
+    def region_label(self):
+        return ', '.join(self.regions) if self.regions else ALL_REGIONS
+
+    @property
+    def access_token(self):
+        return self._static_token or self.token_provider.token()
+
+    def _make_request(self, endpoint, params=None):
+        """Make authenticated, rate-limited request to GCP API."""
+        url = f"{self.api_base}{endpoint}"
+        reauthenticated = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                # A token refresh is not an API request, so it doesn't hold a slot
+                token = self.access_token
+                slot_started, slot_wait = self.concurrency.acquire() if self.concurrency else (None, 0.0)
+                slot_latency, overloaded, timed_out = None, False, False
+                try:
+                    wait = slot_wait + self.rate_limiter.acquire()
+                    with self._count_lock:
+                        self.request_count += 1
+                    try:
+                        response, latency = self._send(url, params, token, endpoint)
+                    except requests.exceptions.RequestException as e:
+                        # Only a timeout says the server is slowing down; a
+                        # connection, DNS or TLS failure says nothing about load
+                        self.telemetry.record_error(endpoint)
+                        timed_out = isinstance(e, requests.exceptions.Timeout)
+                        raise
+                    # Latency of a response urllib3 had to retry includes its backoff
+                    overloaded = overloaded_response(response)
+                    if response.ok and not overloaded:
+                        slot_latency = latency
+                finally:
+                    # Whatever happened, free the slot; a leaked one is never given back
+                    if self.concurrency:
+                        self.concurrency.release(slot_started, slot_latency, overloaded, timed_out)
+                self.telemetry.record_request(endpoint, latency, response, wait)
+                if (response.status_code == 401 and self.token_provider and not reauthenticated
+                        and attempt < self.max_retries):
+                    # The token was revoked or expired early; retry once with a fresh one
+                    reauthenticated = True
+                    self.token_provider.invalidate(token)
+                    if logger:
+                        logger.warning(f"Unauthorized on {endpoint}; retrying with a fresh access token")
+                    continue
+                if response.status_code == 429 and attempt < self.max_retries:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is None:
+                        retry_after = self.backoff_factor * (2 ** attempt)
+                    self.rate_limiter.on_throttle(retry_after)
+                    if logger:
+                        logger.warning(f"Throttled on {endpoint}; retrying in {retry_after:.1f}s "
+                                       f"at {self.rate_limiter.requests_per_minute:.0f} requests/min")
+                    continue
+                response.raise_for_status()
+                self.rate_limiter.on_success()
+                return response.json()
         except requests.exceptions.RequestException as e:
             if logger:
                 logger.error(f"API request failed for {endpoint}: {e}")
             raise
 
+    def _timed_get(self, url, params, token):
+        started = time.monotonic()
+        response = self.session.get(url, params=params, timeout=30,
+                                    headers={'Authorization': f'Bearer {token}'})
+        return response, time.monotonic() - started
+
+    def _send(self, url, params, token, endpoint):
+        """Send one GET, hedging it if it outlives the learned latency percentile.
+
+        Returns ``(response, latency)``. A hedge takes a rate limiter token
+        and, with adaptive concurrency, a slot, and is skipped when either
+        isn't free; the slower attempt is left to finish in the background
+        and its response is discarded. The hedge's slot is held until both
+        attempts have finished, so whichever outlives the caller's slot
+        still counts against the limit.
+        """
+        if not self.hedger:
+            return self._timed_get(url, params, token)
+        
+        def attempt():
+            response, latency = self._timed_get(url, params, token)
+            if response.ok:
+                self.hedger.record(latency)
+            return response, latency
+        
+        primary = self._hedge_executor.submit(attempt)
+        delay = self.hedger.delay()
+        if delay is None or wait([primary], timeout=delay).done:
+            return primary.result()
+        hedge_slot = self.concurrency.try_acquire() if self.concurrency else None
+        if (self.concurrency and hedge_slot is None) or not self.rate_limiter.try_acquire():
+            if hedge_slot is not None:
+                self.concurrency.release(hedge_slot)
+            self.hedger.count('skipped')
+            return primary.result()
+        with self._count_lock:
+            self.request_count += 1
+        self.hedger.count('fired')
+        self.telemetry.record_hedge(endpoint)
+        if logger:
+            logger.debug(f"Hedging {endpoint} after {delay:.2f}s")
+        hedge = self._hedge_executor.submit(attempt)
+        if hedge_slot is not None:
+            self._release_when_done(hedge_slot, (primary, hedge))
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer a completed attempt that did not raise; fail only if both did
+            finished = [future for future in (primary, hedge) if future in done and not future.exception()]
+            if finished or not pending:
+                winner = finished[0] if finished else hedge
+                break
+        if winner is hedge and not hedge.exception():
+            self.hedger.count('won')
+            self.telemetry.record_hedge(endpoint, won=True)
+        return winner.result()
+
+    def _release_when_done(self, slot, futures):
+        """Release the concurrency ``slot`` once every one of ``futures`` has finished."""
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finished(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.concurrency.release(slot)
+
+        for future in futures:
+            future.add_done_callback(finished)
+
     def get_all_services(self):
         """Get all available billing services."""
         if logger:
@@ -126,7 +1695,7 @@ class GCPBillingCatalogClient:
         page_token = None
         
         while True:
-            params = {'pageSize': 100}
+            params = {'pageSize': self.profile['page_size']}
             if page_token:
                 params['pageToken'] = page_token
             
@@ -140,7 +1709,6 @@ class GCPBillingCatalogClient:
                     
                 if logger:
                     logger.info(f"Fetched {len(services)} services so far...")
-                time.sleep(0.1)  # Rate limiting
                 
             except Exception as e:
                 if logger:
@@ -151,132 +1719,525 @@ class GCPBillingCatalogClient:
             logger.info(f"Total services found: {len(services)}")
         return services
 
-    def get_service_skus(self, service_id):
-        """Get all SKUs for a specific service."""
-        if logger:
-            logger.info(f"Fetching SKUs for service: {service_id}")
-        skus = []
+    def _split_by_region(self, skus, skus_by_region):
+        """Fan a page of SKUs out into per-region lists using a set lookup."""
+        wanted = self._region_set
+        for sku in skus:
+            for region in sku.get('serviceRegions', ()):
+                if wanted is None or region in wanted:
+                    skus_by_region[region].append(sku)
+
+    def _sku_list_params(self):
+        """Query parameters for one page of a service's SKUs under the request profile."""
+        params = {'pageSize': self.profile['page_size']}
+        if self.profile['currency_code']:
+            params['currencyCode'] = self.profile['currency_code']
+        if self.profile['fields']:
+            params['fields'] = self.profile['fields']
+        return params
+
+    def _page_service_skus(self, service_id, skus_by_region, sku_counts, base_fingerprint=None,
+                           page_sink=None, keep_pages=False):
+        """Page through a service's SKUs into ``skus_by_region``; raises on failure.
+
+        Returns ``(fetched, fingerprint, complete)``. When ``base_fingerprint``
+        is given and the first page shows no change, paging stops there and
+        ``complete`` is False: the caller reuses the base catalog's SKUs.
+        With a ``page_sink`` each page's SKUs go to the sink instead of
+        ``skus_by_region``, or to both with ``keep_pages``; ``sku_counts`` is
+        updated either way.
+        """
+        fetched = 0
+        fingerprint = None
         page_token = None
         
         while True:
-            params = {
-                'pageSize': 100
-            }
+            params = self._sku_list_params()
             if page_token:
                 params['pageToken'] = page_token
             
-            try:
-                data = self._make_request(f'/v1/services/{service_id}/skus', params)
-                service_skus = data.get('skus', [])
-                
-                # Filter SKUs by region after fetching
-                region_skus = []
-                for sku in service_skus:
-                    # Check if the SKU is available in the specified region
-                    service_regions = sku.get('serviceRegions', [])
-                    if self.region in service_regions:
-                        region_skus.append(sku)
-                
-                skus.extend(region_skus)
-                
-                page_token = data.get('nextPageToken')
-                if not page_token:
-                    break
-                    
-                if logger:
-                    logger.info(f"Fetched {len(skus)} SKUs for {service_id} so far...")
-                time.sleep(0.1)  # Rate limiting
-                
-            except Exception as e:
-                if logger:
-                    logger.error(f"Error fetching SKUs for {service_id}: {e}")
+            data = self._make_request(f'/v1/services/{service_id}/skus', params)
+            service_skus = data.get('skus', [])
+            page_token = data.get('nextPageToken')
+            self.telemetry.record_skus_listed(service_id, len(service_skus))
+            
+            if fingerprint is None:
+                fingerprint = page_fingerprint(service_skus, bool(page_token), profile_key(self.profile))
+                if page_token and base_fingerprint and not fingerprint_change(base_fingerprint, fingerprint):
+                    return fetched, fingerprint, False
+            fetched += len(service_skus)
+            
+            # Filter SKUs by region after fetching
+            page_by_region = defaultdict(list)
+            self._split_by_region(service_skus, page_by_region)
+            for region, skus in page_by_region.items():
+                sku_counts[region] += len(skus)
+                if keep_pages or not page_sink:
+                    skus_by_region[region].extend(skus)
+            if page_sink:
+                page_sink(service_id, page_by_region)
+            
+            if not page_token:
                 break
-        
+                
+            if logger:
+                logger.info(f"Fetched {fetched} SKUs for {service_id} so far...")
+        return fetched, fingerprint, True
+
+    def probe_conversion_rate(self, currency_code, service_id):
+        """Ask the API for the USD to ``currency_code`` rate with a one-SKU page of ``service_id``."""
+        params = {'pageSize': 1, 'currencyCode': currency_code}
+        if self.profile['fields']:
+            params['fields'] = 'skus(pricingInfo)'
+        data = self._make_request(f'/v1/services/{service_id}/skus', params)
+        for sku in data.get('skus', []):
+            code, rate = sku_currency(sku)
+            if code == currency_code and rate:
+                return rate
+        raise ValueError(f"No {currency_code} conversion rate in the probe of service {service_id}")
+
+    def get_service_skus_by_region(self, service_id):
+        """Get all SKUs for a service in one pass, grouped by requested region."""
+        if logger:
+            logger.info(f"Fetching SKUs for service: {service_id}")
+        skus_by_region = defaultdict(list)
+        try:
+            self._page_service_skus(service_id, skus_by_region, defaultdict(int))
+        except Exception as e:
+            if logger:
+                logger.error(f"Error fetching SKUs for {service_id}: {e}")
+        return dict(skus_by_region)
+
+    def get_service_skus(self, service_id):
+        """Get all SKUs for a specific service in the client's (first) region."""
+        return self.get_service_skus_by_region(service_id).get(self.region, [])
+
+    def _fetch_service(self, service):
+        """Fetch the SKUs of one service as a ServiceResult.
+
+        Unlike get_service_skus_by_region, a failed page fails the whole
+        service so that a partial result is never reported (or journaled) as
+        complete. In incremental mode an unchanged multi-page service costs a
+        single request and its SKUs are taken from the base catalog.
+        """
+        service_id = service['serviceId']
         if logger:
-            logger.info(f"Total SKUs for {service_id}: {len(skus)}")
-        return skus
-
-    def download_complete_catalog(self):
-        """Download the complete SKU catalog for the region."""
+            logger.info(f"Fetching SKUs for service: {service_id}")
+        started = time.monotonic()
+        skus_by_region = defaultdict(list)
+        sku_counts = defaultdict(int)
+        base_fingerprint = self.incremental_base.fingerprint(service_id) if self.incremental_base else None
+        page_sink = self.stream_writer.write_page if self.stream_writer else None
+        keep_pages = False
+        if self.pipeline:
+            # The journal and incremental report still need the SKUs unless they are streamed
+            page_sink, keep_pages = self.pipeline.put_page, not self.stream_writer
+        fetched, fingerprint, complete = self._page_service_skus(
+            service_id, skus_by_region, sku_counts, base_fingerprint, page_sink, keep_pages
+        )
+        if not complete:
+            if logger:
+                logger.info(f"Service {service_id} unchanged since base catalog; reusing its SKUs")
+            base_skus = self.incremental_base.skus_by_region(service_id)
+            if self.pipeline:
+                self.pipeline.put_page(service_id, base_skus)
+                self.pipeline.service_done(service)
+            return ServiceResult(base_skus, time.monotonic() - started, fingerprint, 'reused',
+                                 region_counts(base_skus))
         if logger:
-            logger.info(f"Starting complete SKU catalog download for region: {self.region}")
+            counts = ', '.join(f"{region}: {count}" for region, count in sku_counts.items())
+            logger.info(f"Total SKUs for {service_id}: {fetched} fetched ({counts or 'none in requested regions'})")
+        if self.pipeline:
+            self.pipeline.service_done(service)
+        return ServiceResult(dict(skus_by_region), time.monotonic() - started, fingerprint, 'fetched',
+                             dict(sku_counts))
+
+    def _fetch_all_services(self, services, known=None, checkpoint=None):
+        """Fetch SKUs for every service, in discovery order.
+
+        With more than one worker the services are fetched on a bounded
+        thread pool sharing ``self.session``; results are still returned in
+        discovery order so the catalog is identical to a sequential run.
+        Services found in ``known`` (checkpoint journal or negative cache
+        results) are not fetched; newly finished services are recorded in
+        ``checkpoint`` as soon as they complete.
+        """
+        known = known or {}
+
+        def fetch(service):
+            result = self._safe_fetch_service(service)
+            if checkpoint and result.status != 'failed':
+                checkpoint.record(service, result)
+            return result
+
+        if self.workers == 1:
+            for service in services:
+                if service['serviceId'] in known:
+                    yield service, known[service['serviceId']]
+                else:
+                    yield service, fetch(service)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sku-fetch')
+        try:
+            # The pool starts work in submission order, so submitting the
+            # largest services first keeps them from finishing last
+            futures = {
+                service['serviceId']: executor.submit(fetch, service)
+                for service in self.schedule_order(
+                    [service for service in services if service['serviceId'] not in known])
+            }
+            for service in services:
+                future = futures.get(service['serviceId'])
+                if future is None:
+                    yield service, known[service['serviceId']]
+                else:
+                    yield service, future.result()
+        finally:
+            # Don't wait for queued services on Ctrl-C; the journal keeps what finished
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def schedule_order(self, services):
+        """Order services largest first by ``service_weights`` (longest job first).
+
+        Services missing from the previous summary had no SKUs in the
+        requested regions and are usually a single page, so they keep their
+        discovery order after the weighted ones. Without weights the
+        discovery order is kept.
+        """
+        if not self.service_weights:
+            return list(services)
+        return sorted(services, key=lambda service: -self.service_weights.get(service['serviceId'], 0))
+
+    def _schedule_stats(self, services, durations):
+        """Compare the schedule used with discovery order, replaying measured service times."""
+        fetched = [service for service in services if service['serviceId'] in durations]
+        discovery = simulate_makespan([durations[s['serviceId']] for s in fetched], self.workers)
+        scheduled = simulate_makespan([durations[s['serviceId']] for s in self.schedule_order(fetched)],
+                                      self.workers)
+        return {
+            'schedule': 'longest-first' if self.service_weights and self.workers > 1 else 'discovery',
+            'weighted_services': sum(1 for s in fetched if s['serviceId'] in self.service_weights),
+            'simulated_discovery_seconds': round(discovery, 3),
+            'simulated_schedule_seconds': round(scheduled, 3),
+            'schedule_saving_seconds': round(discovery - scheduled, 3)
+        }
+
+    def _safe_fetch_service(self, service):
+        """Fetch one service, logging failures instead of raising them."""
+        try:
+            return self._fetch_service(service)
+        except Exception as e:
+            if logger:
+                logger.error(f"Error processing service {service['serviceId']}: {e}")
+            if self.pipeline:
+                self.pipeline.service_done(service, failed=True)
+            return ServiceResult(None, 0.0, None, 'failed', {})
+
+    def _add_service_to_catalog(self, catalog, service, skus, sku_count=None):
+        """Add a service's SKUs to the catalog, organized by resource family.
+
+        When the SKUs were streamed to disk, ``skus`` is None and only the
+        service info with ``sku_count`` is recorded.
+        """
+        service_id = service['serviceId']
+        if skus is None:
+            catalog['services'][service_id] = {'service_info': service_info(service, sku_count)}
+            catalog['metadata']['total_skus'] += sku_count
+            return
+        service_data = {
+            'service_info': service_info(service, len(skus)),
+            'skus': skus,
+            'categories': defaultdict(list)
+        }
         
-        # Get all services
-        services = self.get_all_services()
+        # Categorize SKUs
+        for sku in skus:
+            category = sku.get('category', {}).get('resourceFamily', 'Unknown')
+            service_data['categories'][category].append(sku)
+            catalog['sku_summary'][category] += 1
+            catalog['category_summary'][category] += 1
         
-        # Organize data
-        catalog = {
+        catalog['services'][service_id] = service_data
+        catalog['metadata']['total_skus'] += len(skus)
+
+    def _record_service(self, catalogs, service, result, total_services, timestamp):
+        """Add a finished service to the per-region catalogs, creating regions as they appear."""
+        for region, count in result.sku_counts.items():
+            if region not in catalogs:
+                catalogs[region] = self._new_catalog(region, total_services, timestamp)
+            skus = None if self.stream_writer or self.pipeline else result.skus_by_region[region]
+            self._add_service_to_catalog(catalogs[region], service, skus, count)
+
+    def _new_catalog(self, region, total_services, timestamp):
+        return {
             'metadata': {
-                'region': self.region,
-                'download_timestamp': datetime.now().isoformat(),
-                'total_services': len(services),
+                'region': region,
+                'download_timestamp': timestamp,
+                'total_services': total_services,
                 'total_skus': 0
             },
             'services': {},
             'sku_summary': defaultdict(int),
             'category_summary': defaultdict(int)
         }
+
+    def download_catalogs(self, checkpoint=None, resume=False, negative_cache=None,
+                          negative_sweep=DEFAULT_NEGATIVE_SWEEP, stream_writer=None, pipeline=None):
+        """Download SKU catalogs for every requested region in a single pass.
+
+        Each service's SKU pages are fetched once and fanned out into one
+        catalog per region. Returns ``{region: catalog}``; with --all-regions
+        the regions are those found in the catalog, sorted by name.
+
+        When a CheckpointJournal is given every completed service is appended
+        to it; with ``resume`` the services already in the journal are taken
+        from it instead of being fetched again.
+
+        Every catalog records the first-page fingerprint of each service so
+        it can serve as the base of a later --incremental run; in incremental
+        mode ``self.refresh_report`` lists each service as changed or
+        unchanged.
+
+        With a NegativeCache, services recently verified to have no SKUs in
+        the requested regions are skipped. Once every other service is done,
+        up to ``negative_sweep`` of the least recently verified cached
+        services are fetched again so the cache converges on the truth.
+
+        With an NDJSONCatalogWriter every page is streamed to disk as it
+        arrives and the returned catalogs only hold service info and
+        summaries, not SKUs.
+
+        With a DownloadPipeline, normalization and writing run on their own
+        threads while services are still being fetched; its report is added
+        to ``last_run_stats['pipeline']``.
+        """
+        if logger:
+            logger.info(f"Starting complete SKU catalog download for region(s): {self.region_label} "
+                        f"(workers: {self.workers})")
+        run_started = time.monotonic()
+        requests_before = self.request_count
+        self.stream_writer = stream_writer
+        self.pipeline = pipeline
+        if pipeline:
+            pipeline.start()
         
-        # Process each service
-        for i, service in enumerate(services, 1):
-            service_id = service['serviceId']
-            service_name = service.get('displayName', service_id)
-            
+        # Get all services
+        services = self.get_all_services()
+        
+        known = {}
+        if checkpoint:
+            if resume:
+                for service_id, (_, skus_by_region, fingerprint) in checkpoint.load().items():
+                    known[service_id] = ServiceResult(skus_by_region, 0.0, fingerprint, 'resumed',
+                                                      region_counts(skus_by_region))
+                if logger:
+                    logger.info(f"Resuming from {checkpoint.path}: {len(known)} services already completed")
+            checkpoint.open(resume=resume)
+        resumed_services = len(known)
+        
+        cached_empty = []
+        if negative_cache:
+            for service in services:
+                service_id = service['serviceId']
+                if service_id not in known and negative_cache.is_fresh(service_id):
+                    known[service_id] = ServiceResult({}, 0.0, negative_cache.fingerprint(service_id),
+                                                      'cached-empty', {})
+                    cached_empty.append(service_id)
             if logger:
-                logger.info(f"Processing service {i}/{len(services)}: {service_name} ({service_id})")
-            
-            try:
-                skus = self.get_service_skus(service_id)
+                logger.info(f"Negative cache: skipping {len(cached_empty)} services with no SKUs "
+                            f"in {self.region_label}")
+        
+        # Organize data
+        timestamp = datetime.now().isoformat()
+        catalogs = {
+            region: self._new_catalog(region, len(services), timestamp)
+            for region in (self.regions or [])
+        }
+        
+        # Process each service
+        fetch_started = time.monotonic()
+        service_time = 0.0
+        failed_services = 0
+        fingerprints = {}
+        refreshed = {}
+        durations = {}
+        try:
+            for i, (service, result) in enumerate(self._fetch_all_services(services, known, checkpoint), 1):
+                service_id = service['serviceId']
+                service_name = service.get('displayName', service_id)
+                service_time += result.elapsed
+                self.telemetry.record_service(service_id, service_name, result)
+                if result.status in ('fetched', 'reused', 'failed'):
+                    durations[service_id] = result.elapsed
+                if pipeline and result.status == 'resumed':
+                    pipeline.put_page(service_id, result.skus_by_region)
+                    pipeline.service_done(service)
+                if result.fingerprint:
+                    fingerprints[service_id] = result.fingerprint
+                if negative_cache and result.status in ('fetched', 'reused'):
+                    negative_cache.update(service_id, result.sku_counts, result.fingerprint)
+                if self.incremental_base:
+                    refreshed[service_id] = self._refresh_entry(service_id, service_name, result)
                 
-                if skus:
-                    # Organize SKUs by category
-                    service_data = {
-                        'service_info': {
-                            'service_id': service_id,
-                            'display_name': service_name,
-                            'business_entity_name': service.get('businessEntityName', ''),
-                            'sku_count': len(skus)
-                        },
-                        'skus': skus,
-                        'categories': defaultdict(list)
-                    }
-                    
-                    # Categorize SKUs
-                    for sku in skus:
-                        category = sku.get('category', {}).get('resourceFamily', 'Unknown')
-                        service_data['categories'][category].append(sku)
-                        catalog['sku_summary'][category] += 1
-                        catalog['category_summary'][category] += 1
-                    
-                    catalog['services'][service_id] = service_data
-                    catalog['metadata']['total_skus'] += len(skus)
-                    
+                if logger:
+                    logger.info(f"Processed service {i}/{len(services)}: {service_name} ({service_id})")
+                
+                if result.status == 'failed':
+                    failed_services += 1
+                elif result.sku_counts:
+                    self._record_service(catalogs, service, result, len(services), timestamp)
                     if logger:
-                        logger.info(f"  Added {len(skus)} SKUs for {service_name}")
+                        total = sum(result.sku_counts.values())
+                        logger.info(f"  Added {total} SKUs for {service_name} across "
+                                    f"{len(result.sku_counts)} region(s)")
                 else:
                     if logger:
                         logger.info(f"  No SKUs found for {service_name}")
-                
-            except Exception as e:
-                if logger:
-                    logger.error(f"Error processing service {service_id}: {e}")
-                continue
-            
-            # Rate limiting between services
-            time.sleep(0.2)
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        fetch_time = time.monotonic() - fetch_started
+        
+        swept, revived = 0, 0
+        if negative_cache and cached_empty and negative_sweep > 0:
+            swept, revived = self._sweep_negative_cache(
+                services, cached_empty, negative_cache, negative_sweep, catalogs, timestamp, fingerprints
+            )
+        if negative_cache:
+            negative_cache.save()
+        self.stream_writer = None
+        self.pipeline = None
+        if pipeline:
+            pipeline.close()
+            pipeline.merge_into(catalogs)
+        
+        if self.regions is None:
+            catalogs = dict(sorted(catalogs.items()))
         
         # Convert defaultdict to regular dict for JSON serialization
-        catalog['sku_summary'] = dict(catalog['sku_summary'])
-        catalog['category_summary'] = dict(catalog['category_summary'])
+        for region, catalog in catalogs.items():
+            if stream_writer:
+                catalog['sku_summary'] = dict(stream_writer.family_counts[region])
+                catalog['category_summary'] = dict(stream_writer.family_counts[region])
+            catalog['sku_summary'] = dict(catalog['sku_summary'])
+            catalog['category_summary'] = dict(catalog['category_summary'])
+            for service_data in catalog['services'].values():
+                if 'categories' in service_data:
+                    service_data['categories'] = dict(service_data['categories'])
+            catalog['service_fingerprints'] = fingerprints
         
-        for service_id in catalog['services']:
-            catalog['services'][service_id]['categories'] = dict(
-                catalog['services'][service_id]['categories']
-            )
+        if self.incremental_base:
+            self.refresh_report = self._build_refresh_report(services, refreshed,
+                                                             self.request_count - requests_before)
+        
+        # Cumulative per-service time is what a sequential run would have spent
+        self.last_run_stats = {
+            'workers': self.workers,
+            'resumed_services': resumed_services,
+            'negative_cache_skipped': len(cached_empty),
+            'negative_cache_swept': swept,
+            'negative_cache_revived': revived,
+            'failed_services': failed_services,
+            'rate_limit_wait_seconds': round(self.rate_limiter.total_wait, 3),
+            'throttled_requests': self.rate_limiter.throttle_count,
+            'wall_time_seconds': round(time.monotonic() - run_started, 3),
+            'fetch_wall_time_seconds': round(fetch_time, 3),
+            'cumulative_service_seconds': round(service_time, 3),
+            'speedup': round(service_time / fetch_time, 2) if fetch_time > 0 else 1.0
+        }
+        self.last_run_stats.update(self._schedule_stats(services, durations))
+        if self.hedger:
+            self.last_run_stats.update(self.hedger.stats())
+        if self.concurrency:
+            self.last_run_stats['concurrency'] = self.concurrency.stats()
+        if pipeline:
+            self.last_run_stats['pipeline'] = pipeline.report()
         
         if logger:
-            logger.info(f"Download complete! Total SKUs: {catalog['metadata']['total_skus']}")
-        return catalog
+            for region, catalog in catalogs.items():
+                logger.info(f"Download complete for {region}! Total SKUs: {catalog['metadata']['total_skus']}")
+            logger.info(
+                f"Fetched {len(services)} services in {fetch_time:.1f}s with {self.workers} worker(s); "
+                f"cumulative service time {service_time:.1f}s "
+                f"(speedup {self.last_run_stats['speedup']:.2f}x)"
+            )
+        return catalogs
+
+    def _sweep_negative_cache(self, services, cached_empty, negative_cache, limit,
+                              catalogs, timestamp, fingerprints):
+        """Re-verify the least recently checked cached services after the main pass.
+
+        Runs once every other service is done but before the catalogs are
+        returned and saved, so it adds the time of up to ``limit`` service
+        fetches to the run; in exchange a service that has gained SKUs is
+        added to this run's catalogs (and dropped from the cache). Returns
+        ``(swept, revived)``.
+        """
+        by_id = {service['serviceId']: service for service in services}
+        to_verify = [by_id[service_id] for service_id in negative_cache.oldest(cached_empty, limit)]
+        if logger:
+            logger.info(f"Negative cache sweep: re-verifying {len(to_verify)} of {len(cached_empty)} cached services")
+        revived = 0
+        for service, result in self._fetch_all_services(to_verify):
+            self.telemetry.record_service(service['serviceId'], service.get('displayName', ''), result)
+            if result.status == 'failed':
+                continue
+            service_id = service['serviceId']
+            negative_cache.update(service_id, result.sku_counts, result.fingerprint)
+            if result.fingerprint:
+                fingerprints[service_id] = result.fingerprint
+            if result.sku_counts:
+                revived += 1
+                if logger:
+                    logger.warning(f"Cached-empty service {service_id} now has SKUs; adding it to the catalog")
+                self._record_service(catalogs, service, result, len(services), timestamp)
+        return len(to_verify), revived
+
+    def _refresh_entry(self, service_id, service_name, result):
+        """Describe one service of an incremental run for the refresh report."""
+        if result.status == 'failed':
+            return {'display_name': service_name, 'status': 'failed', 'reason': None, 'source': 'failed'}
+        reason = fingerprint_change(self.incremental_base.fingerprint(service_id), result.fingerprint) \
+            if result.fingerprint else 'no fingerprint recorded'
+        return {
+            'display_name': service_name,
+            'status': 'changed' if reason else 'unchanged',
+            'reason': reason,
+            'source': result.status,
+            'multi_page': bool(result.fingerprint and result.fingerprint.get('multi_page'))
+        }
+
+    def _build_refresh_report(self, services, refreshed, requests_made):
+        """Summarize an incremental run: per-service changed/unchanged plus totals."""
+        base = self.incremental_base
+        current_ids = {service['serviceId'] for service in services}
+        for service_id in set(base.fingerprints) | set(base.services):
+            if service_id not in current_ids:
+                service_data = base.services.get(service_id, {})
+                refreshed[service_id] = {
+                    'display_name': service_data.get('service_info', {}).get('display_name', service_id),
+                    'status': 'removed', 'reason': 'no longer listed by the API', 'source': 'base'
+                }
+        summary = defaultdict(int)
+        for entry in refreshed.values():
+            summary[entry['status']] += 1
+            # Re-paged: changed services that needed pages past the first one
+            if entry['status'] == 'changed' and entry['source'] == 'fetched' and entry.get('multi_page'):
+                summary['repaged'] += 1
+        summary['requests'] = requests_made
+        return {
+            'base_download_timestamp': base.download_timestamp,
+            'summary': dict(summary),
+            'services': refreshed
+        }
+
+    def download_complete_catalog(self):
+        """Download the complete SKU catalog for the client's (first) region."""
+        catalogs = self.download_catalogs()
+        return catalogs.get(self.region) or self._new_catalog(
+            self.region, 0, datetime.now().isoformat()
+        )
 
 def setup_logging(verbose=False):
     """Setup logging configuration."""
@@ -292,39 +2253,295 @@ def setup_logging(verbose=False):
     )
     logger = logging.getLogger(__name__)
 
-def save_catalog(catalog, output_file):
-    """Save catalog to JSON file."""
+def uncompressed_path(output_file):
+    """Strip a trailing .gz so side files (summaries, reports) are named after the plain catalog."""
+    return output_file[:-3] if output_file.endswith('.gz') else output_file
+
+def save_catalog(catalog, output_file, version=1):
+    """Save catalog to a JSON file (v1 or compact v2; gzipped if the path ends in .gz)."""
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(catalog, f, indent=2, ensure_ascii=False)
+        dump_catalog(catalog, output_file, version=version)
         if logger:
             logger.info(f"Catalog saved to: {output_file}")
         
-        # Also save a summary
-        summary_file = output_file.replace('.json', '_summary.json')
-        summary = {
-            'metadata': catalog['metadata'],
-            'sku_summary': catalog['sku_summary'],
-            'category_summary': catalog['category_summary'],
-            'services_summary': {
-                service_id: {
-                    'display_name': data['service_info']['display_name'],
-                    'sku_count': data['service_info']['sku_count']
-                }
-                for service_id, data in catalog['services'].items()
-            }
-        }
-        
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
-        if logger:
-            logger.info(f"Summary saved to: {summary_file}")
+        # Also save a summary (always plain JSON so it stays easy to inspect)
+        save_summary(catalog, uncompressed_path(output_file).replace('.json', '_summary.json'))
         
     except Exception as e:
         if logger:
             logger.error(f"Error saving catalog: {e}")
         raise
 
+def shard_directory(output_file):
+    """Directory of a --format sharded catalog: gcp_skus.json -> gcp_skus_shards."""
+    return os.path.splitext(uncompressed_path(output_file))[0] + '_shards'
+
+def save_sharded_catalog(catalog, output_file):
+    """Save a catalog as per-service shards plus manifest, and its summary next to --output."""
+    manifest_file = write_sharded_catalog(catalog, shard_directory(output_file))
+    if logger:
+        logger.info(f"Sharded catalog saved to: {manifest_file} ({len(catalog['services'])} services)")
+    save_summary(catalog, uncompressed_path(output_file).replace('.json', '_summary.json'))
+    return manifest_file
+
+def save_summary(catalog, summary_file):
+    """Save the metadata, category counts and per-service SKU counts of a catalog."""
+    summary = {
+        'metadata': catalog['metadata'],
+        'sku_summary': catalog['sku_summary'],
+        'category_summary': catalog['category_summary'],
+        'services_summary': {
+            service_id: {
+                'display_name': data['service_info']['display_name'],
+                'sku_count': data['service_info']['sku_count']
+            }
+            for service_id, data in catalog['services'].items()
+        }
+    }
+    
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    if logger:
+        logger.info(f"Summary saved to: {summary_file}")
+
+def ndjson_output_files(output_file):
+    """Return (data_file, manifest_file, summary_base) for --format ndjson."""
+    root, ext = os.path.splitext(output_file)
+    if ext not in ('.json', '.ndjson'):
+        root = output_file
+    return f"{root}.ndjson", f"{root}_manifest.json", f"{root}.json"
+
+def save_refresh_report(report, output_file):
+    """Save the per-service changed/unchanged report of an incremental run."""
+    report_file = uncompressed_path(output_file).replace('.json', '_refresh_report.json')
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    summary = report['summary']
+    print("\nIncremental Refresh:")
+    print(f"  Changed services: {summary.get('changed', 0)} ({summary.get('repaged', 0)} re-paged)")
+    print(f"  Unchanged services: {summary.get('unchanged', 0)}")
+    print(f"  Removed services: {summary.get('removed', 0)}")
+    print(f"  API requests: {summary.get('requests', 0)}")
+    if logger:
+        logger.info(f"Refresh report saved to: {report_file}")
+
+def run_report_files(output_file):
+    """Return (json_report, prometheus_textfile) paths derived from --output."""
+    root = os.path.splitext(uncompressed_path(output_file))[0]
+    return f"{root}_run_report.json", f"{root}_metrics.prom"
+
+def save_run_report(report, report_file):
+    """Save the telemetry run report as JSON."""
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if logger:
+        logger.info(f"Run report saved to: {report_file}")
+
+def prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def save_prometheus_metrics(report, metrics_file, prefix='gcp_sku_download'):
+    """Write the run report in the Prometheus textfile-collector format.
+
+    The file is replaced atomically so the collector never reads a partial file.
+    """
+    requests_report = report['requests']
+    run = report['run']
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{prometheus_label(val)}"' for key, val in labels.items())
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+    metric('last_run_timestamp_seconds', 'gauge', 'Unix time the run finished.',
+           [({}, round(datetime.fromisoformat(report['generated_at']).timestamp(), 3))])
+    metric('wall_time_seconds', 'gauge', 'Wall-clock time of the run.',
+           [({}, run.get('wall_time_seconds', 0))])
+    metric('requests', 'gauge', 'API responses received in the run.', [({}, requests_report['total'])])
+    metric('pages', 'gauge', 'Successful pages received in the run.', [({}, requests_report['pages'])])
+    metric('response_bytes', 'gauge', 'Response body bytes received in the run.',
+           [({}, requests_report['response_bytes'])])
+    metric('retries', 'gauge', 'Retried requests in the run by cause.', [
+        ({'cause': 'urllib3'}, requests_report['urllib3_retries']),
+        ({'cause': 'throttled_429'}, requests_report['throttled_429']),
+        ({'cause': 'unauthorized_401'}, requests_report['unauthorized_401'])
+    ])
+    metric('hedges', 'gauge', 'Hedged duplicate requests in the run by outcome.', [
+        ({'outcome': 'fired'}, requests_report['hedges_fired']),
+        ({'outcome': 'won'}, requests_report['hedges_won'])
+    ])
+    metric('wire_bytes', 'gauge', 'Response bytes transferred in the run, before decompression.',
+           [({}, requests_report['wire_bytes'])])
+    metric('request_errors', 'gauge', 'Requests that failed without a response.',
+           [({}, requests_report['errors'])])
+    metric('rate_limit_wait_seconds', 'gauge', 'Time spent waiting for the rate limiter.',
+           [({}, requests_report['rate_limit_wait_seconds'])])
+    latency = requests_report['latency_seconds']
+    if latency.get('count'):
+        metric('request_latency_seconds', 'gauge', 'Request latency quantiles in the run.', [
+            ({'quantile': quantile}, latency[key])
+            for quantile, key in (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99'), ('1', 'max'))
+        ])
+    metric('failed_services', 'gauge', 'Services that failed in the run.',
+           [({}, run.get('failed_services', 0))])
+    metric('schedule_saving_seconds', 'gauge', 'Simulated wall time saved by the schedule vs discovery order.',
+           [({}, run.get('schedule_saving_seconds', 0))])
+    concurrency = run.get('concurrency')
+    if concurrency:
+        metric('concurrency_limit', 'gauge', 'Adaptive in-flight request limit over the run.', [
+            ({'stat': stat}, concurrency[f'{stat}_limit']) for stat in ('initial', 'final', 'peak', 'mean')
+        ])
+        metric('concurrency_decreases', 'gauge', 'Adaptive concurrency decreases in the run by cause.', [
+            ({'cause': cause}, concurrency['decreases'].get(cause, 0)) for cause in ('overload', 'latency')
+        ])
+    pipeline = run.get('pipeline')
+    if pipeline:
+        metric('pipeline_stage_skus_per_second', 'gauge', 'SKUs per second through each --pipeline stage.', [
+            ({'stage': name}, stage['skus_per_second']) for name, stage in pipeline['stages'].items()
+        ])
+        metric('pipeline_queue_mean_depth', 'gauge', 'Mean depth of each --pipeline queue.', [
+            ({'queue': name}, depth['mean_depth']) for name, depth in pipeline['queues'].items()
+        ])
+    fetched = [service for service in report['services'] if service.get('requests')]
+    metric('service_seconds', 'gauge', 'Time spent fetching each service.', [
+        ({'service_id': service['service_id'], 'service': service.get('display_name', '')},
+         service.get('elapsed_seconds', 0))
+        for service in fetched
+    ])
+    metric('service_pages', 'gauge', 'Pages fetched for each service.', [
+        ({'service_id': service['service_id'], 'service': service.get('display_name', '')}, service['pages'])
+        for service in fetched
+    ])
+
+    tmp_file = f"{metrics_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_file, metrics_file)
+    if logger:
+        logger.info(f"Prometheus metrics saved to: {metrics_file}")
+
+def compare_run_reports(report, baseline):
+    """Add a comparison with an earlier run report (e.g. one made with the default profile)."""
+    current, before = report['requests'], baseline['requests']
+
+    def ratio(after, previous):
+        return round(after / previous, 3) if previous else None
+
+    report['comparison'] = {
+        'baseline_generated_at': baseline.get('generated_at'),
+        'baseline_profile': baseline.get('request_profile', {}).get('name', 'default'),
+        'requests': {'before': before['total'], 'after': current['total'],
+                     'ratio': ratio(current['total'], before['total'])},
+        'wire_bytes': {'before': before.get('wire_bytes', before['response_bytes']),
+                       'after': current['wire_bytes'],
+                       'ratio': ratio(current['wire_bytes'], before.get('wire_bytes', before['response_bytes']))},
+        'response_bytes': {'before': before['response_bytes'], 'after': current['response_bytes'],
+                           'ratio': ratio(current['response_bytes'], before['response_bytes'])}
+    }
+    return report
+
+def print_telemetry(report):
+    """Print request totals and the slowest services of a run report."""
+    requests_report = report['requests']
+    latency = requests_report['latency_seconds']
+    print("\nRequest Telemetry:")
+    print(f"  Requests: {requests_report['total']} ({requests_report['pages']} pages, "
+          f"{requests_report['wire_bytes'] / 1024 / 1024:.1f} MiB on the wire, "
+          f"{requests_report['response_bytes'] / 1024 / 1024:.1f} MiB decoded)")
+    profile = report.get('request_profile', {})
+    if profile:
+        print(f"  Request profile: {profile['name']} (pageSize {profile['page_size']}; "
+              f"{profile['pages_saved']} of an estimated {profile['estimated_default_profile_pages']} "
+              f"default-profile pages saved)")
+    comparison = report.get('comparison')
+    if comparison:
+        print(f"  vs {comparison['baseline_profile']} run: requests {comparison['requests']['before']} -> "
+              f"{comparison['requests']['after']}, wire bytes {comparison['wire_bytes']['before']:,} -> "
+              f"{comparison['wire_bytes']['after']:,}")
+    if latency.get('count'):
+        print(f"  Latency: p50 {latency['p50']:.3f}s, p90 {latency['p90']:.3f}s, "
+              f"p99 {latency['p99']:.3f}s, max {latency['max']:.3f}s")
+    print(f"  Retries: {requests_report['urllib3_retries']} urllib3, "
+          f"{requests_report['throttled_429']} throttled (429), "
+          f"{requests_report['unauthorized_401']} unauthorized (401)")
+    slowest = [service for service in report['services'] if service.get('requests')][:5]
+    if slowest:
+        print("  Slowest services:")
+        for service in slowest:
+            print(f"    {service.get('display_name') or service['service_id']}: "
+                  f"{service.get('elapsed_seconds', 0):.1f}s, {service['pages']} pages")
+    print("="*60)
+
+def region_output_file(output_file, region, multi_region):
+    """Derive the per-region output path; single-region runs keep the path as given."""
+    if not multi_region:
+        return output_file
+    if output_file.endswith('.gz'):
+        return region_output_file(output_file[:-3], region, multi_region) + '.gz'
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{region}{ext or '.json'}"
+
+def record_price_history(db_path, catalogs, data_file=None):
+    """Append the price changes of this download to the SQLite history store."""
+    with PriceHistoryStore(db_path) as store:
+        if data_file:
+            service_names = {
+                service_id: data['service_info']['display_name']
+                for catalog in catalogs.values()
+                for service_id, data in catalog['services'].items()
+            }
+            timestamp = next(iter(catalogs.values()))['metadata']['download_timestamp'] if catalogs else \
+                datetime.now().isoformat()
+            counts = store.ingest(ndjson_records(data_file, service_names), timestamp, list(catalogs),
+                                  source=os.path.basename(data_file))
+        else:
+            counts = defaultdict(int)
+            for catalog in catalogs.values():
+                for change_type, count in store.ingest_catalog(catalog, source='gcp-sku-downloader').items():
+                    counts[change_type] += count
+    if logger:
+        logger.info(f"Price history {db_path}: " + ', '.join(f"{count} {name}" for name, count in counts.items()))
+    return counts
+
+def record_catalog_currency(catalog):
+    """Record the currency and API conversion rate of a downloaded catalog in its metadata."""
+    code, rate = catalog_currency(catalog)
+    if code:
+        catalog['metadata']['currency_code'] = code
+        catalog['metadata']['currency_conversion_rate'] = rate
+
+def resolve_conversion_rates(client, catalogs, currencies, fx_table, max_age_hours, probe=True):
+    """Return {currency: USD rate} from the FX table, probing the API for missing or stale rates."""
+    probe_service = next((service_id for catalog in catalogs.values()
+                          for service_id, data in catalog['services'].items() if data['skus']), None)
+    rates = {}
+    for code in currencies:
+        rate = fx_table.get(code, max_age_hours)
+        if rate is None and probe and probe_service:
+            rate = client.probe_conversion_rate(code, probe_service)
+            fx_table.set(code, rate, 'probe')
+            if logger:
+                logger.info(f"Probed {code} conversion rate: {rate:g} per USD")
+        if rate is None:
+            raise ValueError(f"No usable {code} conversion rate in {fx_table.path}")
+        rates[code] = rate
+    fx_table.save()
+    return rates
+
+def save_currency_catalogs(catalogs, rates, output_file, multi_region, fx_table, version=1):
+    """Write one derived catalog per region and currency next to the USD catalogs."""
+    written = []
+    for region, catalog in catalogs.items():
+        region_file = region_output_file(output_file, region, multi_region)
+        for code, rate in rates.items():
+            derived_file = currency_output_file(region_file, code)
+            save_catalog(convert_catalog(catalog, code, rate, fx_table.source(code)), derived_file, version=version)
+            written.append(derived_file)
+    return written
+
 def print_summary(catalog):
     """Print a summary of the downloaded catalog."""
     print("\n" + "="*60)
@@ -357,23 +2574,142 @@ def print_summary(catalog):
     
     print("="*60)
 
+def print_run_stats(run_stats):
+    """Print download performance for the whole run."""
+    if not run_stats:
+        return
+    print("\nDownload Performance:")
+    print(f"  Workers: {run_stats['workers']}")
+    if run_stats.get('resumed_services'):
+        print(f"  Resumed from journal: {run_stats['resumed_services']} services")
+    if run_stats.get('failed_services'):
+        print(f"  Failed services: {run_stats['failed_services']}")
+    if run_stats.get('negative_cache_skipped'):
+        print(f"  Skipped via negative cache: {run_stats['negative_cache_skipped']} services "
+              f"({run_stats['negative_cache_swept']} re-verified, "
+              f"{run_stats['negative_cache_revived']} had gained SKUs)")
+    print(f"  Wall-clock time: {run_stats['wall_time_seconds']:.1f}s")
+    print(f"  Cumulative service time: {run_stats['cumulative_service_seconds']:.1f}s")
+    print(f"  Speedup vs sequential: {run_stats['speedup']:.2f}x")
+    if run_stats.get('schedule') == 'longest-first':
+        print(f"  Longest-first schedule: {run_stats['simulated_schedule_seconds']:.1f}s vs "
+              f"{run_stats['simulated_discovery_seconds']:.1f}s in discovery order "
+              f"(saved {run_stats['schedule_saving_seconds']:.1f}s, "
+              f"{run_stats['weighted_services']} services weighted)")
+    print(f"  Rate-limit wait: {run_stats['rate_limit_wait_seconds']:.1f}s "
+          f"({run_stats['throttled_requests']} throttled requests)")
+    if 'hedges_fired' in run_stats:
+        print(f"  Hedged requests: {run_stats['hedges_fired']} fired, {run_stats['hedges_won']} won, "
+              f"{run_stats['hedges_skipped']} skipped for lack of rate budget or a slot "
+              f"(p{run_stats['hedge_percentile'] * 100:g} threshold)")
+    if run_stats.get('concurrency'):
+        print_concurrency_timeline(run_stats['concurrency'])
+    if run_stats.get('pipeline'):
+        print_pipeline_report(run_stats['pipeline'])
+    print("="*60)
+
+def print_concurrency_timeline(stats, max_points=12):
+    """Print the adaptive concurrency limit's course over the run, thinned to ``max_points``."""
+    decreases = ', '.join(f"{count} {reason}" for reason, count in sorted(stats['decreases'].items()))
+    print(f"  Adaptive concurrency: limit {stats['initial_limit']} -> {stats['final_limit']} "
+          f"(peak {stats['peak_limit']} of {stats['max_limit']}, time-weighted mean {stats['mean_limit']:.1f}); "
+          f"{stats['increases']} increases, decreases: {decreases or 'none'}; "
+          f"{stats['slot_wait_seconds']:.1f}s waiting for a slot")
+    timeline = stats['timeline']
+    step = max(1, -(-len(timeline) // max_points))
+    points = timeline[::step]
+    if points[-1] is not timeline[-1]:
+        points.append(timeline[-1])
+    print("    timeline: " + ' '.join(f"{point['t']:.1f}s={point['limit']}" for point in points))
+
+def print_pipeline_report(report):
+    """Print per-stage throughput and queue depth of a --pipeline run."""
+    print(f"  Pipeline ({report['wall_seconds']:.1f}s, bottleneck: {report['bottleneck']}):")
+    for name, stage in report['stages'].items():
+        line = f"    {name:<10} {stage['items']:>7,} items {stage['skus']:>10,} SKUs {stage['skus_per_second']:>10,.0f} SKU/s"
+        if 'busy_seconds' in stage:
+            line += (f"  busy {stage['busy_seconds']:.1f}s ({stage['utilization']:.0%}), "
+                     f"idle {stage['idle_seconds']:.1f}s")
+        print(line + f", blocked {stage['blocked_seconds']:.1f}s")
+    for name, depth in report['queues'].items():
+        print(f"    queue {name:<8} max {depth['max_depth']}/{depth['capacity']}, mean {depth['mean_depth']:.1f}")
+    if report.get('finalize_seconds'):
+        print(f"    finalize   {report['finalize_seconds']:.1f}s after the last service")
+
 def main():
     """Main function."""
     parser = argparse.ArgumentParser(
-        description="Download complete GCP SKU catalog for a region",
+        description="Download complete GCP SKU catalog for one or more regions",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   python gcp-sku-downloader.py --region us-central1
   python gcp-sku-downloader.py --region asia-southeast2 --output skus_asia.json
   python gcp-sku-downloader.py --region europe-west1 --verbose
+  python gcp-sku-downloader.py --region asia-southeast2 --workers 8
+  python gcp-sku-downloader.py --region asia-southeast2 --workers 8 --requests-per-minute 600
+  python gcp-sku-downloader.py --region asia-southeast2,us-central1 --output skus.json
+  python gcp-sku-downloader.py --all-regions --workers 8 --output skus.json
+
+Multi-region runs write one catalog per region, e.g. skus_asia-southeast2.json.
+Progress is journaled to <output>.journal; rerun with the same --output and
+--resume after an interruption to fetch only the remaining services.
+--incremental fetches one page per service and only re-pages services whose
+first page differs from --base; a *_refresh_report.json lists what changed.
+--format ndjson streams one SKU per line as pages arrive (memory stays bounded
+by a page) and writes <output>_manifest.json plus summaries at the end.
+--format json-v2 writes a compact catalog that stores each SKU once; --gzip
+compresses json/json-v2 output. --format sharded writes <output>_shards/ with
+one file per service and a manifest.json, so the sync scripts can load only the
+services they need. Every tool reads v1, v2, gzipped and sharded catalogs.
+--pipeline groups and writes each finished service on its own threads while
+the fetch continues, with --pipeline-queue-size bounding what is in flight;
+the run statistics show each stage's throughput and queue depth.
+Services with no SKUs in the requested regions are remembered in
+--negative-cache-dir and skipped until --negative-cache-ttl hours pass; each run
+re-verifies the --negative-sweep least recently checked of them at the end.
+Another --api-base-url keeps its own negative cache files.
+The access token is cached in --token-cache (mode 0600) and reused by later
+runs until shortly before it expires; long runs refresh it in the background.
+--token-source key-file mints tokens from GOOGLE_APPLICATION_CREDENTIALS
+in-process (requires google-auth) instead of spawning gcloud.
+Every run writes <output>_run_report.json (per-request latency, pages, bytes,
+retries and rate-limit wait per service) and <output>_metrics.prom for the
+Prometheus node_exporter textfile collector.
+--schedule-from uses a previous run's per-service SKU counts to start the
+largest services first; the run stats compare the schedule with discovery order.
+--hedge-percentile 95 duplicates a page request once it is slower than 95% of
+the run's pages so far and uses whichever answer arrives first; hedges use the
+same --requests-per-minute budget and are skipped when it is exhausted.
+--adaptive-concurrency treats --workers as a ceiling: the number of requests in
+flight starts at --initial-concurrency, grows by one after each window of
+successes and halves on a 429/503 or rising latency. The run stats and report
+include the limit's timeline.
+--request-profile minimal lists SKUs in pages of 5000 with gzip, a pinned
+currency and only the fields the tools use; its run report estimates the pages
+the default profile would have needed, and --compare-report adds a before/after
+comparison with the report of an earlier run.
+--history-db appends only the SKUs whose prices changed since the previous
+download to a SQLite store; query it with gcp_price_history.py.
+--derive-currency IDR EUR downloads in USD once and writes <output>_IDR.json and
+<output>_EUR.json converted locally. Rates come from --fx-table when younger
+than --fx-max-age hours, otherwise from a one-SKU probe request per currency
+(--fx-source table never probes); see gcp_currency.py to convert later.
+--api-base-url points the client at a local gcp-catalog-standin.py server
+(combine with --access-token local) to benchmark without using API quota.
         """
     )
     
-    parser.add_argument(
+    region_group = parser.add_mutually_exclusive_group(required=True)
+    region_group.add_argument(
         '--region',
-        required=True,
-        help='GCP region (e.g., us-central1, asia-southeast2)'
+        nargs='+',
+        help='GCP region(s), space or comma separated (e.g., us-central1 asia-southeast2)'
+    )
+    region_group.add_argument(
+        '--all-regions',
+        action='store_true',
+        help='Download a catalog for every region found in the SKU catalog'
     )
     
     parser.add_argument(
@@ -382,6 +2718,211 @@ Examples:
         help='Output JSON file path (default: auto-generated)'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of services to fetch in parallel (default: 1, sequential)'
+    )
+    
+    parser.add_argument(
+        '--requests-per-minute',
+        type=float,
+        default=DEFAULT_REQUESTS_PER_MINUTE,
+        help=f'Cloud Billing API request budget shared by all workers (default: {DEFAULT_REQUESTS_PER_MINUTE})'
+    )
+    
+    parser.add_argument(
+        '--format',
+        choices=['json', 'json-v2', 'ndjson', 'sharded'],
+        default='json',
+        help='Output format: full JSON catalog (default), compact v2 catalog, streamed NDJSON with a manifest, '
+             'or per-service shards with a manifest'
+    )
+    
+    parser.add_argument(
+        '--gzip',
+        action='store_true',
+        help='Gzip the json/json-v2 catalog (appends .gz to --output)'
+    )
+    
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Normalize and write each service on separate threads while fetching continues, '
+             'and report per-stage throughput and queue depth'
+    )
+    
+    parser.add_argument(
+        '--pipeline-queue-size',
+        type=int,
+        default=DEFAULT_PIPELINE_QUEUE_SIZE,
+        help=f'Capacity of each --pipeline queue (default: {DEFAULT_PIPELINE_QUEUE_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--schedule-from',
+        nargs='+',
+        metavar='SUMMARY',
+        help="Previous run's *_summary.json (or catalog) files; with --workers the largest services start first"
+    )
+    
+    parser.add_argument(
+        '--hedge-percentile',
+        type=float,
+        help='Send a duplicate of any page request slower than this latency percentile '
+             'of the run so far, e.g. 95 (default: off)'
+    )
+    
+    parser.add_argument(
+        '--adaptive-concurrency',
+        action='store_true',
+        help='Adjust the number of requests in flight (AIMD) between 1 and --workers'
+    )
+    
+    parser.add_argument(
+        '--initial-concurrency',
+        type=int,
+        default=1,
+        help='Starting in-flight limit for --adaptive-concurrency (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume an interrupted run from the checkpoint journal next to --output'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only re-page services that changed since the --base catalog'
+    )
+    
+    parser.add_argument(
+        '--base',
+        help='Previous catalog JSON for --incremental (single region)'
+    )
+    
+    parser.add_argument(
+        '--negative-cache-dir',
+        default=DEFAULT_NEGATIVE_CACHE_DIR,
+        help=f'Directory for the per-region cache of services without SKUs (default: {DEFAULT_NEGATIVE_CACHE_DIR})'
+    )
+    
+    parser.add_argument(
+        '--negative-cache-ttl',
+        type=float,
+        default=DEFAULT_NEGATIVE_CACHE_TTL_HOURS,
+        help=f'Hours a cached "no SKUs" answer is trusted (default: {DEFAULT_NEGATIVE_CACHE_TTL_HOURS})'
+    )
+    
+    parser.add_argument(
+        '--negative-sweep',
+        type=int,
+        default=DEFAULT_NEGATIVE_SWEEP,
+        help=f'Cached services to re-verify at the end of each run, before the catalog is saved '
+             f'(default: {DEFAULT_NEGATIVE_SWEEP}; 0 to skip)'
+    )
+    
+    parser.add_argument(
+        '--no-negative-cache',
+        action='store_true',
+        help='Fetch every service, ignoring and not updating the negative cache'
+    )
+    
+    parser.add_argument(
+        '--run-report',
+        help='JSON run report with per-request telemetry (default: <output>_run_report.json)'
+    )
+    
+    parser.add_argument(
+        '--prometheus-textfile',
+        help='Prometheus textfile with the run metrics (default: <output>_metrics.prom)'
+    )
+    
+    parser.add_argument(
+        '--api-base-url',
+        default=GCPBillingCatalogClient.API_BASE,
+        help='Cloud Billing API base URL, e.g. a local gcp-catalog-standin.py '
+             f'(default: {GCPBillingCatalogClient.API_BASE})'
+    )
+    
+    parser.add_argument(
+        '--access-token',
+        help='Use this access token as given instead of gcloud or a key file (e.g. for a stand-in server)'
+    )
+    
+    parser.add_argument(
+        '--request-profile',
+        choices=sorted(REQUEST_PROFILES),
+        default='default',
+        help='How SKUs are listed: default (pageSize 100, full objects) or minimal '
+             f'(pageSize {MAX_PAGE_SIZE}, gzip, pinned currency, narrowed fields)'
+    )
+    
+    parser.add_argument(
+        '--currency-code',
+        help='Currency requested for prices (default: USD with --request-profile minimal, else API default)'
+    )
+    
+    parser.add_argument(
+        '--compare-report',
+        help='Earlier *_run_report.json to compare requests and bytes against in this run\'s report'
+    )
+    
+    parser.add_argument(
+        '--history-db',
+        help='SQLite price history to append this download\'s price changes to (see gcp_price_history.py)'
+    )
+    
+    parser.add_argument(
+        '--derive-currency',
+        nargs='+',
+        metavar='CODE',
+        help='Also write catalogs in these currencies (e.g. IDR EUR), converted locally from the USD download'
+    )
+    
+    parser.add_argument(
+        '--fx-table',
+        default=DEFAULT_FX_TABLE,
+        help=f'Cached USD conversion rates used by --derive-currency (default: {DEFAULT_FX_TABLE})'
+    )
+    
+    parser.add_argument(
+        '--fx-max-age',
+        type=float,
+        default=DEFAULT_FX_MAX_AGE_HOURS,
+        help=f'Hours a cached conversion rate is used before it is probed again (default: {DEFAULT_FX_MAX_AGE_HOURS})'
+    )
+    
+    parser.add_argument(
+        '--fx-source',
+        choices=['probe', 'table'],
+        default='probe',
+        help='Probe the API for missing or stale rates (default), or only use the --fx-table'
+    )
+    
+    parser.add_argument(
+        '--token-source',
+        choices=['gcloud', 'key-file'],
+        default='gcloud',
+        help='Get access tokens from the gcloud CLI (default) or mint them from the '
+             'GOOGLE_APPLICATION_CREDENTIALS service account key'
+    )
+    
+    parser.add_argument(
+        '--token-cache',
+        default=DEFAULT_TOKEN_CACHE_FILE,
+        help=f'File caching the access token and its expiry (default: {DEFAULT_TOKEN_CACHE_FILE})'
+    )
+    
+    parser.add_argument(
+        '--no-token-cache',
+        action='store_true',
+        help='Do not read or write the access token cache'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -389,29 +2930,202 @@ Examples:
     )
     
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.requests_per_minute <= 0:
+        parser.error('--requests-per-minute must be positive')
+    regions = None
+    if args.region:
+        regions = [r.strip() for value in args.region for r in value.split(',') if r.strip()]
+        if not regions:
+            parser.error('--region requires at least one region')
+    if args.hedge_percentile is not None and not 50 <= args.hedge_percentile < 100:
+        parser.error('--hedge-percentile must be at least 50 and below 100')
+    if args.initial_concurrency < 1:
+        parser.error('--initial-concurrency must be at least 1')
+    if args.negative_cache_ttl <= 0:
+        parser.error('--negative-cache-ttl must be positive')
+    if args.negative_sweep < 0:
+        parser.error('--negative-sweep cannot be negative')
+    if args.format == 'ndjson' and (args.resume or args.incremental):
+        parser.error('--format ndjson cannot be combined with --resume or --incremental')
+    if args.gzip and args.format in ('ndjson', 'sharded'):
+        parser.error('--gzip applies to --format json and json-v2')
+    if args.pipeline_queue_size < 1:
+        parser.error('--pipeline-queue-size must be at least 1')
+    derive_currencies = []
+    if args.derive_currency:
+        derive_currencies = [code.strip().upper() for value in args.derive_currency
+                             for code in value.split(',') if code.strip()]
+        if args.format not in ('json', 'json-v2'):
+            parser.error('--derive-currency applies to --format json and json-v2')
+        if args.currency_code and args.currency_code.upper() != BASE_CURRENCY:
+            parser.error(f'--derive-currency converts from a {BASE_CURRENCY} download; drop --currency-code')
+        args.currency_code = BASE_CURRENCY
+        derive_currencies = [code for code in derive_currencies if code != BASE_CURRENCY]
+    if args.gzip and not args.output.endswith('.gz'):
+        args.output += '.gz'
+    if args.incremental:
+        if not args.base:
+            parser.error('--incremental requires --base')
+        if regions is None or len(regions) != 1:
+            parser.error('--incremental supports a single --region')
+    key_file = None
+    if args.token_source == 'key-file':
+        key_file = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
+        if not key_file or not os.path.isfile(key_file):
+            parser.error('--token-source key-file requires GOOGLE_APPLICATION_CREDENTIALS to name a key file')
     
     # Setup logging
     setup_logging(args.verbose)
     
     try:
+        incremental_base = None
+        if args.incremental:
+            incremental_base = IncrementalBase.load(args.base)
+            if incremental_base.region != regions[0]:
+                raise ValueError(f"Base catalog is for region {incremental_base.region}, not {regions[0]}")
+        
+        service_weights = None
+        if args.schedule_from:
+            service_weights = load_service_weights(args.schedule_from)
+            if logger:
+                logger.info(f"Scheduling {len(service_weights)} services largest first from {', '.join(args.schedule_from)}")
+        
         # Initialize client
-        client = GCPBillingCatalogClient(args.region)
+        token_provider = None
+        if not args.access_token:
+            token_provider = AccessTokenProvider(
+                cache_file=None if args.no_token_cache else args.token_cache,
+                key_file=key_file
+            )
+        client = GCPBillingCatalogClient(
+            regions,
+            workers=args.workers,
+            access_token=args.access_token,
+            requests_per_minute=args.requests_per_minute,
+            incremental_base=incremental_base,
+            token_provider=token_provider,
+            api_base=args.api_base_url,
+            service_weights=service_weights,
+            hedge_percentile=args.hedge_percentile / 100 if args.hedge_percentile else None,
+            adaptive_concurrency=args.adaptive_concurrency,
+            initial_concurrency=args.initial_concurrency,
+            request_profile=args.request_profile,
+            currency_code=args.currency_code
+        )
+        
+        # Download catalogs for all requested regions in one pass
+        checkpoint = CheckpointJournal(CheckpointJournal.path_for(args.output), regions)
+        if args.resume and not os.path.exists(checkpoint.path):
+            if logger:
+                logger.warning(f"No checkpoint journal at {checkpoint.path}; starting a full download")
+        negative_cache = None
+        if not args.no_negative_cache:
+            negative_cache = NegativeCache(args.negative_cache_dir, regions, args.negative_cache_ttl,
+                                           api_base=args.api_base_url)
+        stream_writer = None
+        if args.format == 'ndjson':
+            # SKUs are on disk as soon as they arrive, so no journal is kept
+            data_file, manifest_file, summary_base = ndjson_output_files(args.output)
+            stream_writer = NDJSONCatalogWriter(data_file)
+            checkpoint = None
+        pipeline = None
+        pipeline_writer = None
+        if args.pipeline:
+            if stream_writer:
+                pipeline = DownloadPipeline(stream_writer, args.pipeline_queue_size, retain=False)
+            else:
+                if args.format == 'sharded':
+                    pipeline_writer = ShardCatalogWriter(args.output, regions is None or len(regions) > 1)
+                else:
+                    pipeline_writer = FragmentCatalogWriter(args.output, regions is None or len(regions) > 1,
+                                                            version=2 if args.format == 'json-v2' else 1)
+                pipeline = DownloadPipeline(pipeline_writer, args.pipeline_queue_size)
+        if token_provider:
+            token_provider.start()
+        try:
+            catalogs = client.download_catalogs(
+                checkpoint=checkpoint,
+                resume=args.resume,
+                negative_cache=negative_cache,
+                negative_sweep=args.negative_sweep,
+                stream_writer=stream_writer,
+                pipeline=pipeline
+            )
+        finally:
+            if token_provider:
+                token_provider.stop()
+            if stream_writer:
+                stream_writer.close()
+        multi_region = regions is None or len(regions) > 1
         
-        # Download catalog
-        catalog = client.download_complete_catalog()
+        if stream_writer:
+            stream_writer.write_manifest(catalogs, manifest_file)
+            if logger:
+                logger.info(f"Streamed {stream_writer.records} SKU records to: {data_file}")
+        
+        for region, catalog in catalogs.items():
+            record_catalog_currency(catalog)
+            # Save catalog
+            if stream_writer:
+                save_summary(catalog, region_output_file(summary_base, region, multi_region)
+                             .replace('.json', '_summary.json'))
+            elif pipeline_writer:
+                started = time.monotonic()
+                pipeline_writer.finalize(region, catalog)
+                pipeline.finalize_seconds += time.monotonic() - started
+            elif args.format == 'sharded':
+                save_sharded_catalog(catalog, region_output_file(args.output, region, multi_region))
+            else:
+                save_catalog(catalog, region_output_file(args.output, region, multi_region),
+                             version=2 if args.format == 'json-v2' else 1)
+            
+            # Print summary
+            print_summary(catalog)
+        
+        if derive_currencies:
+            fx_table = FXTable(args.fx_table)
+            rates = resolve_conversion_rates(client, catalogs, derive_currencies, fx_table,
+                                             args.fx_max_age, probe=args.fx_source == 'probe')
+            for derived_file in save_currency_catalogs(catalogs, rates, args.output, multi_region, fx_table,
+                                                       version=2 if args.format == 'json-v2' else 1):
+                print(f"Derived catalog: {derived_file}")
         
-        # Save catalog
-        save_catalog(catalog, args.output)
+        if pipeline:
+            client.last_run_stats['pipeline'] = pipeline.report()
+        print_run_stats(client.last_run_stats)
         
-        # Print summary
-        print_summary(catalog)
+        report_file, metrics_file = run_report_files(args.output)
+        run_report = client.telemetry.report(client.last_run_stats, regions,
+                                             {'name': client.request_profile, **client.profile})
+        if args.compare_report:
+            with open(args.compare_report, 'r', encoding='utf-8') as f:
+                compare_run_reports(run_report, json.load(f))
+        save_run_report(run_report, args.run_report or report_file)
+        save_prometheus_metrics(run_report, args.prometheus_textfile or metrics_file)
+        print_telemetry(run_report)
+        
+        if client.refresh_report:
+            save_refresh_report(client.refresh_report, args.output)
+        
+        if args.history_db:
+            record_price_history(args.history_db, catalogs, data_file if stream_writer else None)
+        
+        # The catalogs are on disk, so the journal is no longer needed
+        if checkpoint and client.last_run_stats.get('failed_services'):
+            if logger:
+                logger.warning(f"{client.last_run_stats['failed_services']} services failed; keeping "
+                               f"{checkpoint.path} so --resume can retry them")
+        elif checkpoint:
+            checkpoint.remove()
         
         if logger:
             logger.info("SKU catalog download completed successfully!")
         
     except KeyboardInterrupt:
         if logger:
-            logger.info("Download interrupted by user")
+            logger.info("Download interrupted by user; rerun with --resume to continue")
         sys.exit(1)
     except Exception as e:
         if logger:
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+GCP Catalog Diff - What changed between two SKU catalog downloads
+
+Compares an old and a new download before the new one is pushed into
+Morpheus. Each catalog is streamed into a compact hash index keyed by
+(region, skuId) holding one small tuple per SKU, so two full catalogs are
+never held in memory; the indexes of both files are built in parallel
+worker processes and then compared.
+
+Features:
+- Reports added, removed and repriced SKUs per service and resource family
+- Reads every format gcp-sku-downloader.py writes: v1/v2 catalogs (optionally
+  gzipped), sharded catalogs and multi-region NDJSON streams or their manifests
+- "Repriced" uses the same rule as gcp_price_history.py: a change in the
+  current tier prices, usage unit or currency
+- Streams JSON catalogs service by service when the optional ijson package
+  is installed (pip install ijson); loads them whole otherwise, with a warning
+- JSON output for scripting and --fail-on-change for use as a pre-push gate
+
+Usage:
+    python gcp_catalog_diff.py gcp_skus_20250807_194211.json gcp_skus_20250907_101500.json
+    python gcp_catalog_diff.py old_manifest.json new_manifest.json --details 50
+    python gcp_catalog_diff.py old.json.gz new.json.gz --json diff.json --fail-on-change
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from gcp_catalog_format import iter_sku_records, streams_sku_records
+from gcp_price_history import price_hash, price_tiers
+
+CHANGE_TYPES = ('added', 'removed', 'repriced')
+
+
+def price_key(sku):
+    """Return (digest, unit_price, usage_unit, currency_code) for a SKU's current price.
+
+    The digest is the history store's price_hash of the tier list, usage
+    unit and currency: it is compared across the worker processes that
+    index each side, so it must not depend on the process's hash seed.
+    unit_price is the highest tier price as in the history store.
+    """
+    tiers, usage_unit, currency_code, _ = price_tiers(sku)
+    digest = price_hash(tiers, usage_unit, currency_code)
+    return digest, max((price for _, price in tiers), default=None), usage_unit, currency_code
+
+
+class CatalogIndex:
+    """Compact index of one catalog: (region, skuId) -> price and grouping fields."""
+
+    def __init__(self):
+        self.entries = {}
+        self.service_names = {}
+        self.regions = set()
+        self.elapsed = 0.0
+
+    @classmethod
+    def build(cls, path):
+        start = time.perf_counter()
+        index = cls()
+        intern = sys.intern
+        for region, service_id, service_name, sku in iter_sku_records(path):
+            region = intern(region)
+            service_id = intern(service_id)
+            index.regions.add(region)
+            index.service_names.setdefault(service_id, service_name)
+            family = intern(sku.get('category', {}).get('resourceFamily') or 'Unknown')
+            index.entries[(region, sku['skuId'])] = (service_id, family, sku.get('description', ''),
+                                                    *price_key(sku))
+        index.elapsed = round(time.perf_counter() - start, 3)
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CatalogDiff:
+    """Added, removed and repriced SKUs between two catalogs, grouped by service and family."""
+
+    def __init__(self, details_limit=20):
+        self.details_limit = details_limit
+        self.counts = defaultdict(lambda: dict.fromkeys(CHANGE_TYPES, 0))
+        self.details = []
+        self.totals = dict.fromkeys(CHANGE_TYPES, 0)
+        self.unchanged = 0
+        self.service_names = {}
+        self.regions = {'old': [], 'new': []}
+        self.sku_counts = {'old': 0, 'new': 0}
+        self.elapsed = {}
+
+    def record(self, change_type, region, sku_id, service_id, family, description, old=None, new=None):
+        self.totals[change_type] += 1
+        self.counts[(service_id, family)][change_type] += 1
+        if len(self.details) < self.details_limit:
+            self.details.append({
+                'change': change_type,
+                'region': region,
+                'sku_id': sku_id,
+                'service_id': service_id,
+                'resource_family': family,
+                'description': description,
+                'old_price': old,
+                'new_price': new
+            })
+
+    @property
+    def changed(self):
+        return any(self.totals.values())
+
+    def by_service(self):
+        """Nested counts: service name -> {'total': counts, 'families': {family: counts}}."""
+        services = {}
+        for (service_id, family), counts in sorted(self.counts.items()):
+            name = self.service_names.get(service_id, service_id)
+            entry = services.setdefault(name, {'service_id': service_id,
+                                               'total': dict.fromkeys(CHANGE_TYPES, 0), 'families': {}})
+            entry['families'][family] = counts
+            for change_type, count in counts.items():
+                entry['total'][change_type] += count
+        return services
+
+    def to_dict(self):
+        return {
+            'regions': self.regions,
+            'sku_counts': self.sku_counts,
+            'totals': dict(self.totals, unchanged=self.unchanged),
+            'services': self.by_service(),
+            'details': self.details,
+            'elapsed_seconds': self.elapsed
+        }
+
+
+def _price(unit_price, usage_unit, currency_code):
+    return {'unit_price': unit_price, 'usage_unit': usage_unit, 'currency_code': currency_code}
+
+
+def build_indexes(paths, jobs=2, mp_context=None):
+    """Build the CatalogIndex of each path, in parallel processes when jobs > 1."""
+    if jobs <= 1 or len(paths) == 1:
+        return [CatalogIndex.build(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths)), mp_context=mp_context) as executor:
+        return list(executor.map(CatalogIndex.build, paths))
+
+
+def diff_catalogs(old_path, new_path, details_limit=20, jobs=2, mp_context=None):
+    """Index both catalogs and return a CatalogDiff.
+
+    ``mp_context`` is the multiprocessing context of the indexing workers
+    (default: the platform's start method).
+    """
+    diff = CatalogDiff(details_limit)
+    start = time.perf_counter()
+    old, new = build_indexes([old_path, new_path], jobs, mp_context)
+    diff.elapsed['index_old'] = old.elapsed
+    diff.elapsed['index_new'] = new.elapsed
+    diff.elapsed['index_wall'] = round(time.perf_counter() - start, 3)
+    for side, index in (('old', old), ('new', new)):
+        diff.sku_counts[side] = len(index)
+        diff.regions[side] = sorted(index.regions)
+        diff.service_names.update(index.service_names)
+
+    start = time.perf_counter()
+    old_entries = old.entries
+    for key, (service_id, family, description, digest, *price) in new.entries.items():
+        previous = old_entries.pop(key, None)
+        if previous is None:
+            diff.record('added', *key, service_id, family, description, new=_price(*price))
+        elif previous[3] != digest:
+            diff.record('repriced', *key, service_id, family, description,
+                        old=_price(*previous[4:]), new=_price(*price))
+        else:
+            diff.unchanged += 1
+
+    # Whatever is left in the old index was not in the new catalog. Regions
+    # only present in the old file count as removed too: a region dropped from
+    # a multi-region download is a change worth seeing before a push.
+    for key, (service_id, family, description, _, *price) in old_entries.items():
+        diff.record('removed', *key, service_id, family, description, old=_price(*price))
+    diff.elapsed['compare'] = round(time.perf_counter() - start, 3)
+    return diff
+
+
+def format_price(price):
+    if not price or price.get('unit_price') is None:
+        return '-'
+    return f"{price['unit_price']:.6f} {price.get('currency_code') or ''}/{price.get('usage_unit') or '?'}"
+
+
+def print_diff(diff, old_path, new_path):
+    print(f"Old: {old_path} ({diff.sku_counts['old']:,} SKUs, {', '.join(diff.regions['old']) or '-'})")
+    print(f"New: {new_path} ({diff.sku_counts['new']:,} SKUs, {', '.join(diff.regions['new']) or '-'})")
+    totals = diff.totals
+    print(f"Added: {totals['added']:,}  Removed: {totals['removed']:,}  "
+          f"Repriced: {totals['repriced']:,}  Unchanged: {diff.unchanged:,}")
+    if not diff.changed:
+        print("No changes.")
+        return
+
+    print("\nChanges by service and resource family (+added -removed ~repriced):")
+    for name, entry in diff.by_service().items():
+        total = entry['total']
+        print(f"  {name}: +{total['added']} -{total['removed']} ~{total['repriced']}")
+        for family, counts in entry['families'].items():
+            print(f"      {family:<24} +{counts['added']} -{counts['removed']} ~{counts['repriced']}")
+
+    if diff.details:
+        shown = len(diff.details)
+        print(f"\nFirst {shown} of {sum(totals.values()):,} changes:")
+        for change in diff.details:
+            prices = format_price(change['new_price'] or change['old_price'])
+            if change['change'] == 'repriced':
+                prices = f"{format_price(change['old_price'])} -> {format_price(change['new_price'])}"
+            print(f"  {change['change']:<8} {change['region']:<24} {change['sku_id']:<16} {prices}")
+            print(f"      {diff.service_names.get(change['service_id'], change['service_id'])}: "
+                  f"{change['description']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report added, removed and repriced SKUs between two catalog downloads",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Examples:\n"
+            "  python gcp_catalog_diff.py gcp_skus_old.json gcp_skus_new.json\n"
+            "  python gcp_catalog_diff.py old_manifest.json new_manifest.json --details 50\n"
+            "  python gcp_catalog_diff.py old.json.gz new.json.gz --json diff.json --fail-on-change\n"
+        ),
+    )
+    parser.add_argument('old', help='Previous download: catalog (v1/v2, optionally gzipped), NDJSON stream or manifest')
+    parser.add_argument('new', help='New download in any of the same formats')
+    parser.add_argument('--details', type=int, default=20,
+                        help='Number of individual changes to list (default: 20, 0 to disable)')
+    parser.add_argument('--json', metavar='FILE', help="Write the diff as JSON ('-' for stdout)")
+    parser.add_argument('--jobs', type=int, default=min(2, os.cpu_count() or 1),
+                        help='Processes used to index the two catalogs (default: 2, or 1 on a single CPU)')
+    parser.add_argument('--fail-on-change', action='store_true',
+                        help='Exit with status 1 when anything changed')
+    args = parser.parse_args()
+
+    loaded_whole = [path for path in (args.old, args.new) if not streams_sku_records(path)]
+    if loaded_whole:
+        print(f"Warning: ijson is not installed, so {' and '.join(loaded_whole)} will be loaded whole "
+              f"instead of streamed; memory grows with the catalog (pip install ijson)", file=sys.stderr)
+
+    start = time.perf_counter()
+    diff = diff_catalogs(args.old, args.new, details_limit=max(0, args.details), jobs=args.jobs)
+    if args.json == '-':
+        json.dump(diff.to_dict(), sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_diff(diff, args.old, args.new)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(diff.to_dict(), f, indent=2, ensure_ascii=False)
+            print(f"\nDiff saved to: {args.json}")
+        print(f"\nCompared in {time.perf_counter() - start:.2f}s "
+              f"(indexing {diff.elapsed['index_wall']:.2f}s, comparing {diff.elapsed['compare']:.2f}s)")
+    return 1 if args.fail_on_change and diff.changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
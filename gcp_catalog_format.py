@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+GCP SKU Catalog Format - Reading and writing downloaded SKU catalogs
+
+Shared by gcp-sku-downloader.py and the price sync scripts so every tool reads
+every catalog format the downloader can write.
+
+Formats:
+- v1: the original catalog written by gcp-sku-downloader.py, indented JSON in
+  which every SKU appears twice (in 'skus' and in 'categories') and
+  'category_summary' duplicates 'sku_summary'
+- v2: compact JSON marked with "format_version": 2; 'categories' holds index
+  lists into the service's 'skus' array and 'category_summary' is dropped
+- sharded: a directory with one file per service and a manifest.json holding
+  the metadata, summaries and, per service, its name, SKU count and the byte
+  offset and length of each resource family inside the service's file. Each
+  line of a service file is the JSON array of one resource family's SKUs, so
+  a reader can load just the services and families it needs
+
+Either JSON format may be gzip-compressed; compression is detected from the file
+content, not the extension. load_catalog always returns the v1 layout, with
+the category lists sharing the SKU objects rather than copying them.
+
+iter_sku_records streams (region, service, SKU) records from a catalog, an
+NDJSON stream or its manifest. JSON catalogs are streamed one service at a
+time when the optional ijson package is installed and loaded whole otherwise.
+
+Usage:
+    python gcp_catalog_format.py convert catalog.json catalog_v2.json.gz --version 2
+    python gcp_catalog_format.py info catalog_v2.json.gz
+    python gcp_catalog_format.py shard catalog.json catalog_shards
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+from collections import defaultdict
+
+FORMAT_VERSION = 2
+GZIP_MAGIC = b'\x1f\x8b'
+SHARD_MANIFEST = 'manifest.json'
+
+
+def open_catalog_file(path, mode='r'):
+    """Open a catalog for text I/O, transparently handling gzip.
+
+    Reads detect gzip from the magic bytes; writes compress when the path
+    ends in '.gz'.
+    """
+    if 'r' in mode:
+        with open(path, 'rb') as f:
+            compressed = f.read(2) == GZIP_MAGIC
+    else:
+        compressed = path.endswith('.gz')
+    if compressed:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def open_binary(path):
+    """Open a possibly gzipped file for binary reads."""
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    return gzip.open(path, 'rb') if compressed else open(path, 'rb')
+
+
+def ndjson_source(path):
+    """Return (data_file, manifest) if ``path`` is an NDJSON stream or its manifest, else None.
+
+    A stream is recognised by its first record (written by
+    gcp-sku-downloader.py --format ndjson), so the extension doesn't matter.
+    """
+    with open_catalog_file(path) as f:
+        head = f.read(64)
+    if head.startswith('{"region":'):
+        root = path[:-3] if path.endswith('.gz') else path
+        root = root[:-len('.ndjson')] if root.endswith('.ndjson') else os.path.splitext(root)[0]
+        manifest_file = f"{root}_manifest.json"
+        manifest = None
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        return path, manifest
+    if '"format": "ndjson"' in head or '"format":"ndjson"' in head:
+        with open_catalog_file(path) as f:
+            manifest = json.load(f)
+        return os.path.join(os.path.dirname(path), manifest['data_file']), manifest
+    return None
+
+
+def iter_sku_records(path):
+    """Yield (region, service_id, service_name, sku) for every SKU in a catalog or NDJSON stream."""
+    manifest_path = shard_manifest_path(path)
+    if manifest_path:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        region = manifest['metadata']['region']
+        for service_id, entry in manifest['services'].items():
+            service_name = entry['service_info'].get('display_name', service_id)
+            for family_skus in _read_shard(manifest_path, entry).values():
+                for sku in family_skus:
+                    yield region, service_id, service_name, sku
+        return
+
+    source = ndjson_source(path)
+    if source:
+        data_file, manifest = source
+        service_names = {}
+        for region_data in (manifest or {}).get('regions', {}).values():
+            for service_id, info in region_data.get('services', {}).items():
+                service_names[service_id] = info.get('display_name', service_id)
+        with open_catalog_file(data_file) as f:
+            for line in f:
+                record = json.loads(line)
+                service_id = record['service_id']
+                yield record['region'], service_id, service_names.get(service_id, service_id), record['sku']
+        return
+
+    ijson = _import_ijson()
+    if ijson is None:
+        catalog = load_catalog(path)
+        services = catalog.get('services', {}).items()
+        region = catalog['metadata']['region']
+    else:
+        with open_binary(path) as f:
+            region = next(ijson.items(f, 'metadata'))['region']
+        services = _stream_services(path, ijson)
+    for service_id, service_data in services:
+        service_name = service_data['service_info'].get('display_name', service_id)
+        for sku in service_data.get('skus', []):
+            yield region, service_id, service_name, sku
+
+
+def _import_ijson():
+    try:
+        import ijson
+    except ImportError:
+        return None
+    return ijson
+
+
+def streams_sku_records(path):
+    """True when iter_sku_records() streams ``path``, False when it loads the JSON catalog whole."""
+    return bool(shard_manifest_path(path) or ndjson_source(path)) or _import_ijson() is not None
+
+
+def _stream_services(path, ijson):
+    with open_binary(path) as f:
+        # use_float keeps numbers as plain floats instead of Decimal
+        yield from ijson.kvitems(f, 'services', use_float=True)
+
+
+def catalog_format_version(catalog):
+    return catalog.get('format_version', 1)
+
+
+def _v2_service(service_data):
+    skus = service_data.get('skus', [])
+    categories = defaultdict(list)
+    for index, sku in enumerate(skus):
+        categories[sku.get('category', {}).get('resourceFamily', 'Unknown')].append(index)
+    return {
+        'service_info': service_data['service_info'],
+        'skus': skus,
+        'categories': dict(categories)
+    }
+
+
+def to_v2(catalog):
+    """Convert a v1 catalog to the compact v2 layout."""
+    services = {
+        service_id: _v2_service(service_data)
+        for service_id, service_data in catalog.get('services', {}).items()
+    }
+    compact = {
+        'format_version': FORMAT_VERSION,
+        'metadata': catalog['metadata'],
+        'services': services,
+        'sku_summary': catalog.get('sku_summary', {})
+    }
+    for key, value in catalog.items():
+        if key not in compact and key not in ('category_summary', 'format_version'):
+            compact[key] = value
+    return compact
+
+
+def from_v2(catalog):
+    """Expand a v2 catalog into the v1 layout without copying SKU objects."""
+    expanded = {
+        'metadata': catalog['metadata'],
+        'services': {},
+        'sku_summary': catalog.get('sku_summary', {}),
+        'category_summary': dict(catalog.get('sku_summary', {}))
+    }
+    for service_id, service_data in catalog.get('services', {}).items():
+        skus = service_data.get('skus', [])
+        expanded['services'][service_id] = {
+            'service_info': service_data['service_info'],
+            'skus': skus,
+            'categories': {
+                family: [skus[index] for index in indexes]
+                for family, indexes in service_data.get('categories', {}).items()
+            }
+        }
+    for key, value in catalog.items():
+        if key not in expanded and key != 'format_version':
+            expanded[key] = value
+    return expanded
+
+
+def load_catalog(path, services=None, families=None):
+    """Load a v1, v2 or sharded catalog in the v1 layout.
+
+    ``services`` (IDs or display names) and ``families`` (resource families)
+    restrict what is loaded; a sharded catalog then reads only those byte
+    ranges, the JSON formats are filtered after loading. Files that are not
+    catalogs (for example *_summary.json) are returned unchanged.
+    """
+    manifest_path = shard_manifest_path(path)
+    if manifest_path:
+        return load_sharded_catalog(manifest_path, services, families)
+    with open_catalog_file(path) as f:
+        catalog = json.load(f)
+    if catalog_format_version(catalog) == 2:
+        catalog = from_v2(catalog)
+    if services is not None or families is not None:
+        catalog = filter_catalog(catalog, services, families)
+    return catalog
+
+
+def select_services(services_info, services):
+    """Return the IDs in ``services_info`` ({id: service_info}) matching IDs or display names in ``services``."""
+    if services is None:
+        return list(services_info)
+    wanted = {name.lower() for name in services}
+    return [
+        service_id for service_id, info in services_info.items()
+        if service_id.lower() in wanted or info.get('display_name', '').lower() in wanted
+    ]
+
+
+def _summarize(catalog, services, partial):
+    """Fill in the summaries and SKU total of a catalog assembled from a subset of services.
+
+    A partial catalog's total_skus and total_services count what was
+    loaded; catalog_total_skus and catalog_total_services keep the whole
+    catalog's totals (from its metadata or shard manifest).
+    """
+    sku_summary = defaultdict(int)
+    for service_data in services.values():
+        for family, skus in service_data['categories'].items():
+            sku_summary[family] += len(skus)
+    catalog['services'] = services
+    catalog['sku_summary'] = dict(sku_summary)
+    catalog['category_summary'] = dict(sku_summary)
+    if partial:
+        metadata = catalog['metadata']
+        catalog['metadata'] = dict(metadata, partial=True,
+                                   catalog_total_skus=metadata.get('catalog_total_skus', metadata.get('total_skus')),
+                                   catalog_total_services=metadata.get('catalog_total_services',
+                                                                       metadata.get('total_services')),
+                                   total_skus=sum(sku_summary.values()), total_services=len(services))
+    return catalog
+
+
+def filter_catalog(catalog, services=None, families=None):
+    """Keep only the given services and resource families of a v1-layout catalog."""
+    services_info = {sid: data['service_info'] for sid, data in catalog.get('services', {}).items()}
+    selected = {}
+    for service_id in select_services(services_info, services):
+        service_data = catalog['services'][service_id]
+        categories = {family: skus for family, skus in service_data.get('categories', {}).items()
+                      if families is None or family in families}
+        # v1 files hold copies of the SKUs in 'categories', so match by ID rather than identity
+        kept = {sku.get('skuId') for skus in categories.values() for sku in skus}
+        selected[service_id] = {
+            'service_info': service_data['service_info'],
+            'skus': [sku for sku in service_data.get('skus', []) if sku.get('skuId') in kept],
+            'categories': categories
+        }
+    return _summarize(dict(catalog), selected, partial=True)
+
+
+def shard_manifest_path(path):
+    """Return the manifest of a sharded catalog given its directory or manifest, else None."""
+    if os.path.isdir(path):
+        manifest = os.path.join(path, SHARD_MANIFEST)
+        return manifest if os.path.exists(manifest) else None
+    if os.path.basename(path) == SHARD_MANIFEST:
+        return path
+    return None
+
+
+def catalog_files(path, services=None):
+    """Return the files load_catalog(path, services) reads: the catalog itself, or a manifest and its shards."""
+    manifest_path = shard_manifest_path(path)
+    if not manifest_path:
+        return [path]
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    services_info = {sid: entry['service_info'] for sid, entry in manifest['services'].items()}
+    directory = os.path.dirname(manifest_path)
+    return [manifest_path] + [
+        os.path.join(directory, manifest['services'][service_id]['file'])
+        for service_id in select_services(services_info, services)
+    ]
+
+
+def _read_shard(manifest_path, entry, families=None):
+    """Read {family: [sku, ...]} of one service shard, seeking to just the families wanted."""
+    loaded = {}
+    with open(os.path.join(os.path.dirname(manifest_path), entry['file']), 'rb') as f:
+        for family, span in entry['families'].items():
+            if families is not None and family not in families:
+                continue
+            f.seek(span['offset'])
+            loaded[family] = json.loads(f.read(span['length']))
+    return loaded
+
+
+def load_sharded_catalog(manifest_path, services=None, families=None):
+    """Load the selected services and families of a sharded catalog in the v1 layout."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    services_info = {sid: entry['service_info'] for sid, entry in manifest['services'].items()}
+    loaded = {}
+    for service_id in select_services(services_info, services):
+        categories = _read_shard(manifest_path, manifest['services'][service_id], families)
+        loaded[service_id] = {
+            'service_info': services_info[service_id],
+            'skus': [sku for skus in categories.values() for sku in skus],
+            'categories': categories
+        }
+    catalog = {key: value for key, value in manifest.items() if key not in ('format', 'services')}
+    return _summarize(catalog, loaded, partial=services is not None or families is not None)
+
+
+def write_sharded_catalog(catalog, directory):
+    """Write a v1-layout catalog as one file per service plus manifest.json; returns the manifest path.
+
+    A service's SKUs are grouped by resource family in its file, keeping
+    their relative order, so its 'skus' list reloads in family order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    shards = {
+        service_id: write_service_shard(directory, service_id, service_data.get('skus', []))
+        for service_id, service_data in catalog.get('services', {}).items()
+    }
+    return write_shard_manifest(catalog, directory, shards)
+
+
+def write_service_shard(directory, service_id, skus):
+    """Write one service's shard file and return its manifest entry (without service_info)."""
+    by_family = defaultdict(list)
+    for sku in skus:
+        by_family[sku.get('category', {}).get('resourceFamily', 'Unknown')].append(sku)
+    filename = f"{service_id}.json"
+    families = {}
+    offset = 0
+    with open(os.path.join(directory, filename), 'wb') as f:
+        for family, family_skus in by_family.items():
+            line = json.dumps(family_skus, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            f.write(line)
+            families[family] = {'offset': offset, 'length': len(line), 'sku_count': len(family_skus)}
+            offset += len(line)
+    return {'file': filename, 'bytes': offset, 'sku_count': len(skus), 'families': families}
+
+
+def write_shard_manifest(catalog, directory, shards):
+    """Write manifest.json for ``catalog`` given {service_id: write_service_shard entry}; returns its path."""
+    services = {
+        service_id: dict(service_info=service_data['service_info'], **shards[service_id])
+        for service_id, service_data in catalog.get('services', {}).items()
+        if service_id in shards
+    }
+    manifest = {'format': 'sharded', 'metadata': catalog['metadata'], 'sku_summary': catalog.get('sku_summary', {})}
+    for key, value in catalog.items():
+        if key not in manifest and key not in ('services', 'category_summary', 'format_version'):
+            manifest[key] = value
+    manifest['services'] = services
+    manifest_path = os.path.join(directory, SHARD_MANIFEST)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest_path
+
+
+def dump_catalog(catalog, path, version=1):
+    """Write a catalog as v1 (indented) or v2 (compact); '.gz' paths are gzipped."""
+    with open_catalog_file(path, 'w') as f:
+        if version == 2:
+            json.dump(to_v2(catalog), f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(catalog, f, indent=2, ensure_ascii=False)
+
+
+# Stands in for the services while the rest of a catalog is serialized
+_SERVICES_PLACEHOLDER = '\x00services\x00'
+
+
+def service_fragment(service_id, service_data, version=1):
+    """Serialize one service as its ``"id": {...}`` entry of a catalog's 'services' object.
+
+    Fragments joined by write_catalog_from_fragments give the same file as
+    dump_catalog, so services can be serialized as soon as they are done.
+    """
+    key = json.dumps(service_id, ensure_ascii=False)
+    if version == 2:
+        return key + ':' + json.dumps(_v2_service(service_data), ensure_ascii=False, separators=(',', ':'))
+    body = json.dumps(service_data, indent=2, ensure_ascii=False)
+    return f"    {key}: " + body.replace('\n', '\n    ')
+
+
+def write_catalog_from_fragments(catalog, fragments, path, version=1):
+    """Write ``catalog`` with its services taken from pre-serialized fragments.
+
+    ``fragments`` is an iterable of service_fragment strings; the services
+    already in ``catalog`` are ignored.
+    """
+    placeholder = json.dumps(_SERVICES_PLACEHOLDER)
+    if version == 2:
+        skeleton = dict(to_v2(dict(catalog, services={})), services=_SERVICES_PLACEHOLDER)
+        head, tail = json.dumps(skeleton, ensure_ascii=False, separators=(',', ':')).split(placeholder)
+        separator, opening, closing = ',', '{', '}'
+    else:
+        skeleton = dict(catalog, services=_SERVICES_PLACEHOLDER)
+        head, tail = json.dumps(skeleton, indent=2, ensure_ascii=False).split(placeholder)
+        separator, opening, closing = ',\n', '{\n', '\n  }'
+    with open_catalog_file(path, 'w') as f:
+        f.write(head)
+        written = 0
+        for fragment in fragments:
+            f.write((separator if written else opening) + fragment)
+            written += 1
+        f.write((closing if written else '{}') + tail)
+
+
+def synthetic_catalog(num_services=50, skus_per_service=200, region='asia-southeast2', seed=42):
+    """Build a v1 catalog of realistic-looking SKUs for benchmarks and tests."""
+    rng = random.Random(seed)
+    families = [
+        ('Compute', ['CPU', 'RAM', 'N1Standard', 'GPU']),
+        ('Storage', ['PDStandard', 'SSD', 'LocalSSD']),
+        ('Network', ['Egress', 'InterregionEgress', 'Ingress']),
+        ('ApplicationServices', ['Misc'])
+    ]
+    machine_families = ['e2', 'n1', 'n2', 'n2d', 'c2', 'm1', 't2d']
+    catalog = {
+        'metadata': {
+            'region': region,
+            'download_timestamp': '2026-01-01T00:00:00',
+            'total_services': num_services,
+            'total_skus': 0
+        },
+        'services': {},
+        'sku_summary': defaultdict(int),
+        'category_summary': defaultdict(int)
+    }
+    for i in range(num_services):
+        service_id = f'{i:04X}-{rng.randrange(16 ** 4):04X}-{rng.randrange(16 ** 4):04X}'
+        display_name = 'Compute Engine' if i == 0 else f'Synthetic Service {i}'
+        skus = []
+        categories = defaultdict(list)
+        for j in range(skus_per_service):
+            family, groups = families[rng.randrange(len(families))]
+            group = groups[rng.randrange(len(groups))]
+            machine = machine_families[rng.randrange(len(machine_families))]
+            if family == 'Compute':
+                description = f'{machine.upper()} Instance {"Core" if group != "RAM" else "Ram"} running in Jakarta'
+            elif family == 'Storage':
+                description = f'{group} capacity in Jakarta'
+            else:
+                description = f'{group} traffic from Jakarta {j}'
+            sku = {
+                'name': f'services/{service_id}/skus/{service_id}-{j:05d}',
+                'skuId': f'{service_id[:4]}-{j:04X}-{rng.randrange(16 ** 4):04X}',
+                'description': description,
+                'category': {
+                    'serviceDisplayName': display_name,
+                    'resourceFamily': family,
+                    'resourceGroup': group,
+                    'usageType': rng.choice(['OnDemand', 'Preemptible', 'Commit1Yr'])
+                },
+                'serviceRegions': [region],
+                'pricingInfo': [{
+                    'summary': '',
+                    'pricingExpression': {
+                        'usageUnit': rng.choice(['h', 'GiBy.mo', 'GiBy']),
+                        'displayQuantity': 1,
+                        'tieredRates': [{
+                            'startUsageAmount': 0,
+                            'unitPrice': {
+                                'currencyCode': 'USD',
+                                'units': str(rng.randrange(3)),
+                                'nanos': rng.randrange(1_000_000_000)
+                            }
+                        }],
+                        'usageUnitDescription': 'hour',
+                        'baseUnit': 's',
+                        'baseUnitDescription': 'second',
+                        'baseUnitConversionFactor': 3600
+                    },
+                    'currencyConversionRate': 1,
+                    'effectiveTime': '2026-01-01T00:00:00.000Z'
+                }],
+                'serviceProviderName': 'Google',
+                'geoTaxonomy': {'type': 'REGIONAL', 'regions': [region]}
+            }
+            skus.append(sku)
+            categories[family].append(sku)
+            catalog['sku_summary'][family] += 1
+            catalog['category_summary'][family] += 1
+        catalog['services'][service_id] = {
+            'service_info': {
+                'service_id': service_id,
+                'display_name': display_name,
+                'business_entity_name': 'businessEntities/GCP',
+                'sku_count': len(skus)
+            },
+            'skus': skus,
+            'categories': dict(categories)
+        }
+        catalog['metadata']['total_skus'] += len(skus)
+    catalog['sku_summary'] = dict(catalog['sku_summary'])
+    catalog['category_summary'] = dict(catalog['category_summary'])
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert and inspect GCP SKU catalogs (v1/v2, optionally gzipped)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Examples:\n"
+            "  python gcp_catalog_format.py convert gcp_skus.json gcp_skus_v2.json.gz --version 2\n"
+            "  python gcp_catalog_format.py info gcp_skus_v2.json.gz\n"
+            "  python gcp_catalog_format.py shard gcp_skus.json gcp_skus_shards\n"
+        ),
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='Rewrite a catalog in another format version')
+    convert.add_argument('source', help='Catalog to read (v1 or v2, optionally gzipped)')
+    convert.add_argument('destination', help="Catalog to write; a '.gz' suffix enables gzip")
+    convert.add_argument('--version', type=int, choices=[1, 2], default=FORMAT_VERSION,
+                         help=f'Format version to write (default: {FORMAT_VERSION})')
+    info = subparsers.add_parser('info', help='Print format, size and counts of a catalog')
+    info.add_argument('catalog', help='Catalog to inspect')
+    shard = subparsers.add_parser('shard', help='Split a catalog into per-service shards with a manifest')
+    shard.add_argument('source', help='Catalog to read (any format)')
+    shard.add_argument('directory', help='Directory to write the shards and manifest.json to')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        dump_catalog(load_catalog(args.source), args.destination, version=args.version)
+        print(f"Wrote v{args.version} catalog to {args.destination} "
+              f"({os.path.getsize(args.source):,} -> {os.path.getsize(args.destination):,} bytes)")
+    elif args.command == 'shard':
+        catalog = load_catalog(args.source)
+        manifest_path = write_sharded_catalog(catalog, args.directory)
+        print(f"Wrote {len(catalog.get('services', {}))} service shards and {manifest_path}")
+    elif args.command == 'info' and shard_manifest_path(args.catalog):
+        with open(shard_manifest_path(args.catalog), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        metadata = manifest.get('metadata', {})
+        shard_bytes = sum(entry['bytes'] for entry in manifest['services'].values())
+        print(f"Directory: {os.path.dirname(shard_manifest_path(args.catalog))} "
+              f"({len(manifest['services'])} shards, {shard_bytes:,} bytes)")
+        print("Format: sharded")
+        print(f"Region: {metadata.get('region')}")
+        print(f"Total Services: {metadata.get('total_services')}")
+        print(f"Total SKUs: {metadata.get('total_skus')}")
+    elif args.command == 'info':
+        with open_catalog_file(args.catalog) as f:
+            raw = json.load(f)
+        with open(args.catalog, 'rb') as f:
+            compressed = f.read(2) == GZIP_MAGIC
+        metadata = raw.get('metadata', {})
+        print(f"File: {args.catalog} ({os.path.getsize(args.catalog):,} bytes)")
+        print(f"Format: v{catalog_format_version(raw)}{' (gzip)' if compressed else ''}")
+        print(f"Region: {metadata.get('region')}")
+        print(f"Total Services: {metadata.get('total_services')}")
+        print(f"Total SKUs: {metadata.get('total_skus')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+GCP Currency Conversion - Other-currency catalogs derived from one USD download
+
+The Cloud Billing Catalog API prices every SKU in USD and converts to the
+requested currencyCode with a single conversion rate, which it reports as
+pricingInfo[].currencyConversionRate. Instead of downloading the catalog
+again for every currency, download it once in USD and convert the prices
+locally with that rate.
+
+Features:
+- Exact conversion of tiered unit prices (Money units/nanos) with Decimal arithmetic
+- Derived catalogs share every SKU field except pricing with the source catalog
+- Local FX table (JSON) of conversion rates with their source and observation time
+- Rates come from one small probe request per currency (gcp-sku-downloader.py
+  --derive-currency) or are entered by hand
+
+Usage:
+    python gcp_currency.py convert gcp_skus_20250807_194211.json --currency IDR EUR
+    python gcp_currency.py set IDR 16250.5
+    python gcp_currency.py rates
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from gcp_catalog_format import dump_catalog, load_catalog
+
+DEFAULT_FX_TABLE = os.path.join('.gcp_sku_cache', 'fx_rates.json')
+DEFAULT_FX_MAX_AGE_HOURS = 24
+BASE_CURRENCY = 'USD'
+NANOS = 1_000_000_000
+
+
+def money_nanos(unit_price):
+    """Total amount of a Money object in nanos."""
+    return int(unit_price.get('units') or 0) * NANOS + int(unit_price.get('nanos') or 0)
+
+
+def money_from_nanos(total_nanos, currency_code):
+    """Build a Money object; units and nanos carry the same sign as the API requires."""
+    units = abs(total_nanos) // NANOS
+    nanos = abs(total_nanos) % NANOS
+    sign = -1 if total_nanos < 0 else 1
+    return {'currencyCode': currency_code, 'units': str(sign * units), 'nanos': sign * nanos}
+
+
+def convert_sku(sku, currency_code, rate):
+    """Return a copy of ``sku`` priced in ``currency_code``.
+
+    ``rate`` converts the SKU's current currency to the new one. Only the
+    pricing objects are copied; every other field is shared with ``sku``.
+    """
+    rate = Decimal(str(rate))
+    pricing_info = []
+    for pricing in sku.get('pricingInfo', []):
+        expression = pricing.get('pricingExpression', {})
+        tiered_rates = [
+            dict(tier, unitPrice=money_from_nanos(
+                int((money_nanos(tier.get('unitPrice', {})) * rate).to_integral_value(ROUND_HALF_EVEN)),
+                currency_code))
+            for tier in expression.get('tieredRates', [])
+        ]
+        source_rate = Decimal(str(pricing.get('currencyConversionRate', 1)))
+        pricing_info.append(dict(
+            pricing,
+            pricingExpression=dict(expression, tieredRates=tiered_rates),
+            currencyConversionRate=float(source_rate * rate)
+        ))
+    return dict(sku, pricingInfo=pricing_info)
+
+
+def catalog_currency(catalog):
+    """Return (currency_code, conversion_rate) of a catalog's prices, or (None, None) without priced SKUs.
+
+    The rate is the API's USD conversion rate recorded at download time.
+    """
+    metadata = catalog.get('metadata', {})
+    if metadata.get('currency_code'):
+        return metadata['currency_code'], metadata.get('currency_conversion_rate', 1)
+    for service_data in catalog.get('services', {}).values():
+        for sku in service_data.get('skus', []):
+            code, rate = sku_currency(sku)
+            if code:
+                return code, rate
+    return None, None
+
+
+def sku_currency(sku):
+    """Return (currency_code, conversion_rate) of one SKU's prices, or (None, None)."""
+    for pricing in sku.get('pricingInfo', []):
+        for tier in pricing.get('pricingExpression', {}).get('tieredRates', []):
+            code = tier.get('unitPrice', {}).get('currencyCode')
+            if code:
+                return code, pricing.get('currencyConversionRate', 1)
+    return None, None
+
+
+def convert_catalog(catalog, currency_code, usd_rate, rate_source=None):
+    """Derive a v1-layout catalog priced in ``currency_code`` from a USD-convertible one.
+
+    ``usd_rate`` is the USD to ``currency_code`` rate, as the API reports it.
+    Categories reference the converted SKU objects, as in load_catalog.
+    """
+    source_code, source_rate = catalog_currency(catalog)
+    source_rate = source_rate or 1
+    # Prices in a non-USD catalog are first taken back to USD with its own rate
+    rate = Decimal(str(usd_rate)) / Decimal(str(source_rate))
+    services = {}
+    for service_id, service_data in catalog.get('services', {}).items():
+        converted = {id(sku): convert_sku(sku, currency_code, rate) for sku in service_data.get('skus', [])}
+        services[service_id] = {
+            'service_info': service_data['service_info'],
+            'skus': [converted[id(sku)] for sku in service_data.get('skus', [])],
+            'categories': {
+                family: [converted.get(id(sku)) or convert_sku(sku, currency_code, rate) for sku in skus]
+                for family, skus in service_data.get('categories', {}).items()
+            }
+        }
+    derived = dict(catalog, services=services)
+    derived['metadata'] = dict(
+        catalog['metadata'],
+        currency_code=currency_code,
+        currency_conversion_rate=float(usd_rate),
+        converted_from=source_code or BASE_CURRENCY,
+        conversion_rate_source=rate_source
+    )
+    return derived
+
+
+def currency_output_file(output_file, currency_code):
+    """Path of a derived catalog: gcp_skus.json -> gcp_skus_IDR.json (keeping .gz)."""
+    if output_file.endswith('.gz'):
+        return currency_output_file(output_file[:-3], currency_code) + '.gz'
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{currency_code}{ext or '.json'}"
+
+
+class FXTable:
+    """USD conversion rates cached on disk with where and when each was observed."""
+
+    def __init__(self, path=DEFAULT_FX_TABLE):
+        self.path = path
+        self.rates = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.rates = json.load(f).get('rates', {})
+
+    def get(self, currency_code, max_age_hours=None):
+        """Return the cached rate, or None if missing or older than ``max_age_hours``."""
+        if currency_code == BASE_CURRENCY:
+            return 1.0
+        entry = self.rates.get(currency_code)
+        if not entry:
+            return None
+        if max_age_hours is not None:
+            observed_at = datetime.fromisoformat(entry['observed_at'])
+            if datetime.now(timezone.utc) - observed_at > timedelta(hours=max_age_hours):
+                return None
+        return entry['rate']
+
+    def source(self, currency_code):
+        return self.rates.get(currency_code, {}).get('source')
+
+    def set(self, currency_code, rate, source):
+        self.rates[currency_code] = {
+            'rate': rate,
+            'source': source,
+            'observed_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'base': BASE_CURRENCY, 'rates': self.rates}, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Derive other-currency GCP SKU catalogs from a USD download",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Examples:\n"
+            "  python gcp_currency.py convert gcp_skus.json --currency IDR EUR\n"
+            "  python gcp_currency.py convert gcp_skus.json.gz --currency IDR --max-age 0\n"
+            "  python gcp_currency.py set IDR 16250.5\n"
+            "  python gcp_currency.py rates\n"
+            "\n"
+            "Rates are USD conversion rates as the Cloud Billing API reports them.\n"
+            "gcp-sku-downloader.py --derive-currency fills the table with one probe\n"
+            "request per currency; 'set' records a rate by hand.\n"
+        ),
+    )
+    parser.add_argument('--fx-table', default=DEFAULT_FX_TABLE,
+                        help=f'FX table of USD conversion rates (default: {DEFAULT_FX_TABLE})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='Write a catalog converted to other currencies')
+    convert.add_argument('catalog', help='Catalog to convert (v1 or v2, optionally gzipped)')
+    convert.add_argument('--currency', nargs='+', required=True, help='Currency codes to derive, e.g. IDR EUR')
+    convert.add_argument('--max-age', type=float,
+                         help='Refuse table rates older than this many hours (default: any age)')
+    convert.add_argument('--version', type=int, choices=[1, 2], default=1,
+                         help='Format version of the derived catalogs (default: 1)')
+    set_rate = subparsers.add_parser('set', help='Record a USD conversion rate by hand')
+    set_rate.add_argument('currency', help='Currency code, e.g. IDR')
+    set_rate.add_argument('rate', type=float, help='Units of the currency per USD')
+    subparsers.add_parser('rates', help='List the rates in the FX table')
+    args = parser.parse_args()
+
+    table = FXTable(args.fx_table)
+    if args.command == 'set':
+        if args.rate <= 0:
+            parser.error('rate must be positive')
+        table.set(args.currency.upper(), args.rate, 'manual')
+        table.save()
+        print(f"{args.currency.upper()} = {args.rate:g} per USD saved to {args.fx_table}")
+    elif args.command == 'rates':
+        if not table.rates:
+            print(f"No rates in {args.fx_table}")
+        for code, entry in sorted(table.rates.items()):
+            print(f"{code:<5} {entry['rate']:>16,.6f}  {entry['source']:<8} {entry['observed_at'][:19]}")
+    elif args.command == 'convert':
+        catalog = load_catalog(args.catalog)
+        for code in (code.upper() for code in args.currency):
+            rate = table.get(code, args.max_age)
+            if rate is None:
+                print(f"No usable {code} rate in {args.fx_table}; record one with 'set' or "
+                      f"gcp-sku-downloader.py --derive-currency", file=sys.stderr)
+                return 1
+            output = currency_output_file(args.catalog, code)
+            dump_catalog(convert_catalog(catalog, code, rate, table.source(code)), output, version=args.version)
+            print(f"Wrote {code} catalog ({rate:g} per USD) to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
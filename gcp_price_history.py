@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+GCP Price History - SQLite store of SKU price changes across downloads
+
+Each download of the SKU catalog is appended to a local SQLite database, but
+only SKUs whose unit prices or tier structure changed since the previous
+download of the same region get a new row. Price questions across months are
+then answered from indexed tables instead of re-parsing catalog files.
+
+Features:
+- Ingests catalogs in any format written by gcp-sku-downloader.py, or its NDJSON stream
+- Records added, repriced and removed SKUs per region; the first download of a
+  region is recorded as the initial price of every SKU
+- Indexes on skuId, region, service and observation time
+- Query CLI for the price of one SKU over time and for all changes since a date
+
+Usage:
+    python gcp_price_history.py --db gcp_prices.db ingest gcp_skus_20250807_194211.json
+    python gcp_price_history.py --db gcp_prices.db sku 0013-863C-A2FF
+    python gcp_price_history.py --db gcp_prices.db changes --since 2025-08-01 --region asia-southeast2
+    python gcp_price_history.py --db gcp_prices.db runs
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+from gcp_catalog_format import load_catalog
+
+DEFAULT_HISTORY_DB = 'gcp_price_history.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    observed_at TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    source TEXT,
+    regions TEXT NOT NULL,
+    skus_seen INTEGER NOT NULL DEFAULT 0,
+    rows_written INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS price_points (
+    point_id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    observed_at TEXT NOT NULL,
+    sku_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    service_id TEXT NOT NULL,
+    service_name TEXT,
+    description TEXT,
+    resource_family TEXT,
+    usage_unit TEXT,
+    currency_code TEXT,
+    unit_price REAL,
+    tiers TEXT,
+    effective_time TEXT,
+    price_hash TEXT,
+    change_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sku_latest (
+    sku_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    price_hash TEXT,
+    point_id INTEGER NOT NULL,
+    PRIMARY KEY (sku_id, region)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_price_points_sku ON price_points (sku_id, region, observed_at);
+CREATE INDEX IF NOT EXISTS idx_price_points_region ON price_points (region, observed_at);
+CREATE INDEX IF NOT EXISTS idx_price_points_service ON price_points (service_id, observed_at);
+CREATE INDEX IF NOT EXISTS idx_price_points_observed ON price_points (observed_at);
+"""
+
+# change_type values: 'initial' (first download of the region), 'added',
+# 'repriced' (unit prices or tiers changed) and 'removed'
+CHANGE_TYPES = ('initial', 'added', 'repriced', 'removed')
+
+
+def current_pricing(sku):
+    """Return the pricingInfo entry in effect, i.e. the one with the latest effectiveTime."""
+    pricing_info = sku.get('pricingInfo') or []
+    if not pricing_info:
+        return {}
+    return max(pricing_info, key=lambda info: info.get('effectiveTime', ''))
+
+
+def price_tiers(sku):
+    """Return (tiers, usage_unit, currency_code, effective_time) for a SKU's current price.
+
+    ``tiers`` is a list of [startUsageAmount, unit price] pairs, which is
+    what a price change is judged on.
+    """
+    pricing = current_pricing(sku)
+    expression = pricing.get('pricingExpression', {})
+    tiers = []
+    currency_code = None
+    for rate in expression.get('tieredRates', []):
+        unit_price = rate.get('unitPrice', {})
+        currency_code = currency_code or unit_price.get('currencyCode')
+        price = int(unit_price.get('units') or 0) + int(unit_price.get('nanos') or 0) / 1e9
+        tiers.append([rate.get('startUsageAmount', 0), round(price, 9)])
+    return tiers, expression.get('usageUnit'), currency_code, pricing.get('effectiveTime')
+
+
+def price_hash(tiers, usage_unit, currency_code):
+    content = json.dumps([tiers, usage_unit, currency_code], separators=(',', ':'))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def catalog_records(catalog):
+    """Yield (region, service_id, service_name, sku) for every SKU of a v1-layout catalog."""
+    region = catalog['metadata']['region']
+    for service_id, service_data in catalog.get('services', {}).items():
+        service_name = service_data['service_info'].get('display_name', service_id)
+        for sku in service_data.get('skus', []):
+            yield region, service_id, service_name, sku
+
+
+def ndjson_records(data_file, service_names=None):
+    """Yield (region, service_id, service_name, sku) from a --format ndjson stream."""
+    service_names = service_names or {}
+    with open(data_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            service_id = record['service_id']
+            yield record['region'], service_id, service_names.get(service_id, service_id), record['sku']
+
+
+class PriceHistoryStore:
+    """Append-only SQLite history of SKU prices, one row per change."""
+
+    def __init__(self, db_path=DEFAULT_HISTORY_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def ingest(self, records, observed_at, regions, source=None):
+        """Append the price changes of one download and return a per-change-type count.
+
+        ``records`` yields (region, service_id, service_name, sku). ``regions``
+        are the regions the download covered completely; SKUs previously seen
+        there but missing now are recorded as removed.
+        """
+        counts = dict.fromkeys(CHANGE_TYPES, 0)
+        seen = {region: set() for region in regions}
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (observed_at, ingested_at, source, regions) VALUES (?, ?, ?, ?)',
+                (observed_at, datetime.now(timezone.utc).isoformat(), source, json.dumps(sorted(regions)))
+            )
+            run_id = cursor.lastrowid
+            latest = {}
+            known_regions = {}
+            skus_seen = 0
+            for region, service_id, service_name, sku in records:
+                if region not in latest:
+                    latest[region] = self._latest_hashes(region)
+                    known_regions[region] = bool(latest[region])
+                    seen.setdefault(region, set())
+                sku_id = sku.get('skuId')
+                if not sku_id or sku_id in seen[region]:
+                    continue
+                seen[region].add(sku_id)
+                skus_seen += 1
+                tiers, usage_unit, currency_code, effective_time = price_tiers(sku)
+                digest = price_hash(tiers, usage_unit, currency_code)
+                previous = latest[region].get(sku_id, False)
+                if previous == digest:
+                    continue
+                if previous is False or previous is None:
+                    # New, or back after being removed
+                    change_type = 'added' if known_regions[region] else 'initial'
+                else:
+                    change_type = 'repriced'
+                counts[change_type] += 1
+                self._write_point(run_id, observed_at, region, service_id, service_name, sku_id, sku,
+                                  tiers, usage_unit, currency_code, effective_time, digest, change_type)
+            for region in regions:
+                hashes = latest.get(region)
+                if hashes is None:
+                    hashes = latest[region] = self._latest_hashes(region)
+                for sku_id, digest in hashes.items():
+                    if digest is not None and sku_id not in seen[region]:
+                        counts['removed'] += 1
+                        self._write_removal(run_id, observed_at, region, sku_id)
+            self.conn.execute('UPDATE runs SET skus_seen = ?, rows_written = ? WHERE run_id = ?',
+                              (skus_seen, sum(counts.values()), run_id))
+        return counts
+
+    def ingest_catalog(self, catalog, source=None):
+        """Ingest one downloaded region catalog (v1 layout)."""
+        return self.ingest(catalog_records(catalog), catalog['metadata']['download_timestamp'],
+                           [catalog['metadata']['region']], source)
+
+    def _latest_hashes(self, region):
+        """Current price hash per SKU of a region; None marks a SKU last seen as removed."""
+        rows = self.conn.execute('SELECT sku_id, price_hash FROM sku_latest WHERE region = ?', (region,))
+        return {row['sku_id']: row['price_hash'] for row in rows}
+
+    def _write_point(self, run_id, observed_at, region, service_id, service_name, sku_id, sku,
+                     tiers, usage_unit, currency_code, effective_time, digest, change_type):
+        # unit_price is the highest tier price, i.e. the list price past any free tier
+        category = sku.get('category', {})
+        cursor = self.conn.execute(
+            'INSERT INTO price_points (run_id, observed_at, sku_id, region, service_id, service_name, '
+            'description, resource_family, usage_unit, currency_code, unit_price, tiers, effective_time, '
+            'price_hash, change_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (run_id, observed_at, sku_id, region, service_id, service_name, sku.get('description'),
+             category.get('resourceFamily'), usage_unit, currency_code,
+             max((price for _, price in tiers), default=None), json.dumps(tiers), effective_time,
+             digest, change_type)
+        )
+        self.conn.execute('INSERT OR REPLACE INTO sku_latest (sku_id, region, price_hash, point_id) '
+                          'VALUES (?, ?, ?, ?)', (sku_id, region, digest, cursor.lastrowid))
+
+    def _write_removal(self, run_id, observed_at, region, sku_id):
+        previous = self.conn.execute(
+            'SELECT p.* FROM sku_latest l JOIN price_points p ON p.point_id = l.point_id '
+            'WHERE l.sku_id = ? AND l.region = ?', (sku_id, region)).fetchone()
+        cursor = self.conn.execute(
+            'INSERT INTO price_points (run_id, observed_at, sku_id, region, service_id, service_name, '
+            'description, resource_family, change_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (run_id, observed_at, sku_id, region, previous['service_id'], previous['service_name'],
+             previous['description'], previous['resource_family'], 'removed')
+        )
+        self.conn.execute('UPDATE sku_latest SET price_hash = NULL, point_id = ? WHERE sku_id = ? AND region = ?',
+                          (cursor.lastrowid, sku_id, region))
+
+    def sku_history(self, sku_id, region=None):
+        """Every recorded price of one SKU, oldest first."""
+        query = 'SELECT * FROM price_points WHERE sku_id = ?'
+        params = [sku_id]
+        if region:
+            query += ' AND region = ?'
+            params.append(region)
+        query += ' ORDER BY region, observed_at, point_id'
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def changes_since(self, since, region=None, service=None, include_initial=False, limit=None):
+        """Price changes observed at or after ``since`` (an ISO date or timestamp), oldest first."""
+        query = 'SELECT * FROM price_points WHERE observed_at >= ?'
+        params = [since]
+        if region:
+            query += ' AND region = ?'
+            params.append(region)
+        if service:
+            query += ' AND (service_id = ? OR service_name = ?)'
+            params.extend([service, service])
+        if not include_initial:
+            query += " AND change_type != 'initial'"
+        query += ' ORDER BY observed_at, point_id'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def previous_price(self, point):
+        """The row a change replaced, for showing old -> new prices."""
+        row = self.conn.execute(
+            'SELECT * FROM price_points WHERE sku_id = ? AND region = ? AND point_id < ? '
+            "AND change_type != 'removed' ORDER BY point_id DESC LIMIT 1",
+            (point['sku_id'], point['region'], point['point_id'])).fetchone()
+        return dict(row) if row else None
+
+    def runs(self):
+        return [dict(row) for row in self.conn.execute('SELECT * FROM runs ORDER BY run_id')]
+
+
+def format_price(point):
+    if point is None or point.get('unit_price') is None:
+        return '-'
+    return f"{point['unit_price']:.6f} {point.get('currency_code') or ''}/{point.get('usage_unit') or '?'}".strip()
+
+
+def print_points(points, store=None):
+    if not points:
+        print("No matching price records.")
+        return
+    for point in points:
+        change = point['change_type']
+        if store and change == 'repriced':
+            change = f"repriced from {format_price(store.previous_price(point))}"
+        print(f"{point['observed_at'][:19]}  {point['region']:<24} {point['sku_id']:<16} "
+              f"{format_price(point) if point['change_type'] != 'removed' else '-':<28} {change}")
+        print(f"    {point.get('service_name') or point['service_id']}: {point.get('description') or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query and maintain the SQLite history of GCP SKU prices",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python gcp_price_history.py ingest gcp_skus_20250807_194211.json gcp_skus_20250907_101500.json.gz
+  python gcp_price_history.py sku 0013-863C-A2FF --region asia-southeast2
+  python gcp_price_history.py changes --since 2025-08-01 --service "Compute Engine"
+  python gcp_price_history.py changes --since 2025-08-01 --json > changes.json
+
+gcp-sku-downloader.py --history-db appends every download automatically.
+        """
+    )
+    parser.add_argument('--db', default=DEFAULT_HISTORY_DB, help=f'History database (default: {DEFAULT_HISTORY_DB})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='Append downloaded catalogs, oldest first')
+    ingest.add_argument('catalogs', nargs='+', help='Catalog files (v1 or v2, optionally gzipped)')
+
+    sku = subparsers.add_parser('sku', help='Price of one SKU over time')
+    sku.add_argument('sku_id', help='SKU ID, e.g. 0013-863C-A2FF')
+    sku.add_argument('--region', help='Only this region')
+    sku.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+
+    changes = subparsers.add_parser('changes', help='All price changes since a date')
+    changes.add_argument('--since', required=True, help='ISO date or timestamp, e.g. 2025-08-01')
+    changes.add_argument('--region', help='Only this region')
+    changes.add_argument('--service', help='Only this service (ID or display name)')
+    changes.add_argument('--include-initial', action='store_true',
+                         help="Include the initial prices recorded by a region's first download")
+    changes.add_argument('--limit', type=int, help='Show at most this many changes')
+    changes.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+
+    subparsers.add_parser('runs', help='List ingested downloads')
+    args = parser.parse_args()
+
+    if args.command != 'ingest' and not os.path.exists(args.db):
+        parser.error(f"History database {args.db} does not exist; ingest a catalog first")
+
+    with PriceHistoryStore(args.db) as store:
+        started = time.perf_counter()
+        if args.command == 'ingest':
+            for path in args.catalogs:
+                counts = store.ingest_catalog(load_catalog(path), source=os.path.basename(path))
+                print(f"{path}: " + ', '.join(f"{count} {name}" for name, count in counts.items()))
+        elif args.command == 'sku':
+            points = store.sku_history(args.sku_id, args.region)
+            if args.json:
+                print(json.dumps(points, indent=2))
+            else:
+                print_points(points)
+        elif args.command == 'changes':
+            points = store.changes_since(args.since, args.region, args.service, args.include_initial, args.limit)
+            if args.json:
+                print(json.dumps(points, indent=2))
+            else:
+                print_points(points, store)
+                print(f"{len(points)} changes since {args.since}")
+        elif args.command == 'runs':
+            for run in store.runs():
+                print(f"#{run['run_id']} {run['observed_at'][:19]} {', '.join(json.loads(run['regions']))}: "
+                      f"{run['skus_seen']} SKUs, {run['rows_written']} rows ({run['source'] or '-'})")
+        if not getattr(args, 'json', False):
+            print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
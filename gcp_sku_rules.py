@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+GCP SKU Mapping Rules - Declarative mapping of SKUs to Morpheus price types
+
+Which Morpheus priceTypeCode (and machine family) a GCP SKU maps to is
+decided by an ordered list of rules in a JSON file rather than in code.
+Each rule is a set of predicates over the SKU's category and description;
+the first rule whose predicates all hold decides, and a SKU no rule
+matches gets the file's default.
+
+Rules file:
+    {
+      "version": 1,
+      "default": {"price_type": "software"},
+      "rules": [
+        {"name": "storage-family", "when": {"resourceFamily": ["Storage"]}, "price_type": "storage"},
+        {"name": "core-keywords", "when": {"description": ["vcpu", "core"]},
+         "price_type": "cores", "machine_family": true}
+      ]
+    }
+
+Predicates ("when"), all of which must hold; a list matches any of its values:
+- resourceFamily, resourceGroup, usageType: equal to one of the values (case-insensitive)
+- description: contains one of the keywords (case-insensitive)
+- description_pattern: the regex is found in the lowercased description
+
+"machine_family" is true for the family in the description (e.g. n2 in
+"N2-standard Instance Core"), a {"pattern": regex} whose first group is the
+family, or a {"value": family} constant; with both, the value is used when
+the pattern isn't found. Patterns search the description as written and
+the family is lowercased; without "machine_family" the price has no family.
+
+When loaded, the rules are compiled into a decision table indexed by
+(resourceFamily, resourceGroup): for every combination the rules name, and
+for "any other", the table holds only the rules that can still match, up
+to the first one with no further predicates. A SKU's key is looked up once
+per distinct (resourceFamily, resourceGroup); where a single rule is left
+the lookup alone decides, otherwise only the remaining usageType and
+description tests run, with runs of keyword rules sharing one regex.
+
+gcp_sku_rules.json holds the mapping of gcp-price-sync-final.py and
+gcp_sku_rules_debug.json that of gcp-price-sync-debug.py. The summary
+categories the sync scripts report (compute, storage, ...) are keyword
+tables here too, shared through summary_category().
+
+Usage:
+    python gcp_sku_rules.py check                    # validate gcp_sku_rules.json, print the table
+    python gcp_sku_rules.py check --rules my_rules.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gcp_sku_rules.json')
+RULES_VERSION = 1
+KEY_FIELDS = ('resourceFamily', 'resourceGroup')
+PREDICATE_FIELDS = KEY_FIELDS + ('usageType', 'description', 'description_pattern')
+RULE_FIELDS = ('name', 'when', 'price_type', 'machine_family')
+MACHINE_FAMILY_PATTERN = re.compile(r'\b([a-z]\d+[a-z]?)-', re.IGNORECASE)
+# Table key for a resourceFamily or resourceGroup no rule names
+ANY = '*'
+
+
+class KeywordClassifier:
+    """Ordered keyword rules compiled into a single regex.
+
+    ``rules`` is a list of (label, keywords). match() returns the index of
+    the first rule with a keyword occurring in the text, like a chain of
+    ``any(k in text for k in keywords)`` tests, from one findall over the
+    text. Keywords are tried longest first, and a keyword counts as the
+    best rule among the keywords it contains, since it hides them. Only if
+    a keyword could also hide the start of a better rule's keyword (a
+    suffix of one is a prefix of the other) is every position of the text
+    matched through a lookahead instead, which is exact but slower.
+    """
+
+    def __init__(self, rules):
+        self.labels = [label for label, _ in rules]
+        ranks = {}
+        for index, (_, keywords) in enumerate(rules):
+            for keyword in keywords:
+                ranks.setdefault(keyword, index)
+        self._ranks = {keyword: min(rank for other, rank in ranks.items() if other in keyword) for keyword in ranks}
+        keywords = sorted(ranks, key=len, reverse=True)
+        alternation = '|'.join(re.escape(keyword) for keyword in keywords)
+        self.overlapping = any(
+            self._ranks[hidden] < self._ranks[keyword] and hidden not in keyword
+            and any(keyword.endswith(hidden[:size]) for size in range(1, min(len(keyword), len(hidden))))
+            for keyword in keywords for hidden in keywords
+        )
+        self._pattern = re.compile(f"(?=({alternation}))" if self.overlapping else alternation)
+
+    def match(self, text: str, below: Optional[int] = None) -> Optional[int]:
+        """Index of the first matching rule, or None; only rules before ``below`` are of interest."""
+        found = self._pattern.findall(text)
+        if not found:
+            return None
+        best = min(self._ranks[keyword] for keyword in found)
+        return best if below is None or best < below else None
+
+    def classify(self, text: str) -> Optional[str]:
+        index = self.match(text)
+        return None if index is None else self.labels[index]
+
+
+# Summary categories by resourceFamily, then by keywords in the service name
+# and in the description; the first rule with a keyword present wins
+FAMILY_CATEGORIES = {'storage': 'storage', 'compute': 'compute', 'network': 'network', 'database': 'database',
+                     'ai/ml': 'ai_ml', 'ai': 'ai_ml', 'ml': 'ai_ml'}
+SERVICE_CATEGORY_RULES = [
+    ('storage', ['storage', 'cloud storage', 'filestore', 'memorystore']),
+    ('compute', ['compute', 'vm', 'instance', 'gke', 'kubernetes', 'run', 'functions']),
+    ('network', ['network', 'vpc', 'load balancer', 'cdn', 'gateway']),
+    ('database', ['sql', 'database', 'firestore', 'bigtable', 'spanner', 'alloydb']),
+    ('ai_ml', ['ai', 'ml', 'vertex', 'notebooks', 'composer', 'dataflow']),
+]
+DESCRIPTION_CATEGORY_RULES = [
+    ('storage', ['storage', 'gb', 'tb']),
+    ('compute', ['cpu', 'ram', 'memory', 'core']),
+    ('network', ['network', 'bandwidth', 'transfer']),
+    ('database', ['database', 'sql', 'query']),
+    ('ai_ml', ['ai', 'ml', 'machine learning', 'tensorflow']),
+]
+SERVICE_CATEGORIES = KeywordClassifier(SERVICE_CATEGORY_RULES)
+DESCRIPTION_CATEGORIES = KeywordClassifier(DESCRIPTION_CATEGORY_RULES)
+
+
+def summary_category(service_name: Optional[str], resource_family: Optional[str], description: Optional[str]) -> str:
+    """Summary category (compute, storage, network, database, ai_ml or other) of a SKU."""
+    return (FAMILY_CATEGORIES.get((resource_family or '').lower())
+            or SERVICE_CATEGORIES.classify((service_name or '').lower())
+            or DESCRIPTION_CATEGORIES.classify((description or '').lower())
+            or 'other')
+
+
+class SKURule:
+    """One rule of a rules file: predicates and the price type they select."""
+
+    def __init__(self, spec: dict, position: int):
+        self.position = position
+        self.name = spec.get('name') or f"rule {position}"
+        unknown = set(spec) - set(RULE_FIELDS)
+        if unknown:
+            raise ValueError(f"Rule '{self.name}': unknown fields {sorted(unknown)}")
+        when = spec.get('when') or {}
+        unknown = set(when) - set(PREDICATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Rule '{self.name}': unknown predicates {sorted(unknown)}")
+        if not spec.get('price_type'):
+            raise ValueError(f"Rule '{self.name}': missing price_type")
+        self.price_type = spec['price_type']
+        self.values = {}
+        for field in ('resourceFamily', 'resourceGroup', 'usageType', 'description'):
+            if field in when:
+                values = [when[field]] if isinstance(when[field], str) else when[field]
+                if not values:
+                    raise ValueError(f"Rule '{self.name}': {field} needs at least one value")
+                self.values[field] = tuple(str(value).lower() for value in values)
+        self.description_pattern = None
+        if 'description_pattern' in when:
+            try:
+                self.description_pattern = re.compile(when['description_pattern'])
+            except re.error as e:
+                raise ValueError(f"Rule '{self.name}': bad description_pattern: {e}") from None
+        self._family_pattern, self._family_value = _machine_family_spec(self.name, spec.get('machine_family'))
+
+    def accepts_key(self, family: str, group: str) -> bool:
+        """Whether the rule can match SKUs of this (resourceFamily, resourceGroup) table key."""
+        return all(field not in self.values or value in self.values[field]
+                   for field, value in zip(KEY_FIELDS, (family, group)))
+
+    @property
+    def keywords_only(self) -> bool:
+        """Whether, past the table key, the rule tests description keywords alone."""
+        return (self.description_pattern is None and 'usageType' not in self.values
+                and 'description' in self.values)
+
+    @property
+    def unconditional(self) -> bool:
+        """Whether, past the table key, the rule tests nothing."""
+        return (self.description_pattern is None
+                and not any(field in self.values for field in ('usageType', 'description')))
+
+    def failed_predicate(self, usage_type: str, description: str) -> Optional[str]:
+        """The first predicate beyond the table key that doesn't hold, or None if the rule matches."""
+        if 'usageType' in self.values and usage_type not in self.values['usageType']:
+            return f"usageType {usage_type!r} not in {list(self.values['usageType'])}"
+        if 'description' in self.values and not any(k in description for k in self.values['description']):
+            return f"description contains none of {list(self.values['description'])}"
+        if self.description_pattern is not None and not self.description_pattern.search(description):
+            return f"description doesn't match /{self.description_pattern.pattern}/"
+        return None
+
+    def result(self, description: str) -> Tuple[str, Optional[str]]:
+        """(priceTypeCode, machine_family) for a SKU this rule matched, given its original description."""
+        if self._family_pattern is not None:
+            m = self._family_pattern.search(description)
+            if m:
+                return self.price_type, m.group(1).lower()
+        return self.price_type, self._family_value
+
+    def describe(self) -> str:
+        tests = [f"{field} in {list(values)}" for field, values in self.values.items() if field != 'description']
+        if 'description' in self.values:
+            tests.append(f"description has {list(self.values['description'])}")
+        if self.description_pattern is not None:
+            tests.append(f"description ~ /{self.description_pattern.pattern}/")
+        return f"{self.name}: {' and '.join(tests) or 'always'} -> {self.price_type}"
+
+
+def _machine_family_spec(name: str, spec) -> Tuple[Optional[re.Pattern], Optional[str]]:
+    if spec is None or spec is False:
+        return None, None
+    if spec is True:
+        return MACHINE_FAMILY_PATTERN, None
+    if not isinstance(spec, dict) or not spec or set(spec) - {'pattern', 'value'}:
+        raise ValueError(f"Rule '{name}': machine_family must be true, {{\"pattern\": ...}} and/or {{\"value\": ...}}")
+    pattern = None
+    if 'pattern' in spec:
+        try:
+            pattern = re.compile(spec['pattern'])
+        except re.error as e:
+            raise ValueError(f"Rule '{name}': bad machine_family pattern: {e}") from None
+        if pattern.groups < 1:
+            raise ValueError(f"Rule '{name}': machine_family pattern needs a group for the family")
+    return pattern, spec.get('value')
+
+
+class RuleChain:
+    """The rules that can still match SKUs of one decision table key, in rule order.
+
+    ``steps`` ends with the first rule that tests nothing further (or the
+    default); consecutive rules testing only description keywords share one
+    KeywordClassifier.
+    """
+
+    def __init__(self, candidates: List[SKURule], default: SKURule):
+        self.candidates = []
+        for rule in candidates:
+            self.candidates.append(rule)
+            if rule.unconditional:
+                break
+        else:
+            self.candidates.append(default)
+        self.steps = []
+        run: List[SKURule] = []
+        for rule in self.candidates:
+            if rule.keywords_only:
+                run.append(rule)
+                continue
+            if run:
+                self.steps.append(self._keyword_step(run))
+                run = []
+            self.steps.append((None, rule))
+        self.resolved = self.candidates[0] if len(self.candidates) == 1 else None
+
+    @staticmethod
+    def _keyword_step(run: List[SKURule]):
+        if len(run) == 1:
+            return None, run[0]
+        return KeywordClassifier([(rule, rule.values['description']) for rule in run]), run
+
+    def select(self, usage_type: str, description: str) -> SKURule:
+        for classifier, rules in self.steps:
+            if classifier is not None:
+                index = classifier.match(description)
+                if index is not None:
+                    return rules[index]
+            elif rules.failed_predicate(usage_type, description) is None:
+                return rules
+        # The last step always matches
+        raise AssertionError('rule chain without a final rule')
+
+
+class SKURuleSet:
+    """A rules file compiled into a decision table by (resourceFamily, resourceGroup)."""
+
+    def __init__(self, spec: dict, source: str = '<rules>'):
+        if not isinstance(spec, dict) or not isinstance(spec.get('rules'), list):
+            raise ValueError(f"{source}: expected an object with a 'rules' list")
+        if spec.get('version', RULES_VERSION) != RULES_VERSION:
+            raise ValueError(f"{source}: unsupported rules version {spec.get('version')}")
+        self.source = source
+        self.fingerprint = hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+        self.rules = [SKURule(rule, position) for position, rule in enumerate(spec['rules'], 1)]
+        default = dict(spec.get('default') or {'price_type': 'software'}, name='default')
+        self.default = SKURule(default, len(self.rules) + 1)
+        if not self.default.unconditional:
+            raise ValueError(f"{source}: the default can't have predicates")
+        self.families = {value for rule in self.rules for value in rule.values.get('resourceFamily', ())}
+        self.groups = {value for rule in self.rules for value in rule.values.get('resourceGroup', ())}
+        self.table: Dict[Tuple[str, str], RuleChain] = {}
+        for family in sorted(self.families) + [ANY]:
+            for group in sorted(self.groups) + [ANY]:
+                candidates = [rule for rule in self.rules if rule.accepts_key(family, group)]
+                self.table[family, group] = RuleChain(candidates, self.default)
+        # Table entries by the SKU's own (resourceFamily, resourceGroup)
+        # strings, so a SKU costs one dict lookup once its key was seen
+        self._dispatch: Dict[Tuple[Optional[str], Optional[str]], RuleChain] = {}
+
+    def table_key(self, resource_family: Optional[str], resource_group: Optional[str]) -> Tuple[str, str]:
+        family = (resource_family or '').lower()
+        group = (resource_group or '').lower()
+        return family if family in self.families else ANY, group if group in self.groups else ANY
+
+    def chain(self, resource_family: Optional[str], resource_group: Optional[str]) -> RuleChain:
+        key = (resource_family, resource_group)
+        chain = self._dispatch.get(key)
+        if chain is None:
+            chain = self._dispatch[key] = self.table[self.table_key(resource_family, resource_group)]
+        return chain
+
+    def classify(self, resource_family: Optional[str], resource_group: Optional[str],
+                 usage_type: Optional[str], description: Optional[str]) -> Tuple[str, Optional[str]]:
+        """(priceTypeCode, machine_family) for a SKU."""
+        chain = self.chain(resource_family, resource_group)
+        description = description or ''
+        rule = chain.resolved or chain.select((usage_type or '').lower(), description.lower())
+        return rule.result(description)
+
+    def explain(self, resource_family: Optional[str], resource_group: Optional[str],
+                usage_type: Optional[str], description: Optional[str]) -> Tuple[Tuple[str, Optional[str]], List[str]]:
+        """classify() with a trace of how the decision was reached, one line per step."""
+        key = self.table_key(resource_family, resource_group)
+        chain = self.table[key]
+        trace = [f"resourceFamily={resource_family!r} resourceGroup={resource_group!r} usageType={usage_type!r}",
+                 f"decision table [{key[0]}, {key[1]}]: {len(chain.candidates)} candidate rule(s) of "
+                 f"{len(self.rules)} in {self.source}"]
+        usage_type = (usage_type or '').lower()
+        description = description or ''
+        for rule in chain.candidates:
+            failed = rule.failed_predicate(usage_type, description.lower())
+            label = 'default' if rule is self.default else f"rule #{rule.position} {rule.name}"
+            if failed:
+                trace.append(f"  {label}: no, {failed}")
+                continue
+            result = rule.result(description)
+            trace.append(f"  {label}: matches -> priceTypeCode {result[0]}, "
+                         f"machine family {result[1] or '-'}")
+            return result, trace
+        raise AssertionError('rule chain without a final rule')
+
+
+def load_rules(path: Optional[str] = None) -> SKURuleSet:
+    """Load and compile a rules file (default: gcp_sku_rules.json next to this module)."""
+    path = path or DEFAULT_RULES_FILE
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            spec = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}") from None
+    return SKURuleSet(spec, source=os.path.basename(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check GCP SKU to Morpheus price type mapping rules",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Examples:\n"
+            "  python gcp_sku_rules.py check\n"
+            "  python gcp_sku_rules.py check --rules my_rules.json\n"
+            "\n"
+            "To see how one SKU of a catalog is mapped, use\n"
+            "gcp-price-sync-final.py --sku-catalog CATALOG --explain SKU_ID.\n"
+        ),
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    check = subparsers.add_parser('check', help='Validate a rules file and print its decision table')
+    check.add_argument('--rules', default=DEFAULT_RULES_FILE,
+                       help=f'Rules file (default: {os.path.basename(DEFAULT_RULES_FILE)})')
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        print(f"Invalid rules: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(rules.rules)} rules in {args.rules}:")
+    for rule in rules.rules + [rules.default]:
+        print(f"  #{rule.position:<3} {rule.describe()}")
+    resolved = sum(1 for chain in rules.table.values() if chain.resolved)
+    print(f"\nDecision table: {len(rules.table)} keys, {resolved} decided by the key alone")
+    for (family, group), chain in sorted(rules.table.items()):
+        names = ', '.join(rule.name for rule in chain.candidates)
+        print(f"  [{family}, {group}] {'=' if chain.resolved else '?'} {names}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared catalog tooling (gcp_catalog_format.py) and its use
+by gcp-sku-downloader.py and the price sync scripts.
+Uses synthetic catalogs, so no downloaded data or network access is needed.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import importlib.util
+from multiprocessing import get_context
+
+# Add the current directory to the path to import the module
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gcp_catalog_diff
+import gcp_catalog_format
+import gcp_price_history
+import gcp_sku_rules
+
+
+def load_script(module_name, filename):
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+downloader = load_script("gcp_sku_downloader", "gcp-sku-downloader.py")
+price_sync_final = load_script("gcp_price_sync_final", "gcp-price-sync-final.py")
+
+
+def test_v2_round_trip_matches_v1():
+    """A v2 catalog (plain or gzipped) must load back into the exact v1 layout."""
+    print("Testing catalog format v2 round trip...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=5, skus_per_service=40)
+    with tempfile.TemporaryDirectory() as tmp:
+        sizes = {}
+        for filename, version in [("v1.json", 1), ("v2.json", 2), ("v2.json.gz", 2)]:
+            path = os.path.join(tmp, filename)
+            gcp_catalog_format.dump_catalog(catalog, path, version=version)
+            sizes[filename] = os.path.getsize(path)
+            assert gcp_catalog_format.load_catalog(path) == catalog, f"{filename} did not round trip"
+
+        with open(os.path.join(tmp, "v2.json")) as f:
+            raw = json.load(f)
+    assert raw["format_version"] == 2
+    assert "category_summary" not in raw
+    service = next(iter(raw["services"].values()))
+    assert all(isinstance(index, int) for indexes in service["categories"].values() for index in indexes)
+    assert sizes["v2.json.gz"] < sizes["v2.json"] < sizes["v1.json"] / 2, sizes
+    print(f"✓ v1 {sizes['v1.json']:,} B, v2 {sizes['v2.json']:,} B, v2.gz {sizes['v2.json.gz']:,} B")
+    return True
+
+
+def test_v2_categories_share_sku_objects():
+    """Expanded categories must reference the SKU objects instead of copying them."""
+    print("Testing v2 category expansion...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=2, skus_per_service=10)
+    expanded = gcp_catalog_format.from_v2(gcp_catalog_format.to_v2(catalog))
+    for service_data in expanded["services"].values():
+        sku_ids = {id(sku) for sku in service_data["skus"]}
+        for skus in service_data["categories"].values():
+            assert all(id(sku) in sku_ids for sku in skus)
+    assert expanded["category_summary"] == catalog["category_summary"]
+    print("✓ Categories reference the service's SKU list")
+    return True
+
+
+def test_downloader_and_sync_read_v2_gzip():
+    """The downloader's v2 gzip output must be readable as a base and by the final sync script."""
+    print("Testing v2 gzip catalogs across tools...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=3, skus_per_service=30)
+    catalog["service_fingerprints"] = {sid: {"first_page_sku_count": 30} for sid in catalog["services"]}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "skus.json.gz")
+        downloader.save_catalog(catalog, output, version=2)
+        assert os.path.exists(os.path.join(tmp, "skus_summary.json"))
+
+        base = downloader.IncrementalBase.load(output)
+        processor = price_sync_final.SKUCatalogProcessor(output)
+        assert len(processor.get_all_skus()) == catalog["metadata"]["total_skus"]
+
+    assert base.fingerprints == catalog["service_fingerprints"]
+    print(f"✓ {catalog['metadata']['total_skus']} SKUs read back from a gzipped v2 catalog")
+    return True
+
+
+def test_price_history_records_only_changes():
+    """Re-ingesting a catalog must add rows only for repriced, added and removed SKUs."""
+    print("Testing SQLite price history...")
+
+    first = gcp_catalog_format.synthetic_catalog(num_services=3, skus_per_service=50)
+    second = json.loads(json.dumps(first))
+    second["metadata"]["download_timestamp"] = "2026-02-01T00:00:00"
+    service = next(iter(second["services"].values()))
+    repriced = service["skus"][0]
+    repriced["pricingInfo"][0]["pricingExpression"]["tieredRates"][0]["unitPrice"]["nanos"] += 1000
+    removed = service["skus"].pop(1)
+    added = json.loads(json.dumps(service["skus"][2]))
+    added["skuId"] = "NEW0-0000-0001"
+    service["skus"].append(added)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with gcp_price_history.PriceHistoryStore(os.path.join(tmp, "history.db")) as store:
+            assert store.ingest_catalog(first)["initial"] == 150
+            assert store.ingest_catalog(first) == {"initial": 0, "added": 0, "repriced": 0, "removed": 0}
+            counts = store.ingest_catalog(second)
+            assert counts == {"initial": 0, "added": 1, "repriced": 1, "removed": 1}, counts
+
+            history = store.sku_history(repriced["skuId"])
+            assert [point["change_type"] for point in history] == ["initial", "repriced"]
+            assert history[1]["unit_price"] > history[0]["unit_price"]
+            changes = store.changes_since("2026-01-15")
+            assert {(point["sku_id"], point["change_type"]) for point in changes} == {
+                (repriced["skuId"], "repriced"), (removed["skuId"], "removed"), ("NEW0-0000-0001", "added")
+            }
+            assert store.previous_price(changes[0])["point_id"] < changes[0]["point_id"]
+            assert len(store.changes_since("2020-01-01", include_initial=True)) == 153
+            assert len(store.runs()) == 3
+    print("✓ 150 initial prices, then exactly one added, repriced and removed row")
+    return True
+
+
+def test_catalog_diff_across_formats():
+    """The diff must find the same changes whether the new side is a v2 catalog or an NDJSON stream."""
+    print("Testing catalog diff...")
+
+    old = gcp_catalog_format.synthetic_catalog(num_services=4, skus_per_service=50)
+    new = json.loads(json.dumps(old))
+    services = list(new["services"].values())
+    repriced = services[0]["skus"][3]
+    repriced["pricingInfo"][0]["pricingExpression"]["tieredRates"][0]["unitPrice"]["units"] = "7"
+    removed = services[1]["skus"].pop(0)
+    added = json.loads(json.dumps(services[2]["skus"][0]))
+    added["skuId"] = "NEW0-0000-0002"
+    services[2]["skus"].append(added)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "old.json")
+        gcp_catalog_format.dump_catalog(old, old_path)
+        new_v2 = os.path.join(tmp, "new.json.gz")
+        gcp_catalog_format.dump_catalog(new, new_v2, version=2)
+        writer = downloader.NDJSONCatalogWriter(os.path.join(tmp, "new.ndjson"))
+        for service_id, service_data in new["services"].items():
+            writer.write_page(service_id, {new["metadata"]["region"]: service_data["skus"]})
+        writer.close()
+        writer.write_manifest({new["metadata"]["region"]: new}, os.path.join(tmp, "new_manifest.json"))
+
+        diffs = [gcp_catalog_diff.diff_catalogs(old_path, path, jobs=2) for path in
+                 (new_v2, os.path.join(tmp, "new.ndjson"), os.path.join(tmp, "new_manifest.json"))]
+        unchanged = gcp_catalog_diff.diff_catalogs(old_path, old_path, jobs=1)
+        # NDJSON always streams; a JSON catalog only with ijson, else the diff warns
+        assert gcp_catalog_format.streams_sku_records(os.path.join(tmp, "new_manifest.json"))
+        assert gcp_catalog_format.streams_sku_records(old_path) == (gcp_catalog_format._import_ijson() is not None)
+
+    for diff in diffs:
+        assert diff.totals == {"added": 1, "removed": 1, "repriced": 1}, diff.totals
+        assert diff.unchanged == 198
+        changes = {(change["change"], change["sku_id"]) for change in diff.details}
+        assert changes == {("repriced", repriced["skuId"]), ("removed", removed["skuId"]),
+                           ("added", "NEW0-0000-0002")}, changes
+    services_report = diffs[0].by_service()
+    assert services_report["Compute Engine"]["total"]["repriced"] == 1
+    repriced_change = next(c for c in diffs[0].details if c["change"] == "repriced")
+    assert repriced_change["new_price"]["unit_price"] > repriced_change["old_price"]["unit_price"]
+    assert not unchanged.changed and unchanged.unchanged == 200
+    print("✓ One added, removed and repriced SKU found in v2, NDJSON and manifest inputs")
+    return True
+
+
+def test_catalog_diff_stable_across_spawned_workers():
+    """Identical catalogs indexed in spawned workers (separate hash seeds) must diff to nothing."""
+    print("Testing catalog diff with spawned index workers...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=3, skus_per_service=50)
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "old.json")
+        new_path = os.path.join(tmp, "new.json.gz")
+        gcp_catalog_format.dump_catalog(catalog, old_path)
+        gcp_catalog_format.dump_catalog(catalog, new_path, version=2)
+        diff = gcp_catalog_diff.diff_catalogs(old_path, new_path, jobs=2, mp_context=get_context("spawn"))
+
+    assert not diff.changed, diff.totals
+    assert diff.unchanged == 150
+    print("✓ 150 SKUs unchanged between spawned index workers")
+    return True
+
+
+def test_sharded_catalog_partial_load():
+    """A sharded catalog must reload whole, and load one service without touching the other shards."""
+    print("Testing sharded catalogs...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=6, skus_per_service=40)
+    compute_id = next(sid for sid, data in catalog["services"].items()
+                      if data["service_info"]["display_name"] == "Compute Engine")
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "skus.json")
+        manifest_path = downloader.save_sharded_catalog(catalog, output)
+        shard_dir = os.path.dirname(manifest_path)
+        assert shard_dir == os.path.join(tmp, "skus_shards")
+        assert os.path.exists(os.path.join(tmp, "skus_summary.json"))
+
+        gcp_catalog_format.dump_catalog(catalog, output)
+        # v1 category lists are copies, so the filter must not rely on object identity
+        assert len(gcp_catalog_format.load_catalog(output, services=["Compute Engine"])
+                   ["services"][compute_id]["skus"]) == 40
+        full = gcp_catalog_format.load_catalog(shard_dir)
+        for service_id, service_data in catalog["services"].items():
+            loaded = full["services"][service_id]
+            assert loaded["categories"] == service_data["categories"]
+            assert sorted(s["skuId"] for s in loaded["skus"]) == sorted(s["skuId"] for s in service_data["skus"])
+        assert full["sku_summary"] == catalog["sku_summary"] and full["metadata"] == catalog["metadata"]
+        assert len(list(gcp_catalog_format.iter_sku_records(manifest_path))) == 240
+
+        # Only the Compute Engine shard may be read from here on
+        for filename in os.listdir(shard_dir):
+            if filename not in (f"{compute_id}.json", gcp_catalog_format.SHARD_MANIFEST):
+                os.remove(os.path.join(shard_dir, filename))
+        storage = gcp_catalog_format.load_catalog(manifest_path, services=["compute engine"], families=["Storage"])
+        processor = price_sync_final.SKUCatalogProcessor(shard_dir, services=["Compute Engine"])
+        assert len(processor.get_all_skus()) == 40 and processor.compute_skus
+
+        class FakeMorpheus:
+            def get(self, endpoint):
+                return {"prices": [{"code": f"gcp-{n}"} for n in range(60)]} if endpoint == "prices" else {}
+
+        # Coverage is over the whole catalog, not the one service loaded
+        validation = price_sync_final.validate_sync(FakeMorpheus(), processor)
+        assert validation["catalog_skus"] == 240 and validation["coverage_percentage"] == 25.0
+
+    def services_for(*flags, services=None):
+        names = ("create_service_plans", "create_prices", "create_price_sets", "validate_only",
+                 "discover_morpheus_plans", "explain")
+        return price_sync_final.catalog_services_for(
+            argparse.Namespace(services=services, **{name: name in flags for name in names}))
+
+    # Only a run that reads no SKUs, or is told which services, loads part of the catalog
+    assert services_for("create_service_plans") is None and services_for() is None
+    assert services_for("discover_morpheus_plans") == []
+    assert services_for("create_service_plans", services=["Compute Engine"]) == ["Compute Engine"]
+
+    expected_storage = catalog["services"][compute_id]["categories"]["Storage"]
+    assert list(storage["services"]) == [compute_id]
+    assert storage["services"][compute_id]["skus"] == expected_storage
+    assert storage["metadata"]["partial"] and storage["metadata"]["total_skus"] == len(expected_storage)
+    assert storage["metadata"]["catalog_total_skus"] == 240 and storage["metadata"]["catalog_total_services"] == 6
+    print(f"✓ 6 shards round trip; Compute Engine loaded alone ({len(expected_storage)} Storage SKUs by offset)")
+    return True
+
+
+def test_processed_catalog_cache_reused_until_content_changes():
+    """A second processor must load from the cache, and a changed catalog must be processed again."""
+    print("Testing the processed SKU catalog cache...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=4, skus_per_service=30)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "skus.json")
+        gcp_catalog_format.dump_catalog(catalog, output)
+        first = price_sync_final.SKUCatalogProcessor(output)
+        cache_path = output + price_sync_final.PROCESSED_CACHE_SUFFIX
+        assert not first.cache_hit and not os.path.exists(cache_path)
+        assert first.get_all_skus() and first.compute_skus and os.path.exists(cache_path)
+
+        second = price_sync_final.SKUCatalogProcessor(output)
+        assert second.cache_hit and "services" not in second.catalog
+        assert second.get_all_skus() == first.get_all_skus() and second.compute_skus == first.compute_skus
+        assert second.catalog["metadata"] == catalog["metadata"]
+        assert all(sku.price_type for sku in second.get_all_skus())
+
+        # A touched but unchanged catalog is still a hit, by content hash
+        os.utime(output, ns=(0, 0))
+        assert price_sync_final.SKUCatalogProcessor(output).cache_hit
+
+        sku = next(iter(catalog["services"].values()))["skus"][0]
+        sku["description"] = "Repriced SKU"
+        gcp_catalog_format.dump_catalog(catalog, output)
+        changed = price_sync_final.SKUCatalogProcessor(output)
+        assert not changed.cache_hit
+        assert any(s.description == "Repriced SKU" for s in changed.get_all_skus())
+
+        narrowed = price_sync_final.SKUCatalogProcessor(output, services=["Compute Engine"])
+        assert not narrowed.cache_hit and len(narrowed.get_all_skus()) == 30
+        assert price_sync_final.SKUCatalogProcessor(output, services=["compute engine"]).cache_hit
+        assert price_sync_final.SKUCatalogProcessor(output).cache_hit
+
+        uncached = price_sync_final.SKUCatalogProcessor(output, use_cache=False)
+        assert not uncached.cache_hit and uncached.get_sku_summary() == changed.get_sku_summary()
+    print(f"✓ Processed cache reused ({second.load_seconds * 1000:.1f} ms vs "
+          f"{first.load_seconds * 1000:.1f} ms) and rebuilt after a content change")
+    return True
+
+
+def test_processor_builds_views_on_first_use():
+    """Each processor view must be built only when used, once, and come from the cache when it has it."""
+    print("Testing lazy processor views...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=4, skus_per_service=30)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "skus.json")
+        gcp_catalog_format.dump_catalog(catalog, output)
+
+        plans_only = price_sync_final.SKUCatalogProcessor(output)
+        assert plans_only.view_seconds == {}
+        price_sync_final.create_service_plans_from_skus(plans_only)
+        assert set(plans_only.view_seconds) == {"catalog", "compute_skus"}
+
+        summary = plans_only.get_sku_summary()
+        assert plans_only.get_sku_summary() is summary
+        assert plans_only.get_all_skus() is plans_only.get_all_skus()
+        assert set(plans_only.view_seconds) == {"catalog", "compute_skus", "processed_skus", "sku_summary",
+                                                "all_skus"}
+
+        # Both processed views were added to the cache as they were built
+        cached = price_sync_final.SKUCatalogProcessor(output)
+        assert cached.cache_hit and cached.get_sku_summary() == summary
+        assert len(cached.compute_skus) == len(plans_only.compute_skus)
+        assert "catalog" not in cached.view_seconds and cached.metadata_region == catalog["metadata"]["region"]
+    print(f"✓ Views built on demand: {', '.join(plans_only.view_seconds)}")
+    return True
+
+
+def test_sku_records_release_the_raw_catalog():
+    """Processed SKUs must be slotted records with no reference into the raw catalog."""
+    print("Testing compact SKU records...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=3, skus_per_service=20)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "skus.json")
+        gcp_catalog_format.dump_catalog(catalog, output)
+        processor = price_sync_final.SKUCatalogProcessor(output, use_cache=False)
+        processor.build_views("all_skus", "sku_summary")
+        records = processor.get_all_skus()
+        processor.release_catalog()
+        assert "services" not in processor.catalog and processor.metadata_region == catalog["metadata"]["region"]
+        assert set(processor.view_seconds) == {"catalog", "processed_skus", "all_skus", "sku_summary"}
+        # A view that needs the raw catalog after the release loads it again
+        assert len(processor.compute_skus) == 20
+
+    raw = {sku["skuId"]: sku for data in catalog["services"].values() for sku in data["skus"]}
+    assert len(records) == 60
+    for record in records:
+        assert not hasattr(record, "__dict__")
+        assert all(isinstance(getattr(record, field), (str, float, type(None))) for field in record.__slots__)
+        sku = raw[record.sku_id]
+        rate = sku["pricingInfo"][0]["pricingExpression"]["tieredRates"][0]["unitPrice"]
+        assert record.unit_price == int(rate["units"]) + rate["nanos"] / 1_000_000_000
+        assert record.category == {key: sku["category"][key] for key in ("resourceFamily", "resourceGroup", "usageType")}
+    families = {id(record.resource_family) for record in records if record.resource_family == "Compute"}
+    assert len(families) == 1, "resource families are not interned"
+    print(f"✓ {len(records)} SKU records hold only their own fields")
+    return True
+
+
+def test_compiled_classifier_keeps_rule_priority():
+    """Compiled keyword rules must classify as the ordered keyword scans did, memoizing per service key."""
+    print("Testing the compiled SKU classifier...")
+
+    classifier = gcp_sku_rules.KeywordClassifier([("first", ["xyz", "ssd"]), ("second", ["abx", "local ssd"])])
+    assert classifier.overlapping
+    # "abx" would hide the start of the better rule's "xyz"; "local ssd" contains "ssd"
+    assert classifier.classify("abxyz") == "first" and classifier.classify("local ssd") == "first"
+    assert classifier.classify("abx only") == "second" and classifier.classify("none") is None
+    assert classifier.match("xyz", below=0) is None and classifier.match("abx", below=1) is None
+
+    processor = price_sync_final.SKUCatalogProcessor.__new__(price_sync_final.SKUCatalogProcessor)
+    processor._key_classes = {}
+    processor.rules = price_sync_final.load_rules()
+
+    def record(description, family="", group="", service="Compute Engine"):
+        return price_sync_final.SKURecord("SKU", description, service, "SVC", family, group)
+
+    cases = [
+        (record("N2-standard Instance Ram in Jakarta", "Compute", "RAM"), ("cores", "n2"), "compute"),
+        (record("E2-medium vCPU with memory", "", "RAM"), ("cores", "e2"), "compute"),
+        (record("Memory optimized C2 instance", "", "RAM"), ("memory", None), "compute"),
+        (record("M1-ultramem RAM", "", ""), ("memory", "m1"), "compute"),
+        (record("Balanced PD-SSD capacity", "Compute", "CPU"), ("storage", None), "compute"),
+        (record("Egress traffic", "Network", "", service="Networking"), ("software", None), "network"),
+        (record("Query processing", "", "", service="Synthetic Service 2"), ("software", None), "database"),
+        (record("Something else", "", "", service="Synthetic Service 2"), ("software", None), "other"),
+    ]
+    for sku, price_type, category in cases:
+        assert processor.classify_price_type(sku) == price_type, sku.description
+        assert processor._categorize_sku(sku) == category, sku.description
+    assert len(processor._key_classes) == 4
+    print(f"✓ {len(cases)} SKUs classified by compiled rules in priority order")
+    return True
+
+
+def test_sku_rules_dispatch_and_explain():
+    """A rules file must decide by its (resourceFamily, resourceGroup) table, explain SKUs and key the cache."""
+    print("Testing declarative SKU mapping rules...")
+
+    spec = {
+        "default": {"price_type": "software"},
+        "rules": [
+            {"name": "gpu", "when": {"resourceFamily": "Compute", "resourceGroup": ["GPU"]},
+             "price_type": "software", "machine_family": {"value": "gpu"}},
+            {"name": "committed-cores", "when": {"usageType": ["Commit1Yr"], "description": ["core"]},
+             "price_type": "cores", "machine_family": {"pattern": "^([A-Za-z0-9]+) "}},
+            {"name": "disk", "when": {"description_pattern": "\\bpd-(standard|ssd)\\b"}, "price_type": "storage"},
+            {"name": "compute", "when": {"resourceFamily": ["Compute"]}, "price_type": "cores", "machine_family": True},
+        ],
+    }
+    rules = gcp_sku_rules.SKURuleSet(spec)
+    assert rules.table["compute", "gpu"].resolved.name == "gpu"
+    assert rules.table[gcp_sku_rules.ANY, gcp_sku_rules.ANY].resolved is None
+    assert rules.classify("COMPUTE", "GPU", "OnDemand", "A100 core") == ("software", "gpu")
+    assert rules.classify("Compute", "CPU", "Commit1Yr", "N2D Core") == ("cores", "n2d")
+    assert rules.classify("Compute", "CPU", "OnDemand", "N2D-standard Core") == ("cores", "n2d")
+    assert rules.classify("Storage", "Disk", "OnDemand", "Zonal pd-ssd") == ("storage", None)
+    assert rules.classify("Network", "Egress", "OnDemand", "Egress") == ("software", None)
+    result, trace = rules.explain("Compute", "CPU", "OnDemand", "N2D-standard Core")
+    assert result == ("cores", "n2d") and "decision table [compute, *]" in trace[1]
+    assert "no, usageType 'ondemand'" in trace[2] and "compute: matches" in trace[-1]
+
+    debug_rules = gcp_sku_rules.load_rules(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        "gcp_sku_rules_debug.json"))
+    assert debug_rules.classify("COMPUTE", "CPU", None, "N2D AMD Instance Core") == ("cores", "n2d")
+    assert debug_rules.classify("COMPUTE", "RAM", None, "memory-optimized Ram") == ("memory", "software")
+    assert debug_rules.classify("STORAGE", "DISK", None, "Balanced PD") == ("storage", "pd-standard")
+    assert debug_rules.classify("NETWORK", "EGRESS", None, "Egress") == ("software", "software")
+    assert gcp_sku_rules.summary_category("Cloud SQL", None, "vCPU") == "database"
+    assert gcp_sku_rules.summary_category("Synthetic", "", "Bandwidth") == "network"
+
+    for bad in ({"rules": [{"name": "x", "when": {"zone": ["a"]}, "price_type": "cores"}]},
+                {"rules": [{"name": "x", "when": {}}]},
+                {"rules": [{"name": "x", "price_type": "cores", "machine_family": {"group": 1}}]},
+                {"rules": [], "default": {"price_type": "software", "when": {"usageType": ["x"]}}}):
+        try:
+            gcp_sku_rules.SKURuleSet(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"invalid rules accepted: {bad}")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=2, skus_per_service=10)
+    sku = next(iter(catalog["services"].values()))["skus"][1]
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "skus.json")
+        gcp_catalog_format.dump_catalog(catalog, output)
+        default = price_sync_final.SKUCatalogProcessor(output)
+        lines = default.explain_sku(sku["skuId"])
+        assert lines[0].startswith(f"SKU {sku['skuId']}") and lines[-1] == "=> priceTypeCode cores, machine family -"
+        assert default.explain_sku("no-such-sku") is None
+        custom = price_sync_final.SKUCatalogProcessor(output, rules=rules)
+        assert not custom.cache_hit
+        assert [s.price_type for s in custom.get_all_skus() if s.sku_id == sku["skuId"]] == ["software"]
+        assert price_sync_final.SKUCatalogProcessor(output, rules=gcp_sku_rules.SKURuleSet(spec)).cache_hit
+    print(f"✓ {len(rules.rules)} rules compiled into {len(rules.table)} table keys; "
+          f"SKU {sku['skuId']} explained in {len(lines)} lines")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("Testing catalog tooling...")
+    tests = [
+        test_v2_round_trip_matches_v1,
+        test_v2_categories_share_sku_objects,
+        test_downloader_and_sync_read_v2_gzip,
+        test_price_history_records_only_changes,
+        test_catalog_diff_across_formats,
+        test_catalog_diff_stable_across_spawned_workers,
+        test_sharded_catalog_partial_load,
+        test_processed_catalog_cache_reused_until_content_changes,
+        test_processor_builds_views_on_first_use,
+        test_sku_records_release_the_raw_catalog,
+        test_compiled_classifier_keeps_rule_priority,
+        test_sku_rules_dispatch_and_explain,
+    ]
+    success = True
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+            success = False
+
+    if success:
+        print("\n🎉 All catalog tooling tests passed!")
+    else:
+        print("\n❌ Some tests failed. Please check the implementation.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
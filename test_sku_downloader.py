@@ -0,0 +1,912 @@
+#!/usr/bin/env python3
+"""
+Test script for gcp-sku-downloader.py
+Runs the downloader against an in-memory fake of the Cloud Billing Catalog API
+so no gcloud credentials or network access are needed.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import importlib.util
+from collections import defaultdict
+
+import requests
+
+# Add the current directory to the path to import the module
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location(
+    "gcp_sku_downloader",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "gcp-sku-downloader.py")
+)
+downloader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(downloader)
+
+standin_spec = importlib.util.spec_from_file_location(
+    "gcp_catalog_standin",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "gcp-catalog-standin.py")
+)
+standin_module = importlib.util.module_from_spec(standin_spec)
+standin_spec.loader.exec_module(standin_module)
+
+import gcp_catalog_format
+import gcp_currency
+
+REGION = "asia-southeast2"
+
+
+def build_fake_api(num_services=6, skus_per_service=7, page_size=3, latency=0.02, empty_services=0):
+    """Build a fake /v1/services and /v1/services/{id}/skus responder.
+
+    The last ``empty_services`` services only have SKUs outside REGION.
+    """
+    services = [
+        {"serviceId": f"SVC-{i:04d}", "displayName": f"Service {i}", "businessEntityName": "businessEntities/GCP"}
+        for i in range(num_services)
+    ]
+    skus = {}
+    for i, service in enumerate(services):
+        service_skus = []
+        for j in range(skus_per_service):
+            regions = [REGION] if (i + j) % 2 == 0 else ["us-central1"]
+            if i >= num_services - empty_services:
+                regions = ["us-central1"]
+            service_skus.append({
+                "skuId": f"{service['serviceId']}-SKU-{j}",
+                "description": f"SKU {j} of service {i}",
+                "category": {"resourceFamily": ["Compute", "Storage", "Network"][j % 3]},
+                "serviceRegions": regions,
+                "pricingInfo": [{"pricingExpression": {"usageUnit": "h", "tieredRates": [
+                    {"unitPrice": {"units": "0", "nanos": 1000000 * (j + 1)}}
+                ]}}],
+            })
+        skus[service["serviceId"]] = service_skus
+
+    def paginate(items, key, params):
+        start = int((params or {}).get("pageToken") or 0)
+        page = {key: items[start:start + page_size]}
+        if start + page_size < len(items):
+            page["nextPageToken"] = str(start + page_size)
+        return page
+
+    def make_request(endpoint, params=None):
+        time.sleep(latency)
+        if endpoint == "/v1/services":
+            return paginate(services, "services", params)
+        service_id = endpoint.split("/")[3]
+        return paginate(skus[service_id], "skus", params)
+
+    make_request.skus = skus
+    return make_request
+
+
+def make_client(workers=1, region=REGION, fake_api=None, **kwargs):
+    client = downloader.GCPBillingCatalogClient(region, workers=workers, access_token="test-token", **kwargs)
+    client._make_request = fake_api or build_fake_api()
+    return client
+
+
+def strip_timestamp(catalog):
+    catalog = json.loads(json.dumps(catalog))
+    catalog["metadata"].pop("download_timestamp")
+    return catalog
+
+
+def test_concurrent_download_matches_sequential():
+    """A --workers run must produce exactly the same catalog as a sequential run."""
+    print("Testing concurrent download against sequential download...")
+
+    sequential_client = make_client(workers=1)
+    sequential = sequential_client.download_complete_catalog()
+    concurrent_client = make_client(workers=4)
+    concurrent = concurrent_client.download_complete_catalog()
+
+    assert strip_timestamp(sequential) == strip_timestamp(concurrent)
+    assert list(sequential["services"]) == list(concurrent["services"])
+    assert sequential["metadata"]["total_skus"] == 21
+
+    stats = concurrent_client.last_run_stats
+    assert stats["workers"] == 4
+    assert stats["speedup"] > 1.0
+    print(f"✓ Catalogs identical, speedup {stats['speedup']:.2f}x with 4 workers")
+    return True
+
+
+def test_multi_region_single_pass():
+    """Multiple regions must come from one pass and match per-region downloads."""
+    print("Testing single-pass multi-region download...")
+
+    calls = []
+    client = make_client(workers=2, region=[REGION, "us-central1"])
+    fake_api = client._make_request
+    client._make_request = lambda endpoint, params=None: calls.append(endpoint) or fake_api(endpoint, params)
+    catalogs = client.download_catalogs()
+
+    assert list(catalogs) == [REGION, "us-central1"]
+    single = make_client(region=REGION).download_complete_catalog()
+    assert strip_timestamp(catalogs[REGION]) == strip_timestamp(single)
+    assert catalogs["us-central1"]["metadata"]["total_skus"] == 6 * 7 - 21
+    # 2 services pages + 3 SKU pages per service, fetched once for both regions
+    assert len(calls) == 2 + 6 * 3
+
+    all_regions = make_client(region=None).download_catalogs()
+    assert sorted(all_regions) == sorted(catalogs)
+    print(f"✓ {len(catalogs)} regions from {len(calls)} requests")
+    return True
+
+
+def test_resume_from_checkpoint_journal():
+    """An interrupted run resumed from its journal only fetches the remaining services."""
+    print("Testing checkpoint journal and resume...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_path = os.path.join(tmp, "skus.json.journal")
+
+        # First run: service 3 fails, the others are journaled as they finish
+        client = make_client(workers=3)
+        fake_api = client._make_request
+
+        def flaky(endpoint, params=None):
+            if endpoint.startswith("/v1/services/SVC-0003"):
+                raise requests.exceptions.ConnectionError("network blip")
+            return fake_api(endpoint, params)
+
+        client._make_request = flaky
+        client.download_catalogs(checkpoint=downloader.CheckpointJournal(journal_path, [REGION]))
+        assert client.last_run_stats["failed_services"] == 1
+        # Simulate a write cut short by Ctrl-C
+        with open(journal_path, "a") as f:
+            f.write('{"type": "service", "serv')
+
+        # Resumed run: only the failed service's SKU pages are fetched
+        calls = []
+        client = make_client(workers=3)
+        fake_api = client._make_request
+        client._make_request = lambda endpoint, params=None: calls.append(endpoint) or fake_api(endpoint, params)
+        resumed = client.download_catalogs(
+            checkpoint=downloader.CheckpointJournal(journal_path, [REGION]), resume=True
+        )[REGION]
+
+        sku_calls = [c for c in calls if c != "/v1/services"]
+        assert set(sku_calls) == {"/v1/services/SVC-0003/skus"}, sku_calls
+        assert client.last_run_stats["resumed_services"] == 5
+        full = make_client().download_complete_catalog()
+        assert strip_timestamp(resumed) == strip_timestamp(full)
+
+        try:
+            downloader.CheckpointJournal(journal_path, ["us-central1"]).load()
+            assert False, "journal for another region must be rejected"
+        except ValueError:
+            pass
+    print(f"✓ Resumed run fetched {len(sku_calls)} SKU pages instead of 18")
+    return True
+
+
+def test_incremental_refresh_repages_only_changed_services():
+    """--incremental re-pages only services whose first page changed."""
+    print("Testing incremental refresh...")
+
+    fake_api = build_fake_api()
+    # Service 4 fits on one page, so even unchanged it is fetched whole
+    del fake_api.skus["SVC-0004"][2:]
+    base = json.loads(json.dumps(make_client(fake_api=fake_api).download_complete_catalog()))
+
+    # Reprice the first SKU of service 2
+    sku = fake_api.skus["SVC-0002"][0]
+    sku["pricingInfo"][0]["effectiveTime"] = "2026-10-01T00:00:00Z"
+    sku["pricingInfo"][0]["pricingExpression"]["tieredRates"][0]["unitPrice"]["nanos"] = 5
+    fresh = make_client(fake_api=fake_api).download_complete_catalog()
+
+    calls = []
+    client = make_client(workers=2, incremental_base=downloader.IncrementalBase(base),
+                         fake_api=lambda endpoint, params=None: calls.append(endpoint) or fake_api(endpoint, params))
+    merged = client.download_complete_catalog()
+
+    assert strip_timestamp(merged) == strip_timestamp(fresh)
+    # 2 services pages, 1 first page for each unchanged service, 3 pages for the changed one
+    assert len(calls) == 2 + 5 + 3, calls
+    report = client.refresh_report
+    assert report["summary"]["changed"] == 1 and report["summary"]["unchanged"] == 5
+    # Only the changed multi-page service was re-paged, not the fetched single-page one
+    assert report["summary"]["repaged"] == 1 and report["services"]["SVC-0004"]["source"] == "fetched"
+    assert report["services"]["SVC-0002"]["reason"] == "pricing effectiveTime changed"
+    print(f"✓ Incremental run used {len(calls)} requests instead of 20")
+    return True
+
+
+def test_negative_cache_skips_empty_services():
+    """Services without regional SKUs are cached, skipped, and re-verified by the sweep."""
+    print("Testing negative cache...")
+
+    fake_api = build_fake_api(empty_services=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        first = make_client(fake_api=fake_api).download_catalogs(
+            negative_cache=downloader.NegativeCache(tmp, [REGION]))[REGION]
+        with open(os.path.join(tmp, f"negative_{REGION}.json")) as f:
+            assert sorted(json.load(f)) == ["SVC-0004", "SVC-0005"]
+
+        # Second run skips both; the sweep re-verifies only the oldest one
+        calls = []
+        client = make_client(fake_api=lambda endpoint, params=None: calls.append(endpoint) or fake_api(endpoint, params))
+        second = client.download_catalogs(
+            negative_cache=downloader.NegativeCache(tmp, [REGION]), negative_sweep=1)[REGION]
+        assert strip_timestamp(second) == strip_timestamp(first)
+        assert client.last_run_stats["negative_cache_skipped"] == 2
+        assert len(calls) == 2 + 4 * 3 + 3, calls
+
+        # A cached service that gained SKUs is picked up by the sweep
+        fake_api.skus["SVC-0005"][0]["serviceRegions"] = [REGION]
+        client = make_client(fake_api=fake_api)
+        third = client.download_catalogs(
+            negative_cache=downloader.NegativeCache(tmp, [REGION]), negative_sweep=2)[REGION]
+        assert client.last_run_stats["negative_cache_revived"] == 1
+        assert third["services"]["SVC-0005"]["service_info"]["sku_count"] == 1
+
+        # Expired entries are fetched normally
+        cache = downloader.NegativeCache(tmp, [REGION], ttl_hours=1)
+        cache.entries[REGION]["SVC-0004"]["verified_at"] = "2000-01-01T00:00:00"
+        assert not cache.is_fresh("SVC-0004")
+
+        # What a stand-in server reported empty must not make production runs skip services
+        standin = downloader.NegativeCache(tmp, [REGION], api_base="http://127.0.0.1:8080")
+        assert not standin.entries[REGION] and standin._path(REGION) != cache._path(REGION)
+        standin.update("SVC-0001", {}, None)
+        standin.save()
+        assert not downloader.NegativeCache(tmp, [REGION]).is_fresh("SVC-0001")
+        assert downloader.NegativeCache(tmp, [REGION], api_base="http://127.0.0.1:8080/").is_fresh("SVC-0001")
+        assert downloader.NegativeCache(tmp, [REGION], api_base=downloader.GCPBillingCatalogClient.API_BASE
+                                        ).is_fresh("SVC-0004")
+    print("✓ Empty services skipped, swept and revived correctly")
+    return True
+
+
+def test_ndjson_stream_matches_json_catalog():
+    """Streamed NDJSON output must hold the same SKUs and summaries as the JSON catalog."""
+    print("Testing streaming NDJSON writer...")
+
+    fake_api = build_fake_api()
+    regions = [REGION, "us-central1"]
+    expected = make_client(region=regions, fake_api=fake_api).download_catalogs()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file, manifest_file, _ = downloader.ndjson_output_files(os.path.join(tmp, "skus.json"))
+        writer = downloader.NDJSONCatalogWriter(data_file)
+        streamed = make_client(workers=3, region=regions, fake_api=fake_api).download_catalogs(
+            stream_writer=writer)
+        writer.close()
+        writer.write_manifest(streamed, manifest_file)
+
+        records = defaultdict(list)
+        with open(data_file) as f:
+            for line in f:
+                record = json.loads(line)
+                records[(record["region"], record["service_id"])].append(record["sku"])
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    for region, catalog in expected.items():
+        assert streamed[region]["sku_summary"] == catalog["sku_summary"]
+        assert manifest["regions"][region]["metadata"]["total_skus"] == catalog["metadata"]["total_skus"]
+        for service_id, data in catalog["services"].items():
+            assert "skus" not in streamed[region]["services"][service_id]
+            assert records[(region, service_id)] == data["skus"]
+    assert manifest["record_count"] == sum(c["metadata"]["total_skus"] for c in expected.values())
+    print(f"✓ {manifest['record_count']} streamed records match the in-memory catalogs")
+    return True
+
+
+def test_rate_limiter_spacing_and_backoff():
+    """The token bucket must spread requests evenly and back off after a 429."""
+    print("Testing token-bucket rate limiter...")
+
+    limiter = downloader.TokenBucketRateLimiter(requests_per_minute=6000)  # 100/s
+    started = time.monotonic()
+    threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(10)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    # 40 requests with a burst of one token need at least 39 refill intervals
+    assert elapsed >= 0.38, elapsed
+
+    limiter.on_throttle(retry_after=0.2)
+    assert limiter.requests_per_minute == 3000
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.2
+
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.requests_per_minute == 6000
+    print(f"✓ 40 requests took {elapsed:.2f}s at 100/s; rate halved on 429 and recovered")
+    return True
+
+
+def test_make_request_honours_retry_after():
+    """A 429 must be retried after Retry-After and counted by the limiter."""
+    print("Testing 429 handling in _make_request...")
+
+    def response(status, body, headers=None):
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(body).encode()
+        resp.headers.update(headers or {})
+        return resp
+
+    replies = [response(429, {}, {"Retry-After": "0.1"}), response(200, {"services": []})]
+    client = downloader.GCPBillingCatalogClient(REGION, access_token="test-token", requests_per_minute=6000)
+    client.session.get = lambda *args, **kwargs: replies.pop(0)
+
+    started = time.monotonic()
+    assert client._make_request("/v1/services") == {"services": []}
+    assert time.monotonic() - started >= 0.1
+    assert client.rate_limiter.throttle_count == 1
+    print("✓ Retried after Retry-After and recorded the throttle")
+    return True
+
+
+class FakeTokenProvider(downloader.AccessTokenProvider):
+    """Token provider that hands out numbered tokens instead of calling gcloud."""
+
+    def __init__(self, lifetime=3600, **kwargs):
+        self.lifetime = lifetime
+        super().__init__(**kwargs)
+
+    def _fetch_from_gcloud(self):
+        return f"token-{self.refresh_count + 1}", time.time() + self.lifetime
+
+
+def test_token_provider_caches_and_refreshes():
+    """Tokens must be cached owner-only across runs and refreshed in the background."""
+    print("Testing access token cache and background refresh...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "cache", "access_token.json")
+        first = FakeTokenProvider(cache_file=cache_file)
+        assert first.token() == "token-1"
+        assert os.stat(cache_file).st_mode & 0o777 == 0o600
+
+        second = FakeTokenProvider(cache_file=cache_file)
+        assert second.token() == "token-1" and second.refresh_count == 0
+
+    original_interval = downloader.MIN_TOKEN_REFRESH_INTERVAL
+    downloader.MIN_TOKEN_REFRESH_INTERVAL = 0.05
+    try:
+        # Tokens valid for 1.2s with a 1s margin are due for refresh after ~0.2s
+        expiring = FakeTokenProvider(lifetime=1.2, cache_file=None, refresh_margin=1)
+        assert expiring.token() == "token-1"
+        expiring.start()
+        time.sleep(0.5)
+        expiring.stop()
+    finally:
+        downloader.MIN_TOKEN_REFRESH_INTERVAL = original_interval
+    assert expiring.refresh_count >= 2
+    print(f"✓ Cached token reused; {expiring.refresh_count - 1} background refreshes before expiry")
+    return True
+
+
+def test_make_request_reauthenticates_on_401():
+    """A 401 must be retried exactly once with a freshly fetched token."""
+    print("Testing 401 handling in _make_request...")
+
+    seen_tokens = []
+    statuses = []
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        seen_tokens.append(headers["Authorization"])
+        resp = requests.Response()
+        resp.status_code = statuses.pop(0)
+        resp._content = json.dumps({"services": []}).encode()
+        return resp
+
+    provider = FakeTokenProvider(cache_file=None)
+    client = downloader.GCPBillingCatalogClient(REGION, token_provider=provider, requests_per_minute=6000)
+    client.session.get = fake_get
+
+    statuses[:] = [401, 200]
+    assert client._make_request("/v1/services") == {"services": []}
+    assert seen_tokens == ["Bearer token-1", "Bearer token-2"]
+
+    # A second 401 in the same request is an error, not another refresh
+    seen_tokens.clear()
+    statuses[:] = [401, 401, 200]
+    try:
+        client._make_request("/v1/services")
+        assert False, "expected the repeated 401 to raise"
+    except requests.exceptions.HTTPError:
+        pass
+    assert len(seen_tokens) == 2 and provider.refresh_count == 3
+    print("✓ Retried once with a fresh token after 401")
+    return True
+
+
+def test_telemetry_run_report_and_prometheus_textfile():
+    """Every response must be attributed to its service in the run report and metrics file."""
+    print("Testing download telemetry...")
+
+    fake_api = build_fake_api(latency=0)
+    throttled = []
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        resp = requests.Response()
+        endpoint = url[len(downloader.GCPBillingCatalogClient.API_BASE):]
+        if endpoint.endswith("SVC-0002/skus") and not throttled:
+            throttled.append(endpoint)
+            resp.status_code = 429
+            resp.headers["Retry-After"] = "0"
+            resp._content = b"{}"
+            return resp
+        resp.status_code = 200
+        resp._content = json.dumps(fake_api(endpoint, params)).encode()
+        return resp
+
+    client = downloader.GCPBillingCatalogClient(REGION, workers=2, access_token="test-token",
+                                                requests_per_minute=60000)
+    client.session.get = fake_get
+    client.download_catalogs()
+    report = client.telemetry.report(client.last_run_stats, [REGION])
+
+    totals = report["requests"]
+    assert totals["pages"] == 20 and totals["total"] == 21 and totals["throttled_429"] == 1
+    assert totals["response_bytes"] > 0 and totals["latency_seconds"]["count"] == 21
+    assert report["services_list"]["pages"] == 2
+    by_id = {service["service_id"]: service for service in report["services"]}
+    assert len(by_id) == 6 and all(service["pages"] == 3 for service in by_id.values())
+    assert by_id["SVC-0002"]["throttled"] == 1 and by_id["SVC-0002"]["skus"] == 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report_file, metrics_file = downloader.run_report_files(os.path.join(tmp, "skus.json.gz"))
+        downloader.save_run_report(report, report_file)
+        downloader.save_prometheus_metrics(report, metrics_file)
+        with open(report_file) as f:
+            assert json.load(f)["requests"]["pages"] == 20
+        with open(metrics_file) as f:
+            metrics = f.read()
+    assert os.path.basename(metrics_file) == "skus_metrics.prom"
+    assert "gcp_sku_download_pages 20\n" in metrics
+    assert 'gcp_sku_download_retries{cause="throttled_429"} 1\n' in metrics
+    assert 'gcp_sku_download_service_pages{service_id="SVC-0002",service="Service 2"} 3\n' in metrics
+    print(f"✓ {totals['total']} requests, {totals['response_bytes']} bytes attributed to 6 services")
+    return True
+
+
+def test_download_from_standin_server_with_injected_errors():
+    """A download through the HTTP stand-in must survive injected 429s and 5xx responses."""
+    print("Testing download against the local stand-in server...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=8, skus_per_service=45, region=REGION)
+    standin = standin_module.CatalogStandIn([catalog], max_page_size=20, latency_ms=5, jitter_ms=2,
+                                            error_rate_429=0.1, error_rate_5xx=0.1, retry_after=0.01, seed=7)
+    server = standin_module.make_server(standin)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        client = downloader.GCPBillingCatalogClient(
+            REGION, workers=4, access_token="local", backoff_factor=0.01, max_retries=10,
+            requests_per_minute=60000, api_base=f"http://{host}:{port}/"
+        )
+        downloaded = client.download_catalogs()[REGION]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert client.last_run_stats["failed_services"] == 0
+    assert downloaded["metadata"]["total_skus"] == catalog["metadata"]["total_skus"]
+    assert downloaded["sku_summary"] == catalog["sku_summary"]
+    # 45 SKUs in pages of 20 is 3 pages per service, plus the services list
+    assert standin.stats["pages"] == 8 * 3 + 1
+    assert standin.stats["injected_429"] > 0 and standin.stats["injected_5xx"] > 0
+    report = client.telemetry.report(client.last_run_stats)
+    assert report["requests"]["throttled_429"] == standin.stats["injected_429"]
+    assert report["requests"]["urllib3_retries"] == standin.stats["injected_5xx"]
+    print(f"✓ {downloaded['metadata']['total_skus']} SKUs downloaded through "
+          f"{standin.stats['injected_429']} injected 429s and {standin.stats['injected_5xx']} 5xx responses")
+    return True
+
+
+def test_longest_first_schedule_from_previous_summary():
+    """Weighted services must start largest first and the run stats must report the saving."""
+    print("Testing longest-job-first scheduling...")
+
+    fake_api = build_fake_api(num_services=6, skus_per_service=3, latency=0.02)
+    big = fake_api.skus["SVC-0005"]
+    for j in range(3, 30):
+        sku = json.loads(json.dumps(big[j % 3]))
+        sku["skuId"] = f"SVC-0005-SKU-{j}"
+        big.append(sku)
+    started = []
+
+    def recording_api(endpoint, params=None):
+        if endpoint != "/v1/services" and not (params or {}).get("pageToken"):
+            started.append(endpoint.split("/")[3])
+        return fake_api(endpoint, params)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = make_client(fake_api=fake_api).download_catalogs()[REGION]
+        summary_file = os.path.join(tmp, "previous_summary.json")
+        downloader.save_summary(previous, summary_file)
+        weights = downloader.load_service_weights([summary_file])
+
+    assert weights["SVC-0005"] == max(weights.values())
+    client = make_client(workers=2, fake_api=recording_api, service_weights=weights)
+    scheduled = client.download_catalogs()[REGION]
+    stats = client.last_run_stats
+
+    assert started[0] == "SVC-0005"
+    assert strip_timestamp(scheduled) == strip_timestamp(previous)
+    assert stats["schedule"] == "longest-first" and stats["weighted_services"] == 6
+    assert stats["schedule_saving_seconds"] > 0
+    assert downloader.simulate_makespan([1, 1, 1, 1, 1, 10], 2) == 12
+    assert downloader.simulate_makespan([10, 1, 1, 1, 1, 1], 2) == 10
+    print(f"✓ Largest service started first; saved {stats['schedule_saving_seconds']:.2f}s "
+          f"vs discovery order")
+    return True
+
+
+def test_hedged_requests_cut_tail_latency():
+    """Slow pages must be hedged once the percentile is learned, and hedges must win."""
+    print("Testing hedged requests...")
+
+    fake_api = build_fake_api(num_services=12, skus_per_service=9, latency=0)
+    expected = make_client(fake_api=fake_api).download_catalogs()
+    calls = []
+    first_attempts = {}
+    lock = threading.Lock()
+    # Requests being answered, and any seen while fewer concurrency slots were held
+    active = [0]
+    unslotted = []
+
+    def check_slots(client):
+        if client and active[0] > client.concurrency.in_flight:
+            unslotted.append(active[0])
+
+    def fake_get(url, params=None, headers=None, timeout=None, client=None):
+        page = (url, (params or {}).get("pageToken"))
+        with lock:
+            calls.append(url)
+            first = page not in first_attempts
+            if first:
+                first_attempts[page] = len(first_attempts) + 1
+            active[0] += 1
+            check_slots(client)
+        attempt = first_attempts[page] if first else None
+        # The first request of every 8th page stalls; the hedge sent for it
+        # repeats the page and is answered fast
+        time.sleep(0.6 if attempt and attempt > 12 and attempt % 8 == 0 else 0.01)
+        with lock:
+            check_slots(client)
+            active[0] -= 1
+        resp = requests.Response()
+        resp.status_code = 200
+        endpoint = url[len(downloader.GCPBillingCatalogClient.API_BASE):]
+        resp._content = json.dumps(fake_api(endpoint, params)).encode()
+        return resp
+
+    # A burst of spare tokens so a hedge is never skipped because another
+    # worker just took the only token
+    client = downloader.GCPBillingCatalogClient(REGION, workers=3, access_token="test-token",
+                                                rate_limiter=downloader.TokenBucketRateLimiter(60000, burst=10),
+                                                hedge_percentile=0.9)
+    client.hedger.min_samples = 10
+    client.session.get = fake_get
+    started = time.monotonic()
+    hedged = client.download_catalogs()
+    elapsed = time.monotonic() - started
+
+    stats = client.last_run_stats
+    report = client.telemetry.report(stats)
+    assert strip_timestamp(hedged[REGION]) == strip_timestamp(expected[REGION])
+    assert stats["hedges_fired"] > 0 and stats["hedges_won"] > 0
+    assert report["requests"]["hedges_fired"] == stats["hedges_fired"]
+    assert report["requests"]["hedges_won"] == stats["hedges_won"]
+    assert client.request_count == len(calls)
+    assert elapsed < 0.6, "a stalled page was waited out instead of hedged"
+    print(f"✓ {stats['hedges_fired']} hedges fired, {stats['hedges_won']} won; run took {elapsed:.2f}s")
+
+    # Under adaptive concurrency a hedge needs a slot of its own, and the
+    # slower attempt keeps one until it finishes
+    client._hedge_executor.shutdown(wait=True)
+    first_attempts.clear()
+    adaptive = downloader.GCPBillingCatalogClient(REGION, workers=3, access_token="test-token",
+                                                  rate_limiter=downloader.TokenBucketRateLimiter(60000, burst=10),
+                                                  hedge_percentile=0.9, adaptive_concurrency=True,
+                                                  initial_concurrency=3)
+    adaptive.hedger.min_samples = 10
+    adaptive.session.get = lambda *args, **kwargs: fake_get(*args, client=adaptive, **kwargs)
+    hedged = adaptive.download_catalogs()
+    adaptive._hedge_executor.shutdown(wait=True)
+    assert strip_timestamp(hedged[REGION]) == strip_timestamp(expected[REGION])
+    assert not unslotted, f"{max(unslotted)} requests in flight on fewer concurrency slots"
+    assert adaptive.concurrency.in_flight == 0
+    adaptive_stats = adaptive.last_run_stats
+    print(f"✓ Adaptive concurrency: {adaptive_stats['hedges_fired']} hedges fired, "
+          f"{adaptive_stats['hedges_skipped']} skipped, every request held a slot")
+    return True
+
+
+def test_minimal_request_profile_saves_requests_and_bytes():
+    """The minimal profile must list the same SKUs with fewer requests and far fewer wire bytes."""
+    print("Testing the bandwidth-minimal request profile...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=4, skus_per_service=450, region=REGION)
+    standin = standin_module.CatalogStandIn([catalog])
+    server = standin_module.make_server(standin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    reports, catalogs = {}, {}
+    try:
+        host, port = server.server_address[:2]
+        for profile in ("default", "minimal"):
+            client = downloader.GCPBillingCatalogClient(
+                REGION, access_token="local", requests_per_minute=60000,
+                api_base=f"http://{host}:{port}", request_profile=profile
+            )
+            catalogs[profile] = client.download_catalogs()[REGION]
+            reports[profile] = client.telemetry.report(client.last_run_stats, [REGION],
+                                                       {"name": profile, **client.profile})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    def sku_ids(downloaded):
+        return sorted(sku["skuId"] for data in downloaded["services"].values() for sku in data["skus"])
+
+    assert sku_ids(catalogs["minimal"]) == sku_ids(catalogs["default"])
+    assert catalogs["minimal"]["sku_summary"] == catalogs["default"]["sku_summary"]
+    sku = next(iter(catalogs["minimal"]["services"].values()))["skus"][0]
+    assert "name" not in sku and "pricingInfo" in sku
+
+    default, minimal = reports["default"]["requests"], reports["minimal"]["requests"]
+    # 450 SKUs are 5 pages of 100 but a single page of 5000
+    assert default["total"] == 4 * 5 + 1 and minimal["total"] == 4 + 1
+    assert minimal["wire_bytes"] < minimal["response_bytes"] / 5
+    assert default["wire_bytes"] == default["response_bytes"]
+    assert reports["minimal"]["request_profile"]["estimated_default_profile_pages"] == default["pages"]
+
+    compared = downloader.compare_run_reports(reports["minimal"], reports["default"])["comparison"]
+    assert compared["baseline_profile"] == "default"
+    assert compared["wire_bytes"]["ratio"] < 0.2 and compared["requests"]["ratio"] < 0.5
+    print(f"✓ requests {default['total']} -> {minimal['total']}, wire bytes "
+          f"{default['wire_bytes']:,} -> {minimal['wire_bytes']:,}")
+    return True
+
+
+def test_derived_currency_catalog_matches_direct_download():
+    """An IDR catalog converted from the USD download must price every SKU as an IDR download does."""
+    print("Testing currency catalogs derived from one USD download...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=3, skus_per_service=60, region=REGION)
+    standin = standin_module.CatalogStandIn([catalog], fx_rates={"IDR": 16250.5})
+    server = standin_module.make_server(standin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host, port = server.server_address[:2]
+        clients, downloads = {}, {}
+        for currency in ("USD", "IDR"):
+            clients[currency] = downloader.GCPBillingCatalogClient(
+                REGION, access_token="local", requests_per_minute=60000,
+                api_base=f"http://{host}:{port}", currency_code=currency
+            )
+            downloads[currency] = clients[currency].download_catalogs()
+        usd_client = clients["USD"]
+        with tempfile.TemporaryDirectory() as tmp:
+            fx_table = gcp_currency.FXTable(os.path.join(tmp, "fx_rates.json"))
+            requests_before = standin.stats["requests"]
+            rates = downloader.resolve_conversion_rates(usd_client, downloads["USD"], ["IDR"], fx_table, 24)
+            probes = standin.stats["requests"] - requests_before
+            cached = downloader.resolve_conversion_rates(usd_client, downloads["USD"], ["IDR"],
+                                                         gcp_currency.FXTable(fx_table.path), 24)
+            assert standin.stats["requests"] - requests_before == probes
+            written = downloader.save_currency_catalogs(downloads["USD"], rates, os.path.join(tmp, "skus.json"),
+                                                        False, fx_table)
+            assert written == [os.path.join(tmp, "skus_IDR.json")]
+            derived = gcp_catalog_format.load_catalog(written[0])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    def prices(downloaded):
+        return {
+            sku["skuId"]: sku["pricingInfo"][0]["pricingExpression"]["tieredRates"][0]["unitPrice"]
+            for data in downloaded["services"].values() for sku in data["skus"]
+        }
+
+    assert probes == 1 and rates == cached == {"IDR": 16250.5}
+    direct = downloads["IDR"][REGION]
+    assert prices(derived) == prices(direct)
+    assert derived["metadata"]["currency_code"] == "IDR"
+    assert derived["metadata"]["conversion_rate_source"] == "probe"
+    sku = next(iter(derived["services"].values()))["skus"][0]
+    assert sku["pricingInfo"][0]["currencyConversionRate"] == 16250.5
+    print(f"✓ {len(prices(derived))} IDR prices derived from USD with one probe request match a direct download")
+    return True
+
+
+def test_pipelined_download_matches_sequential_save():
+    """--pipeline output (json, json-v2 and shards) must load back as the catalog of a plain download."""
+    print("Testing pipelined fetch, normalize and write...")
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=8, skus_per_service=120, region=REGION)
+    standin = standin_module.CatalogStandIn([catalog], max_page_size=50)
+    server = standin_module.make_server(standin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def download(pipeline=None):
+        host, port = server.server_address[:2]
+        client = downloader.GCPBillingCatalogClient(
+            REGION, workers=4, access_token="local", requests_per_minute=60000, api_base=f"http://{host}:{port}"
+        )
+        return client, client.download_catalogs(pipeline=pipeline)
+
+    def without_timestamp(loaded):
+        # Shards store SKUs grouped by resource family, so SKU order is not compared
+        services = {
+            service_id: dict(data, skus=sorted(data["skus"], key=lambda sku: sku["skuId"]))
+            for service_id, data in loaded["services"].items()
+        }
+        return dict(loaded, services=services, metadata=dict(loaded["metadata"], download_timestamp=None))
+
+    try:
+        _, plain = download()
+        with tempfile.TemporaryDirectory() as tmp:
+            expected_path = os.path.join(tmp, "plain.json")
+            downloader.save_catalog(plain[REGION], expected_path)
+            expected = without_timestamp(gcp_catalog_format.load_catalog(expected_path))
+            for name, writer in (
+                ("v1", downloader.FragmentCatalogWriter(os.path.join(tmp, "v1.json"), False)),
+                ("v2", downloader.FragmentCatalogWriter(os.path.join(tmp, "v2.json.gz"), False, version=2)),
+                ("sharded", downloader.ShardCatalogWriter(os.path.join(tmp, "sharded.json"), False)),
+            ):
+                pipeline = downloader.DownloadPipeline(writer, queue_size=4)
+                client, catalogs = download(pipeline)
+                path = writer.finalize(REGION, catalogs[REGION])
+                assert without_timestamp(gcp_catalog_format.load_catalog(path)) == expected, name
+                assert without_timestamp(catalogs[REGION]) == without_timestamp(plain[REGION]), name
+            assert not [f for f in os.listdir(tmp) if f.endswith(".part")]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    report = client.last_run_stats["pipeline"]
+    assert set(report["stages"]) == {"fetch", "normalize", "write"}
+    assert report["stages"]["fetch"]["items"] == 8 * 3  # pages of 50 SKUs
+    assert report["stages"]["normalize"]["skus"] == report["stages"]["write"]["skus"] == 960
+    assert report["queues"]["pages"]["capacity"] == 4
+    assert 1 <= report["queues"]["pages"]["max_depth"] <= 4
+    assert report["bottleneck"] in ("fetch", "normalize", "write")
+    print(f"✓ 960 SKUs through 3 stages (bottleneck: {report['bottleneck']}); "
+          f"json, json-v2 and sharded output match a plain download")
+    return True
+
+
+def test_adaptive_concurrency_settles_under_server_quota():
+    """The AIMD limit must grow on success, halve on 429s past the server's quota and record its timeline."""
+    print("Testing adaptive concurrency...")
+
+    limiter = downloader.AdaptiveConcurrencyLimiter(8, initial=2)
+    for _ in range(2 + 3):
+        started, _ = limiter.acquire()
+        limiter.release(started, latency=0.01)
+    assert limiter.limit == 4
+    started, _ = limiter.acquire()
+    stale, _ = limiter.acquire()
+    limiter.release(started, overloaded=True)
+    limiter.release(stale, overloaded=True)
+    # Both requests were in flight before the first decrease, so only one counts
+    assert limiter.limit == 2 and limiter.decreases == {"overload": 1}
+    assert [point["reason"] for point in limiter.timeline] == ["start", "success", "success", "overload"]
+
+    # A request that fails before reaching the server must still free its slot
+    class FailingSend(downloader.GCPBillingCatalogClient):
+        def _send(self, url, params, token, endpoint):
+            raise RuntimeError("no route")
+
+    failing = FailingSend(REGION, access_token="local", adaptive_concurrency=True, initial_concurrency=1)
+    for _ in range(3):
+        try:
+            failing._make_request("/v1/services")
+            assert False, "expected the send failure to raise"
+        except RuntimeError:
+            pass
+    assert failing.concurrency.in_flight == 0
+
+    # Only a timeout counts as rising latency; other transport errors keep the limit
+    class TransportError(downloader.GCPBillingCatalogClient):
+        error = requests.exceptions.ConnectionError
+
+        def _send(self, url, params, token, endpoint):
+            raise self.error("transport failure")
+
+    erroring = TransportError(REGION, workers=8, access_token="local", adaptive_concurrency=True,
+                              initial_concurrency=4)
+    for error in (requests.exceptions.ConnectionError, requests.exceptions.SSLError,
+                  requests.exceptions.Timeout):
+        erroring.error = error
+        try:
+            erroring._make_request("/v1/services")
+            assert False, "expected the transport failure to raise"
+        except error:
+            pass
+        if error is not requests.exceptions.Timeout:
+            assert erroring.concurrency.limit == 4 and not erroring.concurrency.decreases
+    assert erroring.concurrency.limit == 2 and erroring.concurrency.decreases == {"latency": 1}
+    assert erroring.concurrency.in_flight == 0
+
+    catalog = gcp_catalog_format.synthetic_catalog(num_services=12, skus_per_service=60, region=REGION)
+    standin = standin_module.CatalogStandIn([catalog], max_page_size=20, latency_ms=15,
+                                            retry_after=0.01, max_concurrent=3)
+    server = standin_module.make_server(standin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host, port = server.server_address[:2]
+        client = downloader.GCPBillingCatalogClient(
+            REGION, workers=8, access_token="local", backoff_factor=0.01, max_retries=10,
+            requests_per_minute=60000, api_base=f"http://{host}:{port}",
+            adaptive_concurrency=True, initial_concurrency=2
+        )
+        downloaded = client.download_catalogs()[REGION]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = client.last_run_stats["concurrency"]
+    assert client.last_run_stats["failed_services"] == 0
+    assert downloaded["metadata"]["total_skus"] == catalog["metadata"]["total_skus"]
+    assert stats["increases"] > 0 and stats["initial_limit"] == 2 and stats["max_limit"] == 8
+    assert stats["peak_limit"] <= 8 and standin.stats["peak_in_flight"] <= 3
+    if standin.stats["over_quota_429"]:
+        assert stats["decreases"].get("overload", 0) > 0
+    assert stats["timeline"][0] == {"t": 0.0, "limit": 2, "reason": "start"}
+    assert len(stats["timeline"]) <= 1 + stats["increases"] + sum(stats["decreases"].values())
+    report = client.telemetry.report(client.last_run_stats)
+    assert report["run"]["concurrency"]["timeline"] == stats["timeline"]
+    print(f"✓ Limit {stats['initial_limit']} -> {stats['final_limit']} (peak {stats['peak_limit']}) "
+          f"against a quota of 3; {standin.stats['over_quota_429']} over-quota 429s")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("Testing gcp-sku-downloader.py functionality...")
+    tests = [
+        test_concurrent_download_matches_sequential,
+        test_multi_region_single_pass,
+        test_resume_from_checkpoint_journal,
+        test_incremental_refresh_repages_only_changed_services,
+        test_negative_cache_skips_empty_services,
+        test_ndjson_stream_matches_json_catalog,
+        test_rate_limiter_spacing_and_backoff,
+        test_make_request_honours_retry_after,
+        test_token_provider_caches_and_refreshes,
+        test_make_request_reauthenticates_on_401,
+        test_telemetry_run_report_and_prometheus_textfile,
+        test_download_from_standin_server_with_injected_errors,
+        test_longest_first_schedule_from_previous_summary,
+        test_hedged_requests_cut_tail_latency,
+        test_minimal_request_profile_saves_requests_and_bytes,
+        test_derived_currency_catalog_matches_direct_download,
+        test_pipelined_download_matches_sequential_save,
+        test_adaptive_concurrency_settles_under_server_quota,
+    ]
+    success = True
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+            success = False
+
+    if success:
+        print("\n🎉 All downloader tests passed!")
+    else:
+        print("\n❌ Some tests failed. Please check the implementation.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()